@@ -1,15 +1,42 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from collections import Counter
+import base64
+import csv
+import functools
+import hashlib
+import io
+import json
 import os
+import tempfile
+import time
+import zipfile
 from dotenv import load_dotenv
 from ai_categorization import ai_analyzer
-from receipt_parser import extract_receipt_data, parse_receipt
+from expense_search import expense_search
+from compression import CODINGS as COMPRESSION_CODINGS, response_compressor
+from categorization_cache import categorization_cache, normalize as normalize_description
+from hf_client import hf_client
+from insights_cache import insights_cache
+from receipt_jobs import receipt_queue, process_receipt, record_receipt, QueueFullError
+from image_preprocessing import PRESETS as OCR_PRESETS
+from receipt_parser import cached_ocr
+from ocr_cache import ocr_cache
+from ocr_store import ocr_store
+from money import format_minor, from_minor, to_minor, sum_minor
+from serialization import EXPENSE_FIELDS, dumps, expense_dict, iter_json_array, iter_ndjson
+from statement_import import StatementFormatError, detect_format, iter_statement
 from flask_migrate import Migrate
+from flask.cli import AppGroup
+import click
 
 load_dotenv()
 
@@ -32,11 +59,25 @@ app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = jwt_secret_key
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('UPLOAD_MAX_BYTES', str(64 * 1024 * 1024)))
+
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_BYTES', str(2 * 1024 * 1024)))
+
+class SpooledUploadRequest(Request):
+    """Keeps uploads in memory, spilling to an anonymous temp file above UPLOAD_SPOOL_BYTES.
+
+    The temp file has no name on disk and is gone once the request closes it.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+
+app.request_class = SpooledUploadRequest
 
 # Initialize extensions
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
 CORS(app)
+response_compressor.init_app(app)
 migrate = Migrate(app, db)
 
 # Models
@@ -45,6 +86,10 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every change to the user's expenses, cached per-user data is keyed by it
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # When data_version last changed, sent as Last-Modified
+    data_updated_at = db.Column(db.DateTime)
     expenses = db.relationship('Expense', backref='user', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
@@ -63,7 +108,8 @@ class User(db.Model):
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     merchant = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    # Integer minor units of DEFAULT_CURRENCY, see money.py
+    amount_cents = db.Column(db.BigInteger, nullable=False)
     description = db.Column(db.String(300), nullable=False)
     category = db.Column(db.String(50), nullable=False)
     payment_method = db.Column(db.String(100), nullable=False)
@@ -71,6 +117,22 @@ class Expense(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        # Every expense query starts with user_id. This one serves the list order,
+        # keyset pages and date-window dashboards.
+        db.Index('ix_expense_user_date_created', 'user_id', 'date', 'created_at', 'id'),
+        # Category filters and per-category windows
+        db.Index('ix_expense_user_category_date', 'user_id', 'category', 'date'),
+    )
+
+    @property
+    def amount(self):
+        return from_minor(self.amount_cents)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = to_minor(value)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -84,10 +146,136 @@ class Expense(db.Model):
             'user_id': self.user_id
         }
 
+# Per-user spending rollups, kept in step with Expense inside the same transaction
+class DailySpending(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    total_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class MonthlySpending(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    category = db.Column(db.String(50), primary_key=True)
+    total_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
 # Routes
 
 
 # Users
+def _record_expense_change(user_id):
+    """Bump the user's data_version in the current transaction so cached per-user data is recomputed."""
+    User.query.filter_by(id=user_id).update(
+        {User.data_version: User.data_version + 1, User.data_updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+
+def _upsert_rollups(model, rows):
+    """Add each row's total_cents and count to the matching rollup row, creating it if needed."""
+    table = model.__table__
+    insert = sqlite_insert if db.engine.dialect.name == 'sqlite' else postgresql_insert
+    stmt = insert(table)
+    # Atomic add-or-create, so concurrent requests can't both insert the same row
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={'total_cents': table.c.total_cents + stmt.excluded.total_cents, 'count': table.c.count + stmt.excluded.count}
+    ), rows)
+
+def _upsert_rollup(model, key, amount_cents, count):
+    _upsert_rollups(model, [dict(key, total_cents=amount_cents, count=count)])
+    if count < 0:
+        table = model.__table__
+        db.session.execute(table.delete().where(
+            *[table.c[name] == value for name, value in key.items()], table.c.count <= 0
+        ))
+
+def _apply_rollup_delta(user_id, day, category, amount_cents, count):
+    """Add amount_cents/count to the user's daily and monthly rollups for one date and category."""
+    _upsert_rollup(DailySpending, {'user_id': user_id, 'date': day, 'category': category}, amount_cents, count)
+    _upsert_rollup(MonthlySpending, {'user_id': user_id, 'month': day.replace(day=1), 'category': category}, amount_cents, count)
+
+def _apply_rollup_deltas(user_id, deltas):
+    """Add {(date, category): [amount_cents, count]} to the rollups with one statement per table."""
+    daily = [{'user_id': user_id, 'date': day, 'category': category, 'total_cents': amount_cents, 'count': count}
+             for (day, category), (amount_cents, count) in deltas.items()]
+    monthly = {}
+    for row in daily:
+        totals = monthly.setdefault((row['date'].replace(day=1), row['category']), [0, 0])
+        totals[0] += row['total_cents']
+        totals[1] += row['count']
+    _upsert_rollups(DailySpending, daily)
+    _upsert_rollups(MonthlySpending, [
+        {'user_id': user_id, 'month': month, 'category': category, 'total_cents': amount_cents, 'count': count}
+        for (month, category), (amount_cents, count) in monthly.items()
+    ])
+    # Drop rows that removals emptied, as _upsert_rollup does for one row
+    for model, period, keys in (
+        (DailySpending, DailySpending.date, [(row['date'], row['category']) for row in daily if row['count'] < 0]),
+        (MonthlySpending, MonthlySpending.month, [key for key, (_, count) in monthly.items() if count < 0]),
+    ):
+        if keys:
+            db.session.execute(model.__table__.delete().where(
+                model.user_id == user_id, db.tuple_(period, model.category).in_(keys), model.count <= 0
+            ))
+
+def _user_data_version(user_id):
+    return db.session.query(User.data_version).filter_by(id=user_id).scalar()
+
+def conditional_on_data_version(per_day=False):
+    """Strong ETag / Last-Modified for a read endpoint, derived from the user's data_version.
+
+    The ETag covers the user, the version, the path and query string (and
+    the date for views whose window moves daily). A matching If-None-Match,
+    or an If-Modified-Since that is not older than the last change, gets a
+    304 after one primary key lookup, before the view runs. Last-Modified is
+    the whole second after the last change and is only sent once that second
+    is over, so a write later in the same second can't be hidden behind it.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = int(get_jwt_identity())
+            row = db.session.query(User.data_version, User.data_updated_at, User.created_at).filter_by(id=user_id).first()
+            if row is None:
+                return view(*args, **kwargs)
+            version, updated_at, created_at = row
+
+            today = datetime.now().date()
+            key = f'{user_id}:{version}:{request.full_path}:{today.isoformat() if per_day else ""}'
+            etag = f'v{version}-' + hashlib.sha1(key.encode()).hexdigest()[:16]
+            now = datetime.utcnow()
+            # HTTP dates are whole seconds, round up past the change
+            last_modified = (updated_at or created_at or now).replace(microsecond=0) + timedelta(seconds=1)
+            if per_day:
+                midnight = datetime.combine(today, datetime.min.time()).astimezone(timezone.utc).replace(tzinfo=None)
+                last_modified = max(last_modified, midnight)
+            # Until that second is over another write could share it, so don't hand out a date yet
+            dated = last_modified <= now
+
+            if request.if_none_match:
+                # A compressed response carried the encoding as an ETag suffix, see compression.py
+                candidates = [etag] + [f'{etag}-{coding}' for coding in COMPRESSION_CODINGS]
+                matched = next((tag for tag in candidates if request.if_none_match.contains(tag)), None)
+                not_modified = matched is not None
+                etag = matched or etag
+            else:
+                not_modified = (dated and bool(request.if_modified_since)
+                                and request.if_modified_since.replace(tzinfo=None) >= last_modified)
+
+            response = app.make_response(Response(status=304) if not_modified else view(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                if dated:
+                    response.last_modified = last_modified
+                # Per-user data: browsers may keep it but must revalidate, shared caches must not
+                response.headers['Cache-Control'] = 'private, no-cache'
+                response.vary.add('Authorization')
+            return response
+        return wrapper
+    return decorator
+
 @app.route('/api/register', methods=['POST'])
 def register():
     try:
@@ -156,16 +344,334 @@ def login():
 
 
 # Expenses
+EXPENSES_PAGE_MAX = int(os.getenv('EXPENSES_PAGE_MAX', '200'))
+EXPORT_BATCH_ROWS = int(os.getenv('EXPORT_BATCH_ROWS', '1000'))
+EXPENSE_ROW_COLUMNS = [getattr(Expense, field) for field in EXPENSE_FIELDS]
+EXPENSE_ORDER = (Expense.date.desc(), Expense.created_at.desc(), Expense.id.desc())
+
+def _parse_date_arg(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Invalid {name}. Use YYYY-MM-DD')
+
+def _parse_amount_arg(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return to_minor(value)
+    except ValueError:
+        raise ValueError(f'Invalid {name}')
+
+def _parse_expense_filters(args):
+    """SQL conditions for the expense list filters in a query string. Raises ValueError on bad input."""
+    conditions = []
+    start_date = _parse_date_arg(args, 'start_date')
+    end_date = _parse_date_arg(args, 'end_date')
+    if start_date:
+        conditions.append(Expense.date >= start_date)
+    if end_date:
+        conditions.append(Expense.date <= end_date)
+
+    # category and payment_method accept repeated or comma separated values
+    for name, column in (('category', Expense.category), ('payment_method', Expense.payment_method)):
+        values = [v.strip() for arg in args.getlist(name) for v in arg.split(',') if v.strip()]
+        if values:
+            conditions.append(column.in_(values))
+
+    merchant = (args.get('merchant') or '').strip()
+    if merchant:
+        # A substring match, so % and _ in the input are literal characters, not wildcards
+        pattern = merchant.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions.append(Expense.merchant.ilike(f'%{pattern}%', escape='\\'))
+
+    min_amount = _parse_amount_arg(args, 'min_amount')
+    max_amount = _parse_amount_arg(args, 'max_amount')
+    if min_amount is not None:
+        conditions.append(Expense.amount_cents >= min_amount)
+    if max_amount is not None:
+        conditions.append(Expense.amount_cents <= max_amount)
+    return conditions
+
+def _encode_cursor(expense):
+    key = [expense.date.isoformat(), expense.created_at.isoformat(), expense.id]
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        date_str, created_str, expense_id = json.loads(raw)
+        return (datetime.strptime(date_str, '%Y-%m-%d').date(),
+                datetime.fromisoformat(created_str), int(expense_id))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
 @app.route('/api/expenses', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version()
 def get_expenses():
     try:
         user_id = int(get_jwt_identity())
-        expenses = Expense.query.filter_by(user_id=user_id).order_by(Expense.date.desc(), Expense.created_at.desc()).all()
-        return jsonify([expense.to_dict() for expense in expenses]), 200
+        try:
+            conditions = _parse_expense_filters(request.args)
+            cursor = request.args.get('cursor')
+            limit = request.args.get('limit')
+            paginated = bool(cursor or limit)
+            if paginated:
+                if limit and not limit.isdigit():
+                    raise ValueError('Invalid limit')
+                limit = min(max(int(limit or 50), 1), EXPENSES_PAGE_MAX)
+                if cursor:
+                    # Keyset: everything strictly after the last row of the previous page
+                    conditions.append(db.tuple_(Expense.date, Expense.created_at, Expense.id) < _decode_cursor(cursor))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Column tuples straight into the encoder, no ORM instances
+        query = db.select(*EXPENSE_ROW_COLUMNS).where(Expense.user_id == user_id, *conditions).order_by(*EXPENSE_ORDER)
+        if not paginated:
+            # Without limit/cursor keep returning the full list as before, encoded and sent a batch at a time
+            def generate():
+                result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_ROWS))
+                try:
+                    yield from iter_json_array([expense_dict(row) for row in rows] for rows in result.partitions())
+                finally:
+                    result.close()
+            return Response(stream_with_context(generate()), mimetype='application/json'), 200
+
+        # One extra row tells us whether there is a next page
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return Response(dumps({
+            'expenses': [expense_dict(row) for row in rows],
+            'next_cursor': _encode_cursor(rows[-1]) if has_more else None,
+            'limit': limit
+        }), mimetype='application/json'), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _encode_rank_cursor(rank, expense_id):
+    return base64.urlsafe_b64encode(json.dumps([rank, expense_id], separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_rank_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, expense_id = json.loads(raw)
+        return float(rank), int(expense_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+@app.route('/api/expenses/search', methods=['GET'])
+@jwt_required()
+@conditional_on_data_version()
+def search_expenses():
+    """Search merchant and description through the search index, with prefix and fuzzy matching.
+
+    sort=relevance (default) ranks the best matches first, sort=date keeps
+    the list order. Takes the list filters and pages with limit/cursor.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        query_text = (request.args.get('q') or '').strip()
+        sort = request.args.get('sort', 'relevance')
+        try:
+            if not query_text:
+                raise ValueError('q is required')
+            if sort not in ('relevance', 'date'):
+                raise ValueError("sort must be 'relevance' or 'date'")
+            conditions = _parse_expense_filters(request.args)
+            limit = request.args.get('limit')
+            if limit and not limit.isdigit():
+                raise ValueError('Invalid limit')
+            limit = min(max(int(limit or 50), 1), EXPENSES_PAGE_MAX)
+            cursor = request.args.get('cursor')
+            after = (_decode_cursor(cursor) if sort == 'date' else _decode_rank_cursor(cursor)) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        plan = expense_search.plan(db.session.connection(), user_id, query_text)
+        if plan is None:
+            return jsonify({'expenses': [], 'next_cursor': None, 'limit': limit, 'fuzzy': {}}), 200
+
+        if sort == 'date':
+            # No rank needed, the matches only filter the user's expenses in list order
+            query = db.select(*EXPENSE_ROW_COLUMNS).where(Expense.user_id == user_id, *plan.where, *conditions)
+            if after:
+                query = query.where(db.tuple_(Expense.date, Expense.created_at, Expense.id) < after)
+            query = query.order_by(*EXPENSE_ORDER)
+        else:
+            query = db.select(*EXPENSE_ROW_COLUMNS, plan.rank.label('rank'))
+            if plan.join is not None:
+                query = query.select_from(Expense.__table__.join(*plan.join))
+            else:
+                query = query.where(*plan.where)
+            query = query.where(Expense.user_id == user_id, *conditions)
+            if after:
+                query = query.where(db.or_(plan.rank > after[0], db.and_(plan.rank == after[0], Expense.id > after[1])))
+            query = query.order_by(plan.rank, Expense.id)
+
+        # One extra row tells us whether there is a next page
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            next_cursor = _encode_cursor(rows[-1]) if sort == 'date' else _encode_rank_cursor(rows[-1].rank, rows[-1].id)
+        return Response(dumps({
+            'expenses': [expense_dict(row[:len(EXPENSE_FIELDS)]) for row in rows],
+            'next_cursor': next_cursor,
+            'limit': limit,
+            'fuzzy': plan.fuzzy
+        }), mimetype='application/json'), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+EXPORT_CSV_COLUMNS = ['id', 'date', 'merchant', 'description', 'category', 'payment_method', 'amount', 'created_at']
+
+@app.route('/api/expenses/export', methods=['GET'])
+@jwt_required()
+def export_expenses():
+    """Stream the user's expenses as CSV (default) or NDJSON, newest first, with the list filters.
+
+    Rows come from a server-side cursor EXPORT_BATCH_ROWS at a time and each
+    batch is written out before the next is fetched, so memory stays flat
+    however many expenses there are.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        fmt = request.args.get('format', 'csv')
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': "format must be 'csv' or 'ndjson'"}), 400
+        try:
+            conditions = _parse_expense_filters(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Plain column tuples, no ORM objects to build or keep in the identity map
+        query = db.select(*EXPENSE_ROW_COLUMNS).where(Expense.user_id == user_id, *conditions).order_by(*EXPENSE_ORDER).execution_options(
+            yield_per=EXPORT_BATCH_ROWS
+        )
+
+        def generate_csv(result):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            # Header first, so the download starts before the query returns anything
+            writer.writerow(EXPORT_CSV_COLUMNS)
+            yield buffer.getvalue()
+            for rows in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(
+                    (expense_id, day.isoformat(), merchant, description, category, payment_method,
+                     format_minor(amount_cents), created_at.isoformat() if created_at else '')
+                    for expense_id, merchant, amount_cents, description, category, payment_method, day, created_at, _ in rows
+                )
+                yield buffer.getvalue()
+
+        def generate_ndjson(result):
+            # Same fields as Expense.to_dict()
+            return iter_ndjson([expense_dict(row) for row in rows] for rows in result.partitions())
+
+        def generate():
+            result = db.session.execute(query)
+            try:
+                yield from (generate_csv(result) if fmt == 'csv' else generate_ndjson(result))
+            finally:
+                result.close()
+
+        filename = f"expenses-{datetime.utcnow().date().isoformat()}.{fmt}"
+        response = Response(
+            stream_with_context(generate()),
+            mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Ask reverse proxies to pass chunks through instead of buffering the whole export
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response, 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+EXPENSE_REQUIRED_FIELDS = ['merchant', 'description', 'amount', 'category', 'payment_method', 'date']
+
+@functools.lru_cache(maxsize=4096)
+def _parse_expense_date(value):
+    # Cached, imports repeat the same few hundred dates
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _validate_expense(data):
+    """Check a new expense's fields. Returns (Expense column values, None) or (None, error message)."""
+    for field in EXPENSE_REQUIRED_FIELDS:
+        field_value = data.get(field)
+        if field not in data or not field_value or str(field_value).strip() == '':
+            return None, f'{field} is required'
+    
+    # Validate amount
+    try:
+        amount_cents = to_minor(data['amount'])
+        if amount_cents <= 0:
+            return None, 'Amount must be greater than 0'
+    except ValueError:
+        return None, 'Invalid amount format'
+    
+    # Validate description and category
+    merchant_stripped = data['merchant'].strip()
+    desc_stripped = data['description'].strip()
+    cat_stripped = data['category'].strip()
+    payment_method_stripped = data['payment_method'].strip()
+
+    if not desc_stripped:
+        return None, 'Description cannot be empty'
+    if not cat_stripped:
+        return None, 'Category cannot be empty'
+
+    # Validate date
+    try:
+        expense_date = _parse_expense_date(data['date'])
+    except ValueError:
+        return None, 'Invalid date format. Use YYYY-MM-DD'
+
+    return {
+        'merchant': merchant_stripped,
+        'description': desc_stripped,
+        'amount_cents': amount_cents,
+        'category': cat_stripped,
+        'payment_method': payment_method_stripped,
+        'date': expense_date
+    }, None
+
+def _validate_expense_patch(data):
+    """Check the fields an update sets. Returns (Expense column values, None) or (None, error message)."""
+    fields = {}
+    for field in ('merchant', 'description', 'category', 'payment_method'):
+        if field in data:
+            if not isinstance(data[field], str):
+                return None, f'{field} must be a string'
+            fields[field] = data[field].strip()
+
+    if 'amount' in data:
+        try:
+            amount_cents = to_minor(data['amount'])
+            if amount_cents <= 0:
+                return None, 'Amount must be greater than 0'
+            fields['amount_cents'] = amount_cents
+        except ValueError:
+            return None, 'Invalid amount format'
+
+    if 'date' in data:
+        try:
+            if not isinstance(data['date'], str):
+                raise ValueError(data['date'])
+            fields['date'] = _parse_expense_date(data['date'])
+        except ValueError:
+            return None, 'Invalid date format. Use YYYY-MM-DD'
+
+    return fields, None
+
 @app.route('/api/expenses', methods=['POST'])
 @jwt_required()
 def add_expense():
@@ -176,49 +682,21 @@ def add_expense():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        required_fields = ['merchant', 'description', 'amount', 'category', 'payment_method', 'date']
-        for field in required_fields:
-            field_value = data.get(field)
-            if field not in data or not field_value or str(field_value).strip() == '':
-                return jsonify({'error': f'{field} is required'}), 400
-        
-        # Validate amount
-        try:
-            amount = float(data['amount'])
-            if amount <= 0:
-                return jsonify({'error': 'Amount must be greater than 0'}), 400
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid amount format'}), 400
-        
-        # Validate description and category
-        merchant_stripped = data['merchant'].strip()
-        desc_stripped = data['description'].strip()
-        cat_stripped = data['category'].strip()
-        payment_method_stripped = data['payment_method'].strip()
-
-        if not desc_stripped:
-            return jsonify({'error': 'Description cannot be empty'}), 400
-        if not cat_stripped:
-            return jsonify({'error': 'Category cannot be empty'}), 400
-
-        # Validate date
-        try:
-            expense_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
-
-        expense = Expense(
-            merchant=merchant_stripped,
-            description=desc_stripped,
-            amount=amount,
-            category=cat_stripped,
-            payment_method=payment_method_stripped,
-            date=expense_date,
-            user_id=user_id
-        )
+        fields, error = _validate_expense(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        expense = Expense(**fields, user_id=user_id)
 
         db.session.add(expense)
+        _apply_rollup_delta(user_id, expense.date, expense.category, expense.amount_cents, 1)
+        _record_expense_change(user_id)
         db.session.commit()
+        categorization_cache.learn(user_id, expense.merchant, expense.description, expense.category)
+
+        # Link the receipt OCR output this expense was filled in from
+        if data.get('ocr_result_id'):
+            ocr_store.link_expense(data['ocr_result_id'], user_id, expense.id)
 
         return jsonify({
             'message': 'Expense added successfully',
@@ -242,35 +720,25 @@ def update_expense(expense_id):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Update fields if provided
-        if 'merchant' in data:
-            expense.merchant = data['merchant'].strip()
-            
-        if 'amount' in data:
-            try:
-                amount = float(data['amount'])
-                if amount <= 0:
-                    return jsonify({'error': 'Amount must be greater than 0'}), 400
-                expense.amount = amount
-            except (ValueError, TypeError):
-                return jsonify({'error': 'Invalid amount format'}), 400
-        
-        if 'description' in data:
-            expense.description = data['description'].strip()
-        
-        if 'category' in data:
-            expense.category = data['category'].strip()
+        fields, error = _validate_expense_patch(data)
+        if error:
+            return jsonify({'error': error}), 400
 
-        if 'payment_method' in data:
-            expense.payment_method = data['payment_method'].strip()
-
-        if 'date' in data:
-            try:
-                expense.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-            except ValueError:
-                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        previous = (expense.date, expense.category, expense.amount_cents)
+        previous_choice = (expense.merchant, expense.description, expense.category)
+        # Update fields if provided
+        for name, value in fields.items():
+            setattr(expense, name, value)
         
+        # Move the amount between rollup rows if the date, category or amount changed
+        if previous != (expense.date, expense.category, expense.amount_cents):
+            _apply_rollup_delta(user_id, previous[0], previous[1], -previous[2], -1)
+            _apply_rollup_delta(user_id, expense.date, expense.category, expense.amount_cents, 1)
+        _record_expense_change(user_id)
         db.session.commit()
+        choice = (expense.merchant, expense.description, expense.category)
+        if choice != previous_choice:
+            categorization_cache.learn_many(user_id, [(*previous_choice, -1), (*choice, 1)])
         
         return jsonify({
             'message': 'Expense updated successfully',
@@ -290,14 +758,130 @@ def delete_expense(expense_id):
         if not expense:
             return jsonify({'error': 'Expense not found'}), 404
         
+        choice = (expense.merchant, expense.description, expense.category)
         db.session.delete(expense)
+        _apply_rollup_delta(user_id, expense.date, expense.category, -expense.amount_cents, -1)
+        _record_expense_change(user_id)
         db.session.commit()
+        categorization_cache.learn(user_id, *choice, -1)
         
         return jsonify({'message': 'Expense deleted successfully'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+BULK_MAX_IDS = int(os.getenv('BULK_MAX_IDS', '1000'))
+
+@app.route('/api/expenses/bulk', methods=['POST'])
+@jwt_required()
+def bulk_update_expenses():
+    """Update or delete many expenses at once: {"ids": [...], "patch": {...}} or {"ids": [...], "delete": true}.
+
+    The patch is validated like PUT /api/expenses/<id> and applied with one
+    UPDATE (or one DELETE) limited to the caller's expenses, together with
+    the rollup changes, in a single transaction. Returns an outcome per id:
+    updated (with the saved expense), deleted or not_found.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        ids = data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return jsonify({'error': 'ids must be a non-empty list'}), 400
+        if any(isinstance(expense_id, bool) or not isinstance(expense_id, int) for expense_id in ids):
+            return jsonify({'error': 'ids must be integers'}), 400
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > BULK_MAX_IDS:
+            return jsonify({'error': f'At most {BULK_MAX_IDS} ids per request'}), 400
+
+        delete = data.get('delete') is True
+        patch = data.get('patch')
+        if delete == (patch is not None):
+            return jsonify({'error': 'Send either a patch or delete: true'}), 400
+        if not delete:
+            if not isinstance(patch, dict):
+                return jsonify({'error': 'patch must be an object'}), 400
+            fields, error = _validate_expense_patch(patch)
+            if error:
+                return jsonify({'error': error}), 400
+            if not fields:
+                return jsonify({'error': 'patch has no fields to update'}), 400
+
+        table = Expense.__table__
+        owned = db.and_(table.c.user_id == user_id, table.c.id.in_(ids))
+        # Ownership check and the old values for the rollups and the learned categories,
+        # locked until commit where supported
+        previous = db.session.execute(
+            db.select(table.c.id, table.c.date, table.c.category, table.c.amount_cents, table.c.merchant,
+                      table.c.description).where(owned).with_for_update()
+        ).all()
+        found = {row.id for row in previous}
+
+        deltas = {}
+        def add_delta(day, category, amount_cents, count):
+            totals = deltas.setdefault((day, category), [0, 0])
+            totals[0] += amount_cents
+            totals[1] += count
+
+        if found:
+            owned = db.and_(table.c.user_id == user_id, table.c.id.in_(list(found)))
+            if delete:
+                db.session.execute(table.delete().where(owned))
+                for row in previous:
+                    add_delta(row.date, row.category, -row.amount_cents, -1)
+            else:
+                db.session.execute(table.update().where(owned).values(**fields))
+                if {'date', 'category', 'amount_cents'} & fields.keys():
+                    for row in previous:
+                        add_delta(row.date, row.category, -row.amount_cents, -1)
+                        add_delta(fields.get('date', row.date), fields.get('category', row.category),
+                                  fields.get('amount_cents', row.amount_cents), 1)
+            # Moves that cancel out (e.g. the category was already the new one) need no write
+            deltas = {key: totals for key, totals in deltas.items() if totals != [0, 0]}
+            if deltas:
+                _apply_rollup_deltas(user_id, deltas)
+            _record_expense_change(user_id)
+            db.session.commit()
+            if delete:
+                categorization_cache.learn_many(
+                    user_id, ((row.merchant, row.description, row.category, -1) for row in previous))
+            elif {'merchant', 'description', 'category'} & fields.keys():
+                changes = []
+                for row in previous:
+                    changes.append((row.merchant, row.description, row.category, -1))
+                    changes.append((fields.get('merchant', row.merchant), fields.get('description', row.description),
+                                    fields.get('category', row.category), 1))
+                categorization_cache.learn_many(user_id, changes)
+
+        saved = {}
+        if found and not delete:
+            saved = {row[0]: expense_dict(row) for row in db.session.execute(
+                db.select(*EXPENSE_ROW_COLUMNS).where(Expense.user_id == user_id, Expense.id.in_(list(found)))
+            )}
+
+        status = 'deleted' if delete else 'updated'
+        results = []
+        for expense_id in ids:
+            if expense_id in saved:
+                results.append({'id': expense_id, 'status': status, 'expense': saved[expense_id]})
+            elif delete and expense_id in found:
+                results.append({'id': expense_id, 'status': status})
+            else:
+                results.append({'id': expense_id, 'status': 'not_found'})
+
+        return Response(dumps({
+            status: len(found),
+            'not_found': len(ids) - len(found),
+            'results': results
+        }), mimetype='application/json'), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/expenses/categorize', methods=['POST'])
 @jwt_required()
 def categorize_expense():
@@ -306,17 +890,237 @@ def categorize_expense():
         if not data or not data.get('description'):
             return jsonify({'error': 'Description is required'}), 400
         
+        user_id = int(get_jwt_identity())
         description = data['description'].strip()
-        category = ai_analyzer.categorize_expense(description)
+        # The user's own past choices and recent results answer most requests without the model
+        category, _, source = categorization_cache.lookup(user_id, description, data.get('merchant'))
+        if category is None:
+            category = ai_analyzer.categorize_expense(description)
+            categorization_cache.put(description, category)
+            source = 'categorizer'
         
         return jsonify({
             'suggested_category': category,
-            'description': description
+            'description': description,
+            'source': source
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+CATEGORIZE_BATCH_MAX = int(os.getenv('CATEGORIZE_BATCH_MAX', '500'))
+
+def _resolve_categories(user_id, descriptions):
+    """{normalized description: (category, confidence, source)} for a list of descriptions.
+
+    Descriptions that normalize the same are only resolved once: from the
+    user's history or the result cache, then in batches by the categorizer.
+    """
+    unique = {}
+    for description in descriptions:
+        unique.setdefault(normalize_description(description), description.strip())
+
+    resolved = {}
+    to_categorize = []
+    for key, description in unique.items():
+        category, confidence, source = categorization_cache.lookup(user_id, description)
+        if category is None:
+            to_categorize.append(key)
+        else:
+            resolved[key] = (category, confidence, source)
+
+    results = ai_analyzer.categorize_expenses([unique[key] for key in to_categorize])
+    for key, (category, confidence, source) in zip(to_categorize, results):
+        categorization_cache.put(unique[key], category, confidence)
+        resolved[key] = (category, confidence, source)
+    return resolved
+
+@app.route('/api/expenses/categorize/batch', methods=['POST'])
+@jwt_required()
+def categorize_expenses_batch():
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json()
+        descriptions = data.get('descriptions') if data else None
+        if not isinstance(descriptions, list) or not descriptions:
+            return jsonify({'error': 'descriptions must be a non-empty list'}), 400
+        if len(descriptions) > CATEGORIZE_BATCH_MAX:
+            return jsonify({'error': f'At most {CATEGORIZE_BATCH_MAX} descriptions per request'}), 400
+        if not all(isinstance(d, str) and d.strip() for d in descriptions):
+            return jsonify({'error': 'Every description must be a non-empty string'}), 400
+
+        resolved = _resolve_categories(user_id, descriptions)
+        items = []
+        for description in descriptions:
+            category, confidence, source = resolved[normalize_description(description)]
+            items.append({
+                'description': description.strip(),
+                'category': category,
+                'confidence': confidence,
+                'source': source
+            })
+        return jsonify({'results': items, 'unique': len(resolved)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/expenses/categorize/stats', methods=['GET'])
+def categorization_stats():
+    # Counters are for this web process
+    return jsonify(dict(categorization_cache.stats(), upstream=hf_client.stats())), 200
+
+def _load_user_categories(user_id):
+    # One row per distinct choice, statements repeat the same few payees
+    return db.session.query(
+        Expense.merchant, Expense.description, Expense.category, db.func.count()
+    ).filter_by(user_id=user_id).group_by(Expense.merchant, Expense.description, Expense.category).all()
+
+categorization_cache.loader = _load_user_categories
+
+IMPORT_CHUNK_ROWS = int(os.getenv('IMPORT_CHUNK_ROWS', '2000'))
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', '250000'))
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', '1000'))
+IMPORT_COLUMNS = ['merchant', 'description', 'amount_cents', 'category', 'payment_method', 'date', 'created_at', 'user_id']
+
+def _insert_expense_rows(rows):
+    """Insert many expense rows in the current transaction: COPY on PostgreSQL, executemany elsewhere."""
+    if db.engine.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([row[column].isoformat() if column in ('date', 'created_at') else row[column]
+                             for column in IMPORT_COLUMNS])
+        buffer.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY expense ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+    else:
+        db.session.execute(Expense.__table__.insert(), rows)
+
+@app.route('/api/expenses/import', methods=['POST'])
+@jwt_required()
+def import_expenses():
+    """Import a CSV or OFX statement, sent as a multipart 'file' or as the raw request body.
+
+    Rows are read as a stream and handled IMPORT_CHUNK_ROWS at a time: rows
+    without a category are categorized in one batch, every row is checked
+    with the add_expense rules, and the valid ones are inserted with one
+    multi-row statement. Invalid rows are reported and skipped; the valid
+    rows are committed together at the end.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        options = request.form if request.files else request.args
+        debits = options.get('debits', 'positive')
+        if debits not in ('positive', 'negative'):
+            return jsonify({'error': "debits must be 'positive' or 'negative'"}), 400
+        default_payment_method = (options.get('payment_method') or 'Imported').strip()
+
+        if 'file' in request.files:
+            upload = request.files['file']
+            stream, filename, content_type = upload.stream, upload.filename, upload.content_type
+        elif request.content_length:
+            stream, filename, content_type = request.stream, None, request.content_type
+        else:
+            return jsonify({'error': 'No statement provided'}), 400
+        stream = io.BufferedReader(stream) if not hasattr(stream, 'peek') else stream
+        fmt = options.get('format') or detect_format(filename, content_type, stream.peek(1024)[:1024])
+        if fmt not in ('csv', 'ofx'):
+            return jsonify({'error': "format must be 'csv' or 'ofx'"}), 400
+
+        now = datetime.utcnow()
+        report = {'imported': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+        rollups = {}  # (date, category) -> [amount_cents, count]
+        choices = Counter()  # (merchant, description, category) -> count
+
+        def flush(chunk):
+            # Categorize on the payee, a memo is often a free-form note ("ride"). Statements
+            # repeat the same few payees, resolve each distinct one once
+            uncategorized = list({data['merchant'] for _, data in chunk if not data['category']})
+            resolved = _resolve_categories(user_id, uncategorized) if uncategorized else {}
+            categories = {merchant: resolved[normalize_description(merchant)][0] for merchant in uncategorized}
+            rows = []
+            for row_number, data in chunk:
+                if not data['category']:
+                    data['category'] = categories[data['merchant']]
+                try:
+                    fields, error = _validate_expense(data)
+                except (ArithmeticError, TypeError, ValueError) as e:
+                    # One unreadable row is that row's failure, not the whole import's
+                    fields, error = None, f'Invalid row: {e}'
+                if error:
+                    report['failed'] += 1
+                    if len(report['errors']) < IMPORT_MAX_ERRORS:
+                        report['errors'].append({'row': row_number, 'error': error})
+                    continue
+                rows.append(dict(fields, created_at=now, user_id=user_id))
+                choices[fields['merchant'], fields['description'], fields['category']] += 1
+                totals = rollups.setdefault((fields['date'], fields['category']), [0, 0])
+                totals[0] += fields['amount_cents']
+                totals[1] += 1
+            if rows:
+                _insert_expense_rows(rows)
+                report['imported'] += len(rows)
+
+        chunk = []
+        seen = 0
+        for row_number, data in iter_statement(stream, fmt, debits):
+            seen += 1
+            if seen > IMPORT_MAX_ROWS:
+                db.session.rollback()
+                return jsonify({'error': f'At most {IMPORT_MAX_ROWS} rows per import'}), 400
+            if data is None:
+                report['skipped'] += 1
+                continue
+            # Statements often have only one of the two
+            data['merchant'] = data['merchant'] or data['description']
+            data['description'] = data['description'] or data['merchant']
+            data['payment_method'] = data['payment_method'] or default_payment_method
+            chunk.append((row_number, data))
+            if len(chunk) >= IMPORT_CHUNK_ROWS:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+        if report['imported']:
+            _apply_rollup_deltas(user_id, rollups)
+            _record_expense_change(user_id)
+        db.session.commit()
+        categorization_cache.learn_many(user_id, ((*choice, count) for choice, count in choices.items()))
+
+        report['errors_truncated'] = report['failed'] > len(report['errors'])
+        return jsonify(report), 200
+
+    except StatementFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+RECEIPT_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp'}
+# A batch larger than the queue could never be accepted, so it is capped at the queue depth
+RECEIPT_BATCH_MAX = min(int(os.getenv('RECEIPT_BATCH_MAX', '20')), receipt_queue.max_depth)
+RECEIPT_MAX_IMAGE_BYTES = int(os.getenv('RECEIPT_MAX_IMAGE_BYTES', str(10 * 1024 * 1024)))
+
+class UploadTooLargeError(ValueError):
+    pass
+
+def _read_upload(file):
+    """Read an uploaded image into memory, refusing anything over RECEIPT_MAX_IMAGE_BYTES."""
+    image_bytes = file.read(RECEIPT_MAX_IMAGE_BYTES + 1)
+    if len(image_bytes) > RECEIPT_MAX_IMAGE_BYTES:
+        raise UploadTooLargeError(f'{file.filename} is larger than {RECEIPT_MAX_IMAGE_BYTES // (1024 * 1024)} MB')
+    return image_bytes
+
+def _unknown_preset_response(preset):
+    if preset and preset not in OCR_PRESETS:
+        return jsonify({'error': f"Unknown preset. Choose from: {', '.join(OCR_PRESETS)}"}), 400
+    return None
+
 @app.route('/api/expenses/upload-receipt', methods=['POST'])
 @jwt_required()
 def upload_receipt():
@@ -331,106 +1135,263 @@ def upload_receipt():
         if file.filename == '':
             return jsonify({'error': 'No selected file'}), 400
         
-        # testing
-        filename = secure_filename(file.filename)
+        filename = secure_filename(file.filename) or 'receipt'
 
-        # save file temporarily
-        temp_dir = os.path.join(os.getcwd(), 'temp')
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, file.filename)
-        file.save(temp_path)
+        preset = request.form.get('preset') or None
+        error_response = _unknown_preset_response(preset)
+        if error_response:
+            return error_response
 
-        # OCR
-        print("Starting OCR...")  # debug
-        ocr_text = extract_receipt_data(temp_path)
+        # The upload is decoded from memory, nothing is written to disk
+        image_bytes = _read_upload(file)
 
-        # save OCR output to a .txt file for testing
-        output_dir = os.path.join(os.getcwd(), 'ocr_outputs')
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # create a unique filename for the output text file
-        base_filename, _ = os.path.splitext(filename)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"{base_filename}_{timestamp}.txt"
-        output_path = os.path.join(output_dir, output_filename)
+        # Re-uploads of the same photo are answered from the OCR cache without queueing
+        cached = cached_ocr(image_bytes, preset)
+        if cached is not None:
+            image_hash = hashlib.sha256(image_bytes).hexdigest()
+            job_id = receipt_queue.complete(user_id, record_receipt(cached, image_hash, user_id, filename))
+            return jsonify({
+                'job_id': job_id,
+                'status': 'done',
+                'status_url': f'/api/expenses/upload-receipt/{job_id}'
+            }), 200
 
-        # write the extracted text to the file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(ocr_text)
-            
-        print(f"✅ OCR text successfully saved to: {output_path}")
-        
-        # Parse OCR text with GPT-2
-        expense_data = parse_receipt(ocr_text)
+        # OCR and parsing run in the worker pool, the client polls for the result
+        try:
+            job_id = receipt_queue.submit(user_id, process_receipt, image_bytes, user_id, filename, preset)
+        except QueueFullError as e:
+            response = jsonify({'error': str(e)})
+            response.headers['Retry-After'] = '5'
+            return response, 429
+
+        return jsonify({
+            'job_id': job_id,
+            'status': 'pending',
+            'status_url': f'/api/expenses/upload-receipt/{job_id}'
+        }), 202
+    
+    except (UploadTooLargeError, RequestEntityTooLarge) as e:
+        return jsonify({'error': str(e)}), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/expenses/upload-receipt/<job_id>', methods=['GET'])
+@jwt_required()
+def get_receipt_job(job_id):
+    try:
+        user_id = int(get_jwt_identity())
+        job = receipt_queue.get(job_id, user_id)
+
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
 
         # Attach user_id for saving immediately
-        expense_data['user_id'] = user_id
+        if 'parsed_expense' in job:
+            job['parsed_expense'] = dict(job['parsed_expense'], user_id=user_id)
+
+        return jsonify(job), 200
 
-        return jsonify({'parsed_expense': expense_data}), 200
-    
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _collect_batch_images(files):
+    """Return [(filename, bytes)] from uploaded images and/or zip archives."""
+    images = []
+    for file in files:
+        name = file.filename or ''
+        if name.lower().endswith('.zip'):
+            # Uploads are seekable (memory or spooled temp file), read the archive in place
+            with zipfile.ZipFile(file.stream) as archive:
+                for info in archive.infolist():
+                    _, ext = os.path.splitext(info.filename.lower())
+                    if info.is_dir() or ext not in RECEIPT_IMAGE_EXTENSIONS:
+                        continue
+                    if info.file_size > RECEIPT_MAX_IMAGE_BYTES:
+                        raise UploadTooLargeError(f'{info.filename} is larger than {RECEIPT_MAX_IMAGE_BYTES // (1024 * 1024)} MB')
+                    images.append((os.path.basename(info.filename), archive.read(info)))
+                    if len(images) > RECEIPT_BATCH_MAX:
+                        break
+        elif name:
+            images.append((name, _read_upload(file)))
+        if len(images) > RECEIPT_BATCH_MAX:
+            raise ValueError(f'A batch can contain at most {RECEIPT_BATCH_MAX} receipts')
+    return images
+
+@app.route('/api/expenses/upload-receipts', methods=['POST'])
+@jwt_required()
+def upload_receipts_batch():
+    try:
+        user_id = int(get_jwt_identity())
+        files = request.files.getlist('files') + request.files.getlist('file')
+        if not files:
+            return jsonify({'error': 'No files in the request'}), 400
+
+        try:
+            images = _collect_batch_images(files)
+        except UploadTooLargeError:
+            raise
+        except (ValueError, zipfile.BadZipFile) as e:
+            return jsonify({'error': str(e)}), 400
+        if not images:
+            return jsonify({'error': 'No receipt images found'}), 400
+
+        preset = request.form.get('preset') or None
+        error_response = _unknown_preset_response(preset)
+        if error_response:
+            return error_response
+
+        filenames = [secure_filename(name) or 'receipt' for name, _ in images]
+        try:
+            futures = receipt_queue.submit_batch(
+                process_receipt,
+                [(data, user_id, filename, preset) for filename, (_, data) in zip(filenames, images)],
+            )
+        except QueueFullError as e:
+            response = jsonify({'error': str(e)})
+            response.headers['Retry-After'] = '5'
+            return response, 429
+        del images  # the workers have their own copies now
+
+        # Stream one JSON line per receipt as each one finishes
+        def generate():
+            for index, result, error in receipt_queue.iter_completed(futures):
+                line = {'index': index, 'filename': filenames[index]}
+                if error:
+                    line.update(status='failed', error=str(error))
+                else:
+                    line.update(result, status='done')
+                    line['parsed_expense'] = dict(result['parsed_expense'], user_id=user_id)
+                yield json.dumps(line) + '\n'
+
+        return Response(generate(), mimetype='application/x-ndjson'), 200
+
+    except (UploadTooLargeError, RequestEntityTooLarge) as e:
+        return jsonify({'error': str(e)}), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/ocr/results', methods=['GET'])
+@jwt_required()
+def list_ocr_results():
+    try:
+        user_id = int(get_jwt_identity())
+        limit = min(request.args.get('limit', 50, type=int), 200)
+        expense_id = request.args.get('expense_id', type=int)
+        results = ocr_store.find(
+            user_id=user_id,
+            image_hash=request.args.get('image_hash'),
+            expense_id=expense_id,
+            limit=limit,
+        )
+        return jsonify(results), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/ocr/results/<int:result_id>', methods=['GET'])
+@jwt_required()
+def get_ocr_result(result_id):
+    try:
+        user_id = int(get_jwt_identity())
+        result = ocr_store.get(result_id, user_id=user_id)
+        if not result:
+            return jsonify({'error': 'OCR result not found'}), 404
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/ocr/status', methods=['GET'])
+def ocr_status():
+    # Cache counters are for lookups made by this web process
+    return jsonify(dict(receipt_queue.stats(), cache=ocr_cache.stats(), store=ocr_store.stats())), 200
+
 
 
 # Dashboard
 @app.route('/api/dashboard/summary', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version(per_day=True)
 def get_dashboard_summary():
     try:
         user_id = int(get_jwt_identity())
         
-        # Get current month expenses for pie chart
-        current_month_start = datetime.now().replace(day=1).date()
-        next_month = current_month_start.replace(month=current_month_start.month + 1) if current_month_start.month < 12 else current_month_start.replace(year=current_month_start.year + 1, month=1)
-        
-        current_month_expenses = Expense.query.filter(
-            Expense.user_id == user_id,
-            Expense.date >= current_month_start,
-            Expense.date < next_month
-        ).all()
-        
-        # Category breakdown for pie chart
-        category_totals = {}
-        for expense in current_month_expenses:
-            category = expense.category
-            if category in category_totals:
-                category_totals[category] += expense.amount
-            else:
-                category_totals[category] = expense.amount
+        today = datetime.now().date()
+        current_month_start = today.replace(day=1)
+        thirty_days_ago = today - timedelta(days=30)
         
-        # Last 30 days for bar chart
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).date()
-        last_30_days_expenses = Expense.query.filter(
-            Expense.user_id == user_id,
-            Expense.date >= thirty_days_ago
+        # Both charts read the pre-aggregated rollups: one row per category for the month,
+        # one row per day and category for the last 30 days
+        month_rows = db.session.query(MonthlySpending.category, MonthlySpending.total_cents).filter(
+            MonthlySpending.user_id == user_id,
+            MonthlySpending.month == current_month_start
         ).all()
+        day_rows = db.session.query(DailySpending.date, db.func.sum(DailySpending.total_cents)).filter(
+            DailySpending.user_id == user_id,
+            DailySpending.date >= thirty_days_ago
+        ).group_by(DailySpending.date).all()
         
-        # Daily totals for bar chart
-        daily_totals = {}
-        for expense in last_30_days_expenses:
-            date_str = expense.date.isoformat()
-            if date_str in daily_totals:
-                daily_totals[date_str] += expense.amount
-            else:
-                daily_totals[date_str] = expense.amount
-        
-        # Fill in missing days with 0
-        current_date = thirty_days_ago
-        while current_date <= datetime.now().date():
-            date_str = current_date.isoformat()
-            if date_str not in daily_totals:
-                daily_totals[date_str] = 0
-            current_date += timedelta(days=1)
+        # Category breakdown for pie chart, daily totals for bar chart (missing days are 0).
+        # Sums stay in integer cents and are only converted for the response.
+        category_totals = dict(month_rows)
+        daily_totals = {(thirty_days_ago + timedelta(days=i)).isoformat(): 0 for i in range(31)}
+        for day, total_cents in day_rows:
+            daily_totals[day.isoformat()] = total_cents
         
         # Sort daily totals by date
         sorted_daily_totals = dict(sorted(daily_totals.items()))
         
         return jsonify({
-            'category_breakdown': category_totals,
-            'daily_spending': sorted_daily_totals,
-            'total_current_month': sum(category_totals.values()),
-            'total_last_30_days': sum(daily_totals.values())
+            'category_breakdown': {category: from_minor(cents) for category, cents in category_totals.items()},
+            'daily_spending': {day: from_minor(cents) for day, cents in sorted_daily_totals.items()},
+            'total_current_month': from_minor(sum_minor(category_totals.values())),
+            'total_last_30_days': from_minor(sum_minor(daily_totals.values()))
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _spending_by_category(user_id, start_date, end_date=None):
+    """{category: (total_cents, count)} between two dates (inclusive), summed from the daily rollups."""
+    query = db.session.query(
+        DailySpending.category, db.func.sum(DailySpending.total_cents), db.func.sum(DailySpending.count)
+    ).filter(DailySpending.user_id == user_id)
+    if start_date:
+        query = query.filter(DailySpending.date >= start_date)
+    if end_date:
+        query = query.filter(DailySpending.date <= end_date)
+    return {category: (total, count) for category, total, count in query.group_by(DailySpending.category)}
+
+def _compute_insights(user_id):
+    # Runs on an insights worker thread, outside any request
+    with app.app_context():
+        thirty_days_ago = (datetime.now() - timedelta(days=30)).date()
+        spending = _spending_by_category(user_id, thirty_days_ago)
+
+        category_totals = {category: from_minor(cents) for category, (cents, _) in spending.items()}
+        expense_count = sum(count for _, count in spending.values())
+        return {
+            'insights': ai_analyzer.insights_from_totals(category_totals, expense_count),
+            'total_expenses': expense_count
+        }
+
+@app.route('/api/dashboard/spending', methods=['GET'])
+@jwt_required()
+@conditional_on_data_version()
+def get_spending_summary():
+    try:
+        user_id = int(get_jwt_identity())
+        try:
+            start_date = _parse_date_arg(request.args, 'start_date')
+            end_date = _parse_date_arg(request.args, 'end_date')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        spending = _spending_by_category(user_id, start_date, end_date)
+        return jsonify({
+            'category_breakdown': {category: from_minor(cents) for category, (cents, _) in spending.items()},
+            'total': from_minor(sum_minor(cents for cents, _ in spending.values())),
+            'count': sum(count for _, count in spending.values()),
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None
         }), 200
         
     except Exception as e:
@@ -442,25 +1403,25 @@ def get_ai_insights():
     try:
         user_id = int(get_jwt_identity())
         
-        # Get last 30 days of expenses
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).date()
-        expenses = Expense.query.filter(
-            Expense.user_id == user_id,
-            Expense.date >= thirty_days_ago
-        ).all()
-        
-        expenses_data = [expense.to_dict() for expense in expenses]
-        insights = ai_analyzer.get_spending_insights(expenses_data)
+        # The 30 day window moves every day, so the date is part of the version too
+        version = (_user_data_version(user_id), datetime.now().date().isoformat())
+        result, status, computed_at = insights_cache.get(user_id, version, _compute_insights)
         
         return jsonify({
-            'insights': insights,
+            'insights': result['insights'] if result else None,
             'period': '30 days',
-            'total_expenses': len(expenses_data)
+            'total_expenses': result['total_expenses'] if result else None,
+            'status': status,
+            'computed_at': datetime.utcfromtimestamp(computed_at).isoformat() if computed_at else None
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/insights/stats', methods=['GET'])
+def insights_stats():
+    return jsonify(insights_cache.stats()), 200
+
 @app.route('/', methods=['GET'])
 def root():
     return jsonify({
@@ -499,12 +1460,115 @@ def root():
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
+# CLI
+ocr_store_cli = AppGroup('ocr-store', help='Maintain the OCR output store.')
+
+@ocr_store_cli.command('purge')
+@click.option('--days', type=int, default=None, help='Delete results older than this (default OCR_STORE_RETENTION_DAYS).')
+@click.option('--keep-per-user', type=int, default=None, help='Keep only the newest N results per user.')
+@click.option('--include-linked', is_flag=True, help='Also delete results linked to an expense.')
+def ocr_store_purge(days, keep_per_user, include_linked):
+    deleted = ocr_store.purge(days, keep_per_user, keep_linked=not include_linked)
+    print(f"Deleted {deleted} OCR results")
+
+@ocr_store_cli.command('compact')
+def ocr_store_compact():
+    before = ocr_store.stats()['size_bytes']
+    ocr_store.compact()
+    print(f"Compacted OCR store: {before} -> {ocr_store.stats()['size_bytes']} bytes")
+
+@ocr_store_cli.command('import-legacy')
+@click.argument('directory', default='ocr_outputs')
+def ocr_store_import_legacy(directory):
+    print(f"Imported {ocr_store.import_text_files(directory)} OCR text files from {directory}")
+
+app.cli.add_command(ocr_store_cli)
+
+rollups_cli = AppGroup('rollups', help='Maintain the daily/monthly spending rollups.')
+
+def _expected_rollups(user_id=None):
+    """Rollup rows recomputed from Expense: ({(user, date, category): [total_cents, count]}, monthly)."""
+    query = db.session.query(
+        Expense.user_id, Expense.date, Expense.category, db.func.sum(Expense.amount_cents), db.func.count(Expense.id)
+    ).group_by(Expense.user_id, Expense.date, Expense.category)
+    if user_id is not None:
+        query = query.filter(Expense.user_id == user_id)
+
+    daily, monthly = {}, {}
+    for row_user, day, category, total, count in query:
+        daily[(row_user, day, category)] = [total, count]
+        month = monthly.setdefault((row_user, day.replace(day=1), category), [0, 0])
+        month[0] += total
+        month[1] += count
+    return daily, monthly
+
+def _stored_rollups(model, key_column, user_id=None):
+    query = db.session.query(model)
+    if user_id is not None:
+        query = query.filter(model.user_id == user_id)
+    return {(row.user_id, getattr(row, key_column), row.category): [row.total_cents, row.count] for row in query}
+
+@rollups_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only this user (default: everyone).')
+@click.option('--verify', is_flag=True, help='Compare the stored rollups with the expenses and report, without writing.')
+def rollups_rebuild(user_id, verify):
+    daily, monthly = _expected_rollups(user_id)
+
+    if verify:
+        mismatches = 0
+        for model, key_column, expected in ((DailySpending, 'date', daily), (MonthlySpending, 'month', monthly)):
+            stored = _stored_rollups(model, key_column, user_id)
+            for key in sorted(set(expected) | set(stored), key=str):
+                want, have = expected.get(key, [0, 0]), stored.get(key, [0, 0])
+                if want != have:
+                    mismatches += 1
+                    print(f"{model.__tablename__} {key}: expected {want}, stored {have}")
+        print(f"{mismatches} mismatched rollup rows")
+        if mismatches:
+            raise SystemExit(1)
+        return
+
+    for model in (DailySpending, MonthlySpending):
+        query = db.session.query(model)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        query.delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(DailySpending, [
+        {'user_id': u, 'date': d, 'category': c, 'total_cents': total, 'count': count}
+        for (u, d, c), (total, count) in daily.items()
+    ])
+    db.session.bulk_insert_mappings(MonthlySpending, [
+        {'user_id': u, 'month': m, 'category': c, 'total_cents': total, 'count': count}
+        for (u, m, c), (total, count) in monthly.items()
+    ])
+    db.session.commit()
+    print(f"Rebuilt {len(daily)} daily and {len(monthly)} monthly rollup rows")
+
+app.cli.add_command(rollups_cli)
+
+search_cli = AppGroup('search', help='Maintain the expense search index.')
+
+@search_cli.command('rebuild')
+def search_rebuild():
+    """Create the search index and triggers if missing and rebuild it from the expenses."""
+    start = time.perf_counter()
+    with db.engine.begin() as connection:
+        expense_search.rebuild(connection)
+    print(f"Rebuilt the {db.engine.dialect.name} search index in {time.perf_counter() - start:.1f}s")
+
+app.cli.add_command(search_cli)
+
 if __name__ == '__main__':
     # For local development only
     with app.app_context():
         try:
             db.create_all()
+            with db.engine.begin() as connection:
+                expense_search.ensure_schema(connection)
             print("Local: Database tables created")
         except Exception as e:
             print(f"Local: Database error: {e}")
+    if os.getenv('OCR_WARM_ON_START', 'true').lower() == 'true' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # Start the OCR workers (reloader child only) so the first receipt upload is fast
+        receipt_queue.warm_up()
     app.run(debug=True, host='0.0.0.0', port=5001)
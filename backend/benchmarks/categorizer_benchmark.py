@@ -0,0 +1,71 @@
+"""Keyword categorizer vs. the old if/elif substring chain.
+
+Usage (from backend/):
+    python benchmarks/categorizer_benchmark.py [--runs N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_categorizer import DEFAULT_KEYWORDS, KeywordCategorizer
+
+DESCRIPTIONS = [
+    'Starbucks coffee', 'Ralphs groceries', 'Uber to airport', 'Shell gas station', 'Monthly rent',
+    'Netflix', 'Dinner at Olive Garden restaurant', 'CVS pharmacy prescription', 'Delta flight to NYC',
+    'Marriott hotel 2 nights', 'Vanguard IRA contribution', 'Birthday gift for mom', 'Red Cross donation',
+    'Bank service fee', 'Comcast internet', 'Verizon phone bill', 'Petco dog food', 'Planet Fitness gym',
+    'Amazon laptop stand', 'Walmart', 'Target', 'Home Depot', 'Parking downtown', 'Lunch',
+    'Costco', 'Spotify premium subscription', 'AMC movie tickets', 'Property tax payment',
+    'Dentist cleaning', 'Guitar music lesson',
+]
+
+
+def legacy_categorize(description):
+    """Same work as the old _fallback_categorization: rebuild the lists, then scan category by category."""
+    description_lower = description.lower()
+    table = [(category, list(keywords)) for category, keywords in DEFAULT_KEYWORDS]
+    for category, keywords in table:
+        if any(keyword in description_lower for keyword in keywords):
+            return category
+    return 'Other'
+
+
+def timed(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) / runs, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=2000)
+    args = parser.parse_args()
+
+    categorizer = KeywordCategorizer(word_boundaries=False)
+    bounded = KeywordCategorizer(word_boundaries=True)
+    count = len(DESCRIPTIONS)
+
+    legacy_time, expected = timed(lambda: [legacy_categorize(d) for d in DESCRIPTIONS], args.runs)
+    single_time, single = timed(lambda: [categorizer.categorize(d) for d in DESCRIPTIONS], args.runs)
+    many_time, many = timed(lambda: categorizer.categorize_many(DESCRIPTIONS), args.runs)
+    bounded_time, bounded_results = timed(lambda: bounded.categorize_many(DESCRIPTIONS), args.runs)
+
+    if single != expected or many != expected:
+        sys.exit("Compiled categorizer disagrees with the legacy chain")
+
+    print(f"{count} descriptions, {args.runs} runs")
+    print(f"legacy chain          {legacy_time / count * 1e6:7.2f}us per description")
+    print(f"categorize            {single_time / count * 1e6:7.2f}us per description ({legacy_time / single_time:.1f}x)")
+    print(f"categorize_many       {many_time / count * 1e6:7.2f}us per description ({legacy_time / many_time:.1f}x)")
+    print(f"word boundaries       {bounded_time / count * 1e6:7.2f}us per description")
+    changed = [(d, old, new) for d, old, new in zip(DESCRIPTIONS, expected, bounded_results) if old != new]
+    for description, old, new in changed:
+        print(f"    word boundaries: {description!r} {old} -> {new}")
+
+
+if __name__ == '__main__':
+    main()
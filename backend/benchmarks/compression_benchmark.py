@@ -0,0 +1,105 @@
+"""Bytes on the wire and compression CPU per endpoint for each encoding and level.
+
+Seeds one user through the import endpoint into a scratch database, fetches
+each endpoint uncompressed through the Flask test client, then compresses
+the body the way compression.py does (chunk by chunk with a flush for
+streamed responses). Transfer time is estimated for a slow mobile link
+(--mbps, default 1.6, roughly "slow 4G").
+
+Usage (from backend/):
+    python benchmarks/compression_benchmark.py [--rows 2000] [--mbps 1.6] [--runs 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MERCHANTS = ['Whole Foods Market', 'Shell Gas 4455', 'Starbucks Coffee #123', 'Uber Trip', 'Netflix.com',
+             'Joes Pizza', 'CVS Pharmacy', 'Amazon Marketplace', 'Target Store 0921', 'Delta Airlines']
+
+ENDPOINTS = [
+    '/api/expenses?limit=50',
+    '/api/expenses?limit=200',
+    '/api/expenses',
+    '/api/expenses/export',
+    '/api/dashboard/summary',
+]
+
+LEVELS = {'gzip': [1, 6, 9], 'br': [1, 4, 6, 11], 'zstd': [1, 3, 9, 19]}
+
+
+def statement(rows):
+    today = date.today()
+    lines = ['date,description,amount']
+    for _ in range(rows):
+        day = today - timedelta(days=random.randint(0, 365))
+        lines.append(f'{day.isoformat()},{random.choice(MERCHANTS)},{random.randint(100, 20000) / 100}')
+    return '\n'.join(lines).encode()
+
+
+def compress_chunks(chunks, coding, level):
+    from compression import _compressor
+    compress_chunk, flush, finish = _compressor(coding, level)
+    if len(chunks) == 1:
+        return compress_chunk(chunks[0]) + finish()
+    return b''.join(compress_chunk(chunk) + flush() for chunk in chunks) + finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'compression_benchmark.db')}")
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--mbps', type=float, default=1.6)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+    os.environ['OCR_WARM_ON_START'] = 'false'
+    from app import app, db
+    from compression import response_compressor
+
+    random.seed(42)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    client = app.test_client()
+    token = client.post('/api/register', json={'username': 'bench', 'password': 'benchmark'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'identity'}
+    client.post('/api/expenses/import', data=statement(args.rows), headers=headers, content_type='text/csv')
+
+    codings = [coding for coding in LEVELS if coding in response_compressor.encodings]
+    missing = sorted(set(LEVELS) - set(codings))
+    print(f"{args.rows} expenses, {args.mbps} Mbit/s link" + (f", not installed: {', '.join(missing)}" if missing else ''))
+
+    for endpoint in ENDPOINTS:
+        response = client.get(endpoint, headers=headers, buffered=False)
+        chunks = [chunk for chunk in response.response if chunk]
+        response.close()
+        size = sum(len(chunk) for chunk in chunks)
+        print(f"\n{endpoint} ({'streamed, ' if len(chunks) > 1 else ''}{size:,} bytes, "
+              f"{size * 8 / args.mbps / 1000:.0f}ms on the wire)")
+        print(f"    {'encoding':<10}{'bytes':>10}{'ratio':>8}{'cpu ms':>9}{'wire ms':>9}")
+        for coding in codings:
+            for level in LEVELS[coding]:
+                samples = []
+                for _ in range(args.runs):
+                    start = time.process_time()
+                    body = compress_chunks(chunks, coding, level)
+                    samples.append((time.process_time() - start) * 1000)
+                print(f"    {f'{coding}-{level}':<10}{len(body):>10,}{size / len(body):>8.1f}"
+                      f"{statistics.median(samples):>9.2f}{len(body) * 8 / args.mbps / 1000:>9.0f}")
+
+    with app.app_context():
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Query plans and latencies of the hot expense queries, without and with the composite indexes.
+
+Seeds a multi-user dataset into a scratch database, runs each query with the
+indexes dropped, then again with them created. Works on SQLite and Postgres
+(point --url at an empty scratch database, its tables are dropped).
+
+Usage (from backend/):
+    python benchmarks/expense_index_benchmark.py [--url sqlite:////tmp/bench.db] [--users 200] [--per-user 500]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ['Groceries', 'Eating Out', 'Coffee & Snacks', 'Fuel & Gas', 'Rent/Mortgage', 'Electronics',
+              'Pharmacy', 'Streaming Services', 'Gifts', 'Other']
+
+
+def seed(conn, tables, users, per_user, start):
+    user_table, expense_table = tables
+    conn.execute(user_table.insert(), [
+        {'id': i, 'username': f'bench{i}', 'password_hash': 'x', 'created_at': start, 'data_version': 0}
+        for i in range(1, users + 1)
+    ])
+    # Interleave users the way real traffic does, so one user's rows are spread over the table
+    rows = []
+    for n in range(users * per_user):
+        day = start + timedelta(days=random.randint(0, 729))
+        rows.append({
+            'merchant': f'Merchant {random.randint(1, 300)}', 'amount_cents': random.randint(100, 20000),
+            'description': 'seeded', 'category': random.choice(CATEGORIES), 'payment_method': 'Visa',
+            'date': day, 'created_at': datetime.combine(day, datetime.min.time()) + timedelta(seconds=n),
+            'user_id': random.randint(1, users),
+        })
+        if len(rows) == 10000:
+            conn.execute(expense_table.insert(), rows)
+            rows = []
+    if rows:
+        conn.execute(expense_table.insert(), rows)
+
+
+def queries(expense, today):
+    from sqlalchemy import func, select, tuple_
+    month_start = today.replace(day=1)
+    thirty_days_ago = today - timedelta(days=30)
+    middle = (today - timedelta(days=365), datetime.combine(today - timedelta(days=365), datetime.min.time()), 10 ** 9)
+    order = (expense.c.date.desc(), expense.c.created_at.desc(), expense.c.id.desc())
+    return {
+        'list first page': lambda u: select(expense).where(expense.c.user_id == u).order_by(*order).limit(50),
+        'list keyset page': lambda u: select(expense).where(
+            expense.c.user_id == u, tuple_(expense.c.date, expense.c.created_at, expense.c.id) < middle
+        ).order_by(*order).limit(50),
+        'month by category': lambda u: select(expense.c.category, func.sum(expense.c.amount_cents)).where(
+            expense.c.user_id == u, expense.c.date >= month_start).group_by(expense.c.category),
+        '30 days by date': lambda u: select(expense.c.date, func.sum(expense.c.amount_cents)).where(
+            expense.c.user_id == u, expense.c.date >= thirty_days_ago).group_by(expense.c.date),
+        'category filter': lambda u: select(expense).where(
+            expense.c.user_id == u, expense.c.category == 'Groceries', expense.c.date >= thirty_days_ago),
+        'by id and user': lambda u: select(expense).where(expense.c.id == 12345, expense.c.user_id == u),
+    }
+
+
+def explain(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = compiled.params
+    if compiled.positiontup:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = conn.exec_driver_sql(prefix + str(compiled), params).fetchall()
+    return [str(row[-1]) for row in rows]
+
+
+def measure(conn, named_queries, users, runs):
+    results = {}
+    for name, build in named_queries.items():
+        samples = []
+        for _ in range(runs):
+            stmt = build(random.randint(1, users))
+            start = time.perf_counter()
+            conn.execute(stmt).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = (statistics.median(samples), explain(conn, build(1)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'expense_index_benchmark.db')}")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--per-user', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+    os.environ['OCR_WARM_ON_START'] = 'false'
+    from app import app, db, Expense, User
+
+    random.seed(42)
+    today = date.today()
+    expense = Expense.__table__
+    indexes = sorted(expense.indexes, key=lambda index: index.name)
+
+    with app.app_context():
+        engine = db.engine
+        db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            for index in indexes:
+                index.drop(conn)
+            seed(conn, (User.__table__, expense), args.users, args.per_user, today - timedelta(days=729))
+        print(f"{engine.dialect.name}: seeded {args.users * args.per_user} expenses for {args.users} users "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        named_queries = queries(expense, today)
+        with engine.connect() as conn:
+            conn.exec_driver_sql('ANALYZE')
+            before = measure(conn, named_queries, args.users, args.runs)
+
+        with engine.begin() as conn:
+            for index in indexes:
+                index.create(conn)
+            conn.exec_driver_sql('ANALYZE')
+        with engine.connect() as conn:
+            after = measure(conn, named_queries, args.users, args.runs)
+
+        for name in named_queries:
+            (before_ms, before_plan), (after_ms, after_plan) = before[name], after[name]
+            print(f"\n{name}: {before_ms:.2f}ms -> {after_ms:.2f}ms ({before_ms / after_ms:.1f}x)")
+            print(f"    before: {' | '.join(before_plan)}")
+            print(f"    after:  {' | '.join(after_plan)}")
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
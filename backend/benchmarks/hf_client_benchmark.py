@@ -0,0 +1,76 @@
+"""Pooled, batched HF client vs. one requests.post per call, against the local stub.
+
+Usage (from backend/):
+    python benchmarks/hf_client_benchmark.py [--calls N] [--threads N] [--latency-ms N]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hf_client import HFInferenceClient, CircuitOpenError, InferenceError
+from hf_stub_server import start_stub
+
+MODEL = 'facebook/bart-large-mnli'
+LABELS = ['Groceries', 'Eating Out', 'Coffee & Snacks', 'Fuel & Gas', 'Other']
+TEXTS = ['groceries at ralphs', 'coffee at starbucks', 'fuel at shell', 'dinner eating out', 'misc']
+
+
+def run(fn, calls, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(fn, range(calls)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--latency-ms', type=int, default=50)
+    args = parser.parse_args()
+
+    stub = start_stub(latency_ms=args.latency_ms)
+    base = f'http://127.0.0.1:{stub.server_address[1]}'
+
+    def direct(i):
+        payload = {'inputs': TEXTS[i % len(TEXTS)], 'parameters': {'candidate_labels': LABELS}}
+        return requests.post(f'{base}/{MODEL}', json=payload, timeout=10).json()
+
+    elapsed = run(direct, args.calls, args.threads)
+    print(f"requests.post per call: {elapsed:.2f}s, upstream requests={stub.requests}, connections={len(stub.connections)}")
+
+    stub.requests, stub.connections = 0, set()
+    client = HFInferenceClient(token='stub', api_base=base, max_concurrency=4, batch_size=16)
+    elapsed = run(lambda i: client.classify(MODEL, TEXTS[i % len(TEXTS)], LABELS), args.calls, args.threads)
+    print(f"HFInferenceClient:      {elapsed:.2f}s, upstream requests={stub.requests}, connections={len(stub.connections)}")
+
+    # Breaker: consecutive failures open it, then calls fail fast without reaching the stub
+    stub.failing = True
+    client = HFInferenceClient(token='stub', api_base=base, failure_threshold=3, reset_timeout=0.5)
+    before = stub.requests
+    outcomes = []
+    for _ in range(10):
+        start = time.perf_counter()
+        try:
+            client.zero_shot(MODEL, ['x'], LABELS)
+        except CircuitOpenError:
+            outcomes.append(f"open({(time.perf_counter() - start) * 1000:.1f}ms)")
+        except InferenceError:
+            outcomes.append('failed')
+    print(f"breaker while failing: {' '.join(outcomes)}; upstream requests={stub.requests - before}")
+
+    stub.failing = False
+    time.sleep(0.6)
+    client.zero_shot(MODEL, ['x'], LABELS)
+    print(f"breaker after recovery: {client.breaker.state}")
+
+
+if __name__ == '__main__':
+    main()
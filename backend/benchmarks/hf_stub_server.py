@@ -0,0 +1,92 @@
+"""Local stand-in for the Hugging Face inference API.
+
+Answers zero-shot requests (single or list inputs) with made-up scores and
+text generation requests with a fixed tip. Point the app at it with
+HF_API_BASE=http://127.0.0.1:8765 and any HUGGING_FACE_TOKEN.
+
+Usage (from backend/):
+    python benchmarks/hf_stub_server.py [--port 8765] [--latency-ms 50] [--fail-rate 0.0]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is visible
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with server.lock:
+            server.requests += 1
+            server.connections.add(self.client_address)
+        time.sleep(server.latency)
+
+        if server.failing or random.random() < server.fail_rate:
+            return self._send(503, {'error': 'Model is currently loading'})
+
+        inputs = body.get('inputs')
+        labels = body.get('parameters', {}).get('candidate_labels')
+        if labels:
+            def result(text):
+                # A label that appears in the text wins with a confident score
+                ranked = sorted(labels, key=lambda label: (label.lower() not in text.lower(), random.random()))
+                top = 0.6 if ranked[0].lower() in text.lower() else 0.05
+                rest = [random.random() for _ in ranked[1:]]
+                scale = (1 - top) / sum(rest) if rest else 0
+                scores = [top] + sorted((min(score * scale, top) for score in rest), reverse=True)
+                return {'sequence': text, 'labels': ranked, 'scores': scores}
+            payload = [result(text) for text in inputs] if isinstance(inputs, list) else result(inputs)
+        else:
+            payload = [{'generated_text': 'Set a weekly budget for your top category. Review subscriptions monthly.'}]
+        self._send(200, payload)
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_stub(port=0, latency_ms=50, fail_rate=0.0):
+    """Start the stub on a background thread and return the server (see .server_address)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.fail_rate = fail_rate
+    server.failing = False
+    server.requests = 0
+    server.connections = set()
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=int, default=50)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_stub(args.port, args.latency_ms, args.fail_rate)
+    print(f"stub listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"requests={server.requests} connections={len(server.connections)}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
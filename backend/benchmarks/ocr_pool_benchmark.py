@@ -0,0 +1,62 @@
+"""Compare cold (new PaddleOCR per receipt) and warm (pooled engine) OCR latency.
+
+Usage (from backend/):
+    python benchmarks/ocr_pool_benchmark.py [image_path] [--runs N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from paddleocr import PaddleOCR
+from ocr_engine import OCREnginePool, DEFAULT_ENGINE_OPTIONS
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', '1704808897014.jpg')
+
+
+def summarize(label, samples):
+    print(f"{label:<6} runs={len(samples)} "
+          f"mean={statistics.mean(samples):.3f}s "
+          f"median={statistics.median(samples):.3f}s "
+          f"min={min(samples):.3f}s max={max(samples):.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('image', nargs='?', default=DEFAULT_IMAGE)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    img = cv2.imread(args.image)
+    if img is None:
+        sys.exit(f"Could not load image from {args.image}")
+
+    # Cold: what every request paid before the pool existed
+    cold = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        PaddleOCR(**DEFAULT_ENGINE_OPTIONS).predict(input=img)
+        cold.append(time.perf_counter() - start)
+
+    # Warm: engine loaded once up front, each run is inference only
+    pool = OCREnginePool(size=1)
+    pool.warm_up()
+    warm = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        with pool.acquire() as ocr:
+            ocr.predict(input=img)
+        warm.append(time.perf_counter() - start)
+
+    summarize('cold', cold)
+    summarize('warm', warm)
+    print(f"engine load: {pool.status()['avg_load_seconds']}s, "
+          f"speedup: {statistics.mean(cold) / statistics.mean(warm):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
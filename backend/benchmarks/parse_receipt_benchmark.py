@@ -0,0 +1,89 @@
+"""Speed and field accuracy of parse_receipt over a corpus of OCR text files.
+
+Accuracy is checked for every <name>.txt that has a <name>.expected.json next
+to it. The expected file holds the parse_receipt fields to compare, plus an
+optional line_item_count. The default corpus is the Ralphs samples in
+ocr_outputs/ plus benchmarks/receipts/, hand-labelled receipts from grocery
+stores, pharmacies, restaurants, a gas station and a delivery app.
+
+Parse time grows with the number of OCR lines, so it is reported per line
+as well as per receipt.
+
+Usage (from backend/):
+    python benchmarks/parse_receipt_benchmark.py [corpus_dir ...] [--runs N]
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receipt_parser import parse_receipt
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = [os.path.join(BACKEND_DIR, 'ocr_outputs'), os.path.join(BACKEND_DIR, 'benchmarks', 'receipts')]
+
+
+def field_values(parsed):
+    return dict(parsed, line_item_count=len(parsed['line_items']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', nargs='*', default=DEFAULT_CORPUS)
+    parser.add_argument('--runs', type=int, default=1000)
+    args = parser.parse_args()
+
+    paths = sorted(path for corpus in args.corpus for path in glob.glob(os.path.join(corpus, '*.txt')))
+    if not paths:
+        sys.exit(f"No .txt files in {', '.join(args.corpus)}")
+
+    timings, line_timings = [], []
+    checked, correct = {}, {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            parsed = parse_receipt(text)
+        per_call = (time.perf_counter() - start) / args.runs * 1e6
+        timings.append(per_call)
+        lines = sum(1 for line in text.splitlines() if line.strip())
+        line_timings.append(per_call / lines)
+
+        expected_path = path[:-len('.txt')] + '.expected.json'
+        mismatches = []
+        if os.path.exists(expected_path):
+            with open(expected_path, 'r', encoding='utf-8') as f:
+                expected = json.load(f)
+            values = field_values(parsed)
+            for field, want in expected.items():
+                checked[field] = checked.get(field, 0) + 1
+                if values.get(field) == want:
+                    correct[field] = correct.get(field, 0) + 1
+                else:
+                    mismatches.append(f"{field}: got {values.get(field)!r}, expected {want!r}")
+
+        print(f"{os.path.basename(path)}: {per_call:.0f}us ({lines} lines) items={len(parsed['line_items'])} "
+              f"total={parsed['amount']} merchant={parsed['merchant']!r}")
+        for mismatch in mismatches:
+            print(f"    {mismatch}")
+
+    print(f"\n{len(paths)} receipts, median {statistics.median(timings):.0f}us, max {max(timings):.0f}us per parse, "
+          f"median {statistics.median(line_timings):.1f}us per line")
+    if checked:
+        print("accuracy:")
+        for field in sorted(checked):
+            print(f"  {field:<16} {correct.get(field, 0)}/{checked[field]}")
+        total_correct = sum(correct.values())
+        total_checked = sum(checked.values())
+        print(f"  {'overall':<16} {total_correct}/{total_checked} ({total_correct / total_checked:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Per-stage preprocessing and OCR timings for each preset.
+
+Usage (from backend/):
+    python benchmarks/preprocess_benchmark.py [image_path] [--runs N] [--presets default,fast]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from image_preprocessing import PRESETS, resolve_options, engine_options
+from ocr_engine import get_ocr_pool
+from receipt_parser import ocr_image
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', '1704808897014.jpg')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('image', nargs='?', default=DEFAULT_IMAGE)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--presets', default=','.join(PRESETS))
+    args = parser.parse_args()
+
+    img = cv2.imread(args.image)
+    if img is None:
+        sys.exit(f"Could not load image from {args.image}")
+    print(f"image: {args.image} ({img.shape[1]}x{img.shape[0]})")
+
+    for preset in args.presets.split(','):
+        # Load the engine first so model loading isn't counted as OCR time
+        get_ocr_pool(engine_options(resolve_options(preset))).warm_up()
+
+        samples = {}
+        for _ in range(args.runs):
+            result = ocr_image(img, preset)
+            for stage, ms in result['timings'].items():
+                samples.setdefault(stage, []).append(ms)
+
+        total = sum(statistics.median(values) for values in samples.values())
+        stages = ', '.join(f"{stage}={statistics.median(values):.1f}ms" for stage, values in samples.items())
+        print(f"{preset:<8} total={total:.1f}ms lines={len(result['lines'])} chars={len(result['text'])}  [{stages}]")
+
+
+if __name__ == '__main__':
+    main()
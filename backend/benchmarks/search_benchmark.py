@@ -0,0 +1,133 @@
+"""Latency of GET /api/expenses/search at millions of rows, against a LIKE scan.
+
+Seeds a scratch database with --rows expenses spread over --users users,
+plus one heavy user holding --heavy-rows of them, builds the search index,
+then times search requests through the Flask test client for a typical and
+the heavy user. The LIKE column is the same match done with
+merchant/description ILIKE '%term%' on the user's rows, in date order: it
+stops at the 50th hit, so it is quick for common words and reads every row
+the user has for rare ones, typos and misses. Relevance order has to rank
+every hit, so it costs more than date order on the heavy user.
+
+Usage (from backend/):
+    python benchmarks/search_benchmark.py [--rows 1000000] [--users 1000] [--heavy-rows 200000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ['coffee', 'latte', 'groceries', 'weekly', 'fuel', 'lunch', 'dinner', 'pharmacy', 'refill', 'parking',
+         'airport', 'hotel', 'gift', 'birthday', 'subscription', 'movie', 'tickets', 'books', 'shoes', 'gym']
+MERCHANTS = ['Starbucks', 'Whole Foods Market', 'Shell', 'Chipotle', 'CVS Pharmacy', 'Delta Airlines', 'Marriott',
+             'Amazon', 'Netflix', 'Trader Joes', 'Target', 'Costco', 'Walgreens', 'Blue Bottle Coffee', 'Uber']
+
+QUERIES = [
+    ('word', {'q': 'coffee'}),
+    ('prefix', {'q': 'sta'}),
+    ('two words', {'q': 'whole groceries'}),
+    ('fuzzy', {'q': 'starbuks'}),
+    ('rare', {'q': 'birthday gift'}),
+    ('by date', {'q': 'coffee', 'sort': 'date'}),
+    ('no match', {'q': 'xylophone'}),
+]
+
+
+def seed(conn, tables, rows, users, heavy_rows, start):
+    user_table, expense_table = tables
+    conn.execute(user_table.insert(), [
+        {'id': i, 'username': f'bench{i}', 'password_hash': 'x', 'created_at': start} for i in range(1, users + 1)
+    ])
+    batch = []
+    for n in range(rows):
+        # User 1 is the heavy user, everyone else shares the rest
+        user_id = 1 if n < heavy_rows else random.randint(2, users)
+        day = start + timedelta(days=random.randint(0, 729))
+        batch.append({
+            'merchant': f'{random.choice(MERCHANTS)} #{random.randint(1, 999)}',
+            'description': ' '.join(random.sample(WORDS, 3)), 'amount_cents': random.randint(100, 20000),
+            'category': 'Other', 'payment_method': 'Visa', 'date': day,
+            'created_at': datetime.combine(day, datetime.min.time()) + timedelta(seconds=n), 'user_id': user_id,
+        })
+        if len(batch) == 20000:
+            conn.execute(expense_table.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(expense_table.insert(), batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'search_benchmark.db')}")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--heavy-rows', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+    os.environ['OCR_WARM_ON_START'] = 'false'
+    from flask_jwt_extended import create_access_token
+    from app import app, db, Expense, User
+    from expense_search import expense_search, tokenize
+
+    random.seed(42)
+    with app.app_context():
+        db.drop_all()
+        with db.engine.begin() as connection:
+            for statement in expense_search.drop_schema(connection.dialect.name):
+                connection.exec_driver_sql(statement)
+        db.create_all()
+        start = time.perf_counter()
+        with db.engine.begin() as connection:
+            seed(connection, (User.__table__, Expense.__table__), args.rows, args.users, args.heavy_rows,
+                 date.today() - timedelta(days=729))
+        seeded = time.perf_counter() - start
+        start = time.perf_counter()
+        with db.engine.begin() as connection:
+            expense_search.rebuild(connection)
+        print(f"{db.engine.dialect.name}: {args.rows} expenses ({args.heavy_rows} for the heavy user), "
+              f"seeded in {seeded:.1f}s, index built in {time.perf_counter() - start:.1f}s")
+        tokens = {user_id: create_access_token(identity=str(user_id)) for user_id in (1, 2)}
+
+    client = app.test_client()
+    print(f"\n{'query':<12}{'user':<8}{'hits':>6}{'search ms':>11}{'like ms':>9}")
+    for name, params in QUERIES:
+        for user_id, label in ((2, 'typical'), (1, 'heavy')):
+            headers = {'Authorization': f'Bearer {tokens[user_id]}'}
+            samples = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                response = client.get('/api/expenses/search', query_string=dict(params, limit=50), headers=headers)
+                samples.append((time.perf_counter() - start) * 1000)
+            hits = len(response.get_json()['expenses'])
+
+            with app.app_context():
+                like = [db.or_(Expense.merchant.ilike(f'%{term}%'), Expense.description.ilike(f'%{term}%'))
+                        for term in tokenize(params['q'])]
+                query = db.select(Expense.id).where(Expense.user_id == user_id, *like).order_by(
+                    Expense.date.desc()).limit(50)
+                like_samples = []
+                for _ in range(max(args.runs // 4, 1)):
+                    start = time.perf_counter()
+                    db.session.execute(query).all()
+                    like_samples.append((time.perf_counter() - start) * 1000)
+            print(f"{name:<12}{label:<8}{hits:>6}{statistics.median(samples):>11.2f}{statistics.median(like_samples):>9.2f}")
+
+    with app.app_context():
+        with db.engine.begin() as connection:
+            for statement in expense_search.drop_schema(connection.dialect.name):
+                connection.exec_driver_sql(statement)
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
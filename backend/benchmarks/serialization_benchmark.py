@@ -0,0 +1,120 @@
+"""Rows/sec and peak memory of serializing a user's full expense list, ORM + jsonify vs column tuples.
+
+Seeds one user's expenses into a scratch database, then encodes the whole
+list (what GET /api/expenses returns without limit/cursor) with:
+
+    orm+jsonify      Expense.query.all(), to_dict() per row, jsonify at once (the old path)
+    columns+json     column tuples and the standard library encoder, one batch at a time
+    columns+orjson   column tuples and orjson, one batch at a time (the current path)
+
+Peak memory is measured in a separate pass with tracemalloc, so it doesn't
+skew the timings.
+
+Usage (from backend/):
+    python benchmarks/serialization_benchmark.py [--rows 100000] [--runs 3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ['Groceries', 'Eating Out', 'Coffee & Snacks', 'Fuel & Gas', 'Rent/Mortgage', 'Electronics']
+
+
+def seed(conn, tables, rows, start):
+    user_table, expense_table = tables
+    conn.execute(user_table.insert(), [{'id': 1, 'username': 'bench', 'password_hash': 'x', 'created_at': start}])
+    batch = []
+    for n in range(rows):
+        day = start + timedelta(days=random.randint(0, 729))
+        batch.append({
+            'merchant': f'Merchant {random.randint(1, 300)}', 'amount_cents': random.randint(100, 20000),
+            'description': f'Seeded expense number {n}', 'category': random.choice(CATEGORIES),
+            'payment_method': 'Visa', 'date': day,
+            'created_at': datetime.combine(day, datetime.min.time()) + timedelta(seconds=n), 'user_id': 1,
+        })
+        if len(batch) == 10000:
+            conn.execute(expense_table.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(expense_table.insert(), batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'serialization_benchmark.db')}")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+    os.environ['OCR_WARM_ON_START'] = 'false'
+    import serialization
+    from flask import jsonify
+    from app import app, db, Expense, User, EXPENSE_ORDER, EXPENSE_ROW_COLUMNS, EXPORT_BATCH_ROWS
+    from serialization import expense_dict, iter_json_array
+
+    random.seed(42)
+    orjson = serialization.orjson
+
+    def orm_jsonify():
+        expenses = Expense.query.filter(Expense.user_id == 1).order_by(*EXPENSE_ORDER).all()
+        return len(jsonify([expense.to_dict() for expense in expenses]).get_data())
+
+    def columns(encoder):
+        def run():
+            serialization.orjson = encoder
+            query = db.select(*EXPENSE_ROW_COLUMNS).where(Expense.user_id == 1).order_by(*EXPENSE_ORDER)
+            result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_ROWS))
+            try:
+                return sum(len(piece) for piece in iter_json_array(
+                    [expense_dict(row) for row in rows] for rows in result.partitions()))
+            finally:
+                result.close()
+                serialization.orjson = orjson
+        return run
+
+    paths = {'orm+jsonify': orm_jsonify, 'columns+json': columns(None)}
+    if orjson is not None:
+        paths['columns+orjson'] = columns(orjson)
+    else:
+        print('orjson is not installed, skipping columns+orjson')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with db.engine.begin() as conn:
+            seed(conn, (User.__table__, Expense.__table__), args.rows, date.today() - timedelta(days=729))
+
+        print(f"{db.engine.dialect.name}: {args.rows} expenses, {args.runs} runs each\n")
+        print(f"{'path':<16}{'rows/sec':>12}{'ms':>10}{'peak MB':>10}{'bytes':>12}")
+        with app.test_request_context():
+            for name, run in paths.items():
+                samples = []
+                for _ in range(args.runs):
+                    db.session.expunge_all()
+                    start = time.perf_counter()
+                    size = run()
+                    samples.append(time.perf_counter() - start)
+                db.session.expunge_all()
+                tracemalloc.start()
+                run()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                db.session.expunge_all()
+                seconds = statistics.median(samples)
+                print(f"{name:<16}{args.rows / seconds:>12,.0f}{seconds * 1000:>10.0f}{peak / 1e6:>10.1f}{size:>12,}")
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and bare numbers (store ids, amounts) and collapse spaces."""
+    tokens = NON_WORD_RE.sub(' ', (text or '').lower().replace("'", '')).split()
+    return ' '.join(token for token in tokens if not token.isdigit())
+
+
+class CategorizationCache:
+    """Layered lookup in front of the expense categorizer.
+
+    The first layer is each user's own history. Merchant and description
+    of every saved expense map to the category the user actually picked,
+    and the most frequent choice wins. The mapping is built on first use
+    from the counts returned by `loader(user_id)`, then adjusted in place as
+    expenses are added, changed and deleted. The second layer is a TTL'd LRU of categorizer
+    results keyed by normalized description, shared by all users.
+    """
+
+    def __init__(self, max_items=None, ttl=None, max_users=None, loader=None):
+        self.max_items = int(max_items or os.getenv('CATEGORY_CACHE_ITEMS', '2048'))
+        self.ttl = int(ttl or os.getenv('CATEGORY_CACHE_TTL', '86400'))
+        self.max_users = int(max_users or os.getenv('CATEGORY_LEARNED_USERS', '1000'))
+        # loader(user_id) -> iterable of (merchant, description, category, count)
+        self.loader = loader
+
+        self._results = OrderedDict()  # key -> (category, confidence, stored_at)
+        self._learned = OrderedDict()  # user_id -> {'merchant': {key: Counter}, 'description': {key: Counter}}
+        self._lock = threading.Lock()
+        self._counters = {'learned_hits': 0, 'cache_hits': 0, 'misses': 0, 'expired': 0, 'user_loads': 0}
+
+    def _user_mapping(self, user_id):
+        with self._lock:
+            mapping = self._learned.get(user_id)
+            if mapping is not None:
+                self._learned.move_to_end(user_id)
+                return mapping
+        if self.loader is None:
+            return None
+
+        # Built outside the lock, the loader runs a database query
+        mapping = {'merchant': {}, 'description': {}}
+        for merchant, description, category, count in self.loader(user_id):
+            self._add_choice(mapping, merchant, description, category, count)
+        with self._lock:
+            self._learned[user_id] = mapping
+            self._learned.move_to_end(user_id)
+            while len(self._learned) > self.max_users:
+                self._learned.popitem(last=False)
+            self._counters['user_loads'] += 1
+        return mapping
+
+    @staticmethod
+    def _add_choice(mapping, merchant, description, category, count=1):
+        for kind, text in (('merchant', merchant), ('description', description)):
+            key = normalize(text)
+            if not (key and category):
+                continue
+            choices = mapping[kind].setdefault(key, Counter())
+            choices[category] += count
+            if choices[category] <= 0:
+                del choices[category]
+                if not choices:
+                    del mapping[kind][key]
+
+    def learn(self, user_id, merchant, description, category, count=1):
+        """Record a category the user saved, or with a negative count one they deleted or changed.
+
+        Users not loaded yet pick it up from the loader.
+        """
+        self.learn_many(user_id, [(merchant, description, category, count)])
+
+    def learn_many(self, user_id, choices):
+        """learn() for many (merchant, description, category, count) tuples at once."""
+        with self._lock:
+            mapping = self._learned.get(user_id)
+            if mapping is not None:
+                for choice in choices:
+                    self._add_choice(mapping, *choice)
+
+    def forget_user(self, user_id):
+        """Drop a user's learned mapping so it is rebuilt from the loader on next use."""
+        with self._lock:
+            self._learned.pop(user_id, None)
+
+    def lookup(self, user_id, description, merchant=None):
+        """Return (category, confidence, source) from the user's history or the result cache.
+
+        All three are None on a miss. Learned confidence is the share of the
+        user's matching expenses filed under that category.
+        """
+        key = normalize(description)
+        mapping = self._user_mapping(user_id) if user_id is not None else None
+        if mapping is not None:
+            with self._lock:
+                # The description box often holds just the merchant name, so try it both ways
+                choices = (mapping['description'].get(key)
+                           or (merchant and mapping['merchant'].get(normalize(merchant)))
+                           or mapping['merchant'].get(key))
+                if choices:
+                    self._counters['learned_hits'] += 1
+                    category, count = choices.most_common(1)[0]
+                    return category, round(count / sum(choices.values()), 3), 'learned'
+
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None:
+                category, confidence, stored_at = entry
+                if time.time() - stored_at <= self.ttl:
+                    self._results.move_to_end(key)
+                    self._counters['cache_hits'] += 1
+                    return category, confidence, 'cache'
+                del self._results[key]
+                self._counters['expired'] += 1
+            self._counters['misses'] += 1
+        return None, None, None
+
+    def put(self, description, category, confidence=None):
+        key = normalize(description)
+        if not key:
+            return
+        with self._lock:
+            self._results[key] = (category, confidence, time.time())
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_items:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._learned.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._results)
+            users = len(self._learned)
+        lookups = counters['learned_hits'] + counters['cache_hits'] + counters['misses']
+        hits = counters['learned_hits'] + counters['cache_hits']
+        return dict(
+            counters,
+            hit_rate=round(hits / lookups, 3) if lookups else None,
+            entries=entries,
+            max_items=self.max_items,
+            ttl=self.ttl,
+            learned_users=users,
+        )
+
+
+# Create a global instance
+categorization_cache = CategorizationCache()
@@ -0,0 +1,132 @@
+import os
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    # Optional, 'br' is only offered when it is installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    # Optional, 'zstd' is only offered when it is installed
+    zstandard = None
+
+# Every encoding this module can produce, also used to recognise suffixed ETags
+CODINGS = ('br', 'zstd', 'gzip')
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html', 'text/css',
+    'application/javascript', 'image/svg+xml',
+}
+
+
+def _compressor(coding, level):
+    """(compress, flush, finish) callables for one response body."""
+    if coding == 'br':
+        c = brotli.Compressor(quality=level)
+        return c.process, c.flush, c.finish
+    if coding == 'zstd':
+        c = zstandard.ZstdCompressor(level=level).compressobj()
+        return c.compress, lambda: c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), c.flush
+    # wbits 31 writes a gzip header and trailer around the deflate stream
+    c = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+
+def compress(data, coding, level):
+    """Compress a whole body with one of CODINGS."""
+    compress_chunk, _, finish = _compressor(coding, level)
+    return compress_chunk(data) + finish()
+
+
+class ResponseCompressor:
+    """Compresses responses with the best encoding the client accepts.
+
+    Encodings are offered in COMPRESS_ENCODINGS order (br, zstd, gzip),
+    skipping any whose module isn't installed. The client's q-values win,
+    ties go to the earlier encoding. Bodies smaller than COMPRESS_MIN_BYTES
+    are sent as they are. Streamed responses (NDJSON, exports) are
+    compressed chunk by chunk with a flush after each one, so every line
+    still reaches the client as soon as it is produced.
+
+    A strong ETag gets the encoding appended ("v3-ab12-gzip"), since the
+    compressed bytes are a different representation.
+    """
+
+    def __init__(self, enabled=None, min_bytes=None, encodings=None, levels=None):
+        if enabled is None:
+            enabled = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+        self.enabled = enabled
+        self.min_bytes = int(min_bytes or os.getenv('COMPRESS_MIN_BYTES', '500'))
+        encodings = encodings or [e.strip() for e in os.getenv('COMPRESS_ENCODINGS', ','.join(CODINGS)).split(',')]
+        installed = {'br': brotli is not None, 'zstd': zstandard is not None, 'gzip': True}
+        self.encodings = [e for e in encodings if installed.get(e)]
+        self.levels = levels or {
+            'br': int(os.getenv('COMPRESS_BR_LEVEL', '4')),
+            'zstd': int(os.getenv('COMPRESS_ZSTD_LEVEL', '3')),
+            'gzip': int(os.getenv('COMPRESS_GZIP_LEVEL', '6')),
+        }
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def negotiate(self, accept_encodings):
+        """The encoding to use for an Accept-Encoding header, or None for identity."""
+        best, best_quality = None, 0
+        for coding in self.encodings:
+            quality = accept_encodings[coding]
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def after_request(self, response):
+        if (not self.enabled or request.method == 'HEAD' or response.status_code < 200
+                or response.status_code in (204, 206, 304) or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        # The body depends on Accept-Encoding even when it ends up uncompressed
+        response.vary.add('Accept-Encoding')
+        coding = self.negotiate(request.accept_encodings)
+        if coding is None:
+            return response
+
+        level = self.levels[coding]
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, coding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_bytes:
+                return response
+            response.set_data(compress(data, coding, level))
+
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{coding}')
+        return response
+
+    @staticmethod
+    def _compress_stream(chunks, coding, level):
+        compress_chunk, flush, finish = _compressor(coding, level)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                if chunk:
+                    yield compress_chunk(chunk) + flush()
+            yield finish()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+
+# Create a global instance
+response_compressor = ResponseCompressor()
@@ -0,0 +1,231 @@
+import difflib
+import os
+import re
+import unicodedata
+from collections import namedtuple
+
+import sqlalchemy as sa
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Full-text index over merchant and description. The external content is a
+# view that adds an "owner" column (u<user_id>), so restricting a search to
+# one user is part of the MATCH itself instead of a filter on every hit.
+# Prefixes up to 8 characters are indexed: a longer prefix query has to
+# merge the doclists of every word it matches, which is slow for common words.
+# Per-user word list for fuzzy matching: every word of merchant and
+# description stored as "u<user_id>_<word>", so a vocabulary range scan over
+# "u2_s" lists only user 2's words starting with s. Separators are turned
+# into spaces first so each word gets the owner prefix.
+SEARCH_TERM_SEPARATORS = ".,-/&#*'():;+@!\"\t\n\r"
+
+
+def _owner_terms_sql(row):
+    """SQL expression for a row's words, each prefixed with its owner ("u<user_id>_")."""
+    text = f"{row}.merchant || ' ' || {row}.description"
+    for separator in SEARCH_TERM_SEPARATORS:
+        text = f"replace({text}, char({ord(separator)}), ' ')"
+    owner = f"'u' || {row}.user_id || '_'"
+    return f"{owner} || replace({text}, ' ', ' ' || {owner})"
+
+
+SQLITE_SCHEMA = [
+    "CREATE VIEW IF NOT EXISTS expense_search_source AS "
+    "SELECT id, merchant, description, 'u' || user_id AS owner FROM expense",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5("
+    "merchant, description, owner, content='expense_search_source', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8')",
+    "CREATE TRIGGER IF NOT EXISTS expense_fts_insert AFTER INSERT ON expense BEGIN "
+    "INSERT INTO expense_fts (rowid, merchant, description, owner) "
+    "VALUES (new.id, new.merchant, new.description, 'u' || new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_fts_delete AFTER DELETE ON expense BEGIN "
+    "INSERT INTO expense_fts (expense_fts, rowid, merchant, description, owner) "
+    "VALUES ('delete', old.id, old.merchant, old.description, 'u' || old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_fts_update AFTER UPDATE OF merchant, description, user_id ON expense BEGIN "
+    "INSERT INTO expense_fts (expense_fts, rowid, merchant, description, owner) "
+    "VALUES ('delete', old.id, old.merchant, old.description, 'u' || old.user_id); "
+    "INSERT INTO expense_fts (rowid, merchant, description, owner) "
+    "VALUES (new.id, new.merchant, new.description, 'u' || new.user_id); END",
+    # Contentless and without positions, it only has to answer "which words does this user have"
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_terms USING fts5("
+    "words, content='', detail=none, columnsize=0, tokenize=\"unicode61 remove_diacritics 2 tokenchars '_'\")",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_terms_vocab USING fts5vocab(expense_terms, row)",
+    "CREATE TRIGGER IF NOT EXISTS expense_terms_insert AFTER INSERT ON expense BEGIN "
+    f"INSERT INTO expense_terms (rowid, words) VALUES (new.id, {_owner_terms_sql('new')}); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_terms_delete AFTER DELETE ON expense BEGIN "
+    f"INSERT INTO expense_terms (expense_terms, rowid, words) VALUES ('delete', old.id, {_owner_terms_sql('old')}); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_terms_update AFTER UPDATE OF merchant, description, user_id ON expense BEGIN "
+    f"INSERT INTO expense_terms (expense_terms, rowid, words) VALUES ('delete', old.id, {_owner_terms_sql('old')}); "
+    f"INSERT INTO expense_terms (rowid, words) VALUES (new.id, {_owner_terms_sql('new')}); END",
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS expense_terms_update',
+    'DROP TRIGGER IF EXISTS expense_terms_delete',
+    'DROP TRIGGER IF EXISTS expense_terms_insert',
+    'DROP TABLE IF EXISTS expense_terms_vocab',
+    'DROP TABLE IF EXISTS expense_terms',
+    'DROP TRIGGER IF EXISTS expense_fts_update',
+    'DROP TRIGGER IF EXISTS expense_fts_delete',
+    'DROP TRIGGER IF EXISTS expense_fts_insert',
+    'DROP TABLE IF EXISTS expense_fts_vocab',
+    'DROP TABLE IF EXISTS expense_fts',
+    'DROP VIEW IF EXISTS expense_search_source',
+]
+
+# Trigram index on the same expression the search query uses, maintained by Postgres itself
+POSTGRES_HAYSTACK = "(expense.merchant || ' ' || expense.description)"
+
+POSTGRES_SCHEMA = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX IF NOT EXISTS ix_expense_search_trgm ON expense USING gin "
+    "((merchant || ' ' || description) gin_trgm_ops)",
+]
+
+POSTGRES_DROP = ['DROP INDEX IF EXISTS ix_expense_search_trgm']
+
+# Merchant matches count double, the owner column never counts
+SQLITE_RANK = 'bm25(expense_fts, 2.0, 1.0, 0.0)'
+
+# where: conditions on expense keeping only matches (enough for date order),
+# join: (selectable, onclause) that keeps only matches and provides rank, or None when
+# rank is an expression over expense and where does the matching,
+# rank: lower is better, fuzzy: {query term: [index terms it was widened to]}
+SearchPlan = namedtuple('SearchPlan', ['where', 'join', 'rank', 'fuzzy'])
+
+
+def tokenize(text):
+    """Lowercased words without diacritics, the way the unicode61 tokenizer splits them."""
+    folded = ''.join(ch for ch in unicodedata.normalize('NFKD', (text or '').lower()) if not unicodedata.combining(ch))
+    return [token for token in TOKEN_RE.findall(folded) if token.strip('_')]
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+class ExpenseSearch:
+    """Search over expense merchant and description, backed by a real index.
+
+    SQLite uses an FTS5 table kept up to date by triggers on expense, ranked
+    with bm25. PostgreSQL uses a pg_trgm GIN index, ranked by word
+    similarity. Every query term matches as a prefix. A term that matches
+    none of the user's expenses is widened to the closest words in them
+    (SQLite: the user's word list via difflib, Postgres: trigram word
+    similarity over the user's rows), so a typo like "starbuks" still finds
+    "Starbucks". Words from other users' expenses are never used.
+    """
+
+    def __init__(self, fuzzy=None, fuzzy_cutoff=None, fuzzy_terms=None, max_terms=None):
+        if fuzzy is None:
+            fuzzy = os.getenv('SEARCH_FUZZY', 'true').lower() == 'true'
+        self.fuzzy = fuzzy
+        self.fuzzy_cutoff = float(fuzzy_cutoff or os.getenv('SEARCH_FUZZY_CUTOFF', '0.75'))
+        self.fuzzy_terms = int(fuzzy_terms or os.getenv('SEARCH_FUZZY_TERMS', '3'))
+        self.max_terms = int(max_terms or os.getenv('SEARCH_MAX_TERMS', '8'))
+
+    @staticmethod
+    def schema(dialect):
+        return SQLITE_SCHEMA if dialect == 'sqlite' else POSTGRES_SCHEMA if dialect == 'postgresql' else []
+
+    @staticmethod
+    def drop_schema(dialect):
+        return SQLITE_DROP if dialect == 'sqlite' else POSTGRES_DROP if dialect == 'postgresql' else []
+
+    def ensure_schema(self, connection):
+        """Create the index and its triggers if they don't exist yet."""
+        for statement in self.schema(connection.dialect.name):
+            connection.exec_driver_sql(statement)
+
+    def rebuild(self, connection):
+        """Rebuild the index from the expense table, e.g. after loading data with the triggers missing."""
+        dialect = connection.dialect.name
+        if dialect == 'sqlite':
+            self.ensure_schema(connection)
+            connection.exec_driver_sql("INSERT INTO expense_fts (expense_fts) VALUES ('rebuild')")
+            connection.exec_driver_sql("INSERT INTO expense_fts (expense_fts) VALUES ('optimize')")
+            # Contentless, so it is refilled rather than rebuilt
+            connection.exec_driver_sql("INSERT INTO expense_terms (expense_terms) VALUES ('delete-all')")
+            connection.exec_driver_sql(
+                f"INSERT INTO expense_terms (rowid, words) SELECT expense.id, {_owner_terms_sql('expense')} FROM expense"
+            )
+        elif dialect == 'postgresql':
+            self.ensure_schema(connection)
+            connection.exec_driver_sql('REINDEX INDEX ix_expense_search_trgm')
+
+    def _close_terms(self, connection, user_id, owner, term):
+        """The user's own words within fuzzy_cutoff of a term, if the term matches none of their expenses."""
+        # A MATCH stops at the first hit, a vocabulary lookup would read the term's whole doclist
+        exists = sa.text('SELECT 1 FROM expense_fts WHERE expense_fts MATCH :match LIMIT 1')
+        if connection.execute(exists, {'match': f'{owner} AND {{merchant description}} : {_quote(term)}*'}).first():
+            return None
+        # Only this user's words sharing the first letter, a typo there is rare and it keeps the list short
+        prefix = f'u{user_id}_'
+        candidates = connection.execute(sa.text(
+            'SELECT term FROM expense_terms_vocab WHERE term >= :low AND term < :high LIMIT 50000'
+        ), {'low': prefix + term[0], 'high': prefix + term[0] + '\uffff'}).scalars().all()
+        close = difflib.get_close_matches(term, [candidate[len(prefix):] for candidate in candidates],
+                                          n=self.fuzzy_terms * 4, cutoff=self.fuzzy_cutoff)
+        # The word list splits on fewer characters than the search index, keep the words the index agrees on
+        found = []
+        for word in close:
+            if connection.execute(exists, {'match': f'{owner} AND {{merchant description}} : {_quote(word)}'}).first():
+                found.append(word)
+                if len(found) == self.fuzzy_terms:
+                    break
+        return found
+
+    def plan(self, connection, user_id, query):
+        """SearchPlan for a query string, or None when it has no searchable words."""
+        terms = list(dict.fromkeys(tokenize(query)))[:self.max_terms]
+        if not terms:
+            return None
+        if connection.dialect.name == 'postgresql':
+            return self._postgres_plan(terms)
+        return self._sqlite_plan(connection, user_id, terms)
+
+    def _sqlite_plan(self, connection, user_id, terms):
+        owner = f'owner : {_quote(f"u{user_id}")}'
+        fuzzy = {}
+        groups = []
+        for term in terms:
+            close = self._close_terms(connection, user_id, owner, term) if self.fuzzy else None
+            if close:
+                fuzzy[term] = close
+                groups.append('(' + ' OR '.join(_quote(word) for word in close) + ')')
+            else:
+                groups.append(_quote(term) + '*')
+        match = sa.text('expense_fts MATCH :search_match').bindparams(
+            search_match=f'{owner} AND {{merchant description}} : ({" AND ".join(groups)})'
+        )
+
+        # Both shapes keep the full-text index as the driving side: joined on
+        # expense.id with a user_id filter, SQLite would otherwise walk the
+        # user's expenses and run the MATCH once per row.
+        matches = sa.select(sa.literal_column('rowid')).select_from(sa.table('expense_fts')).where(match)
+        ranked = sa.select(
+            sa.literal_column('rowid').label('id'), sa.literal_column(SQLITE_RANK).label('rank')
+        ).select_from(sa.table('expense_fts')).where(match).subquery('search_hits')
+        return SearchPlan(
+            where=[sa.literal_column('expense.id').in_(matches)],
+            join=(ranked, ranked.c.id == sa.literal_column('expense.id')),
+            rank=ranked.c.rank,
+            fuzzy=fuzzy,
+        )
+
+    def _postgres_plan(self, terms):
+        where = []
+        for index, term in enumerate(terms):
+            condition = f"({POSTGRES_HAYSTACK} ILIKE :search_like_{index}"
+            params = {f'search_like_{index}': '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'}
+            if self.fuzzy:
+                # <% is word similarity above pg_trgm.word_similarity_threshold, served by the GIN index
+                condition += f" OR :search_term_{index} <% {POSTGRES_HAYSTACK}"
+                params[f'search_term_{index}'] = term
+            where.append(sa.text(condition + ')').bindparams(**params))
+        similarity = sa.func.word_similarity(sa.literal(' '.join(terms)), sa.literal_column(POSTGRES_HAYSTACK))
+        return SearchPlan(where=where, join=None, rank=sa.literal(1.0, sa.Float) - similarity, fuzzy={})
+
+
+# Create a global instance
+expense_search = ExpenseSearch()
@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class InferenceError(Exception):
+    """Raised when an upstream inference call fails or times out."""
+
+
+class CircuitOpenError(InferenceError):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open every call is refused until `reset_timeout` seconds have
+    passed. After that a single trial call is let through: success closes
+    the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class HFInferenceClient:
+    """Shared client for the Hugging Face inference API.
+
+    One requests.Session keeps a pool of keep-alive connections, every call
+    has a connect and read timeout, and a semaphore caps how many calls are
+    in flight at once. classify() queues texts from concurrent callers and
+    sends up to HF_BATCH_SIZE of them as one zero-shot request.
+    HF_API_BASE can point at a local stub server for testing.
+    """
+
+    def __init__(self, token=None, api_base=None, pool_size=None, connect_timeout=None, read_timeout=None,
+                 max_concurrency=None, batch_size=None, batch_wait_ms=None,
+                 failure_threshold=None, reset_timeout=None):
+        self.token = (token or os.getenv('HUGGING_FACE_TOKEN') or '').strip() or None
+        self.api_base = (api_base or os.getenv('HF_API_BASE', 'https://api-inference.huggingface.co/models')).rstrip('/')
+        self.timeout = (
+            float(connect_timeout or os.getenv('HF_CONNECT_TIMEOUT', '3')),
+            float(read_timeout or os.getenv('HF_READ_TIMEOUT', '10')),
+        )
+        self.max_concurrency = int(max_concurrency or os.getenv('HF_MAX_CONCURRENCY', '4'))
+        self.batch_size = int(batch_size or os.getenv('HF_BATCH_SIZE', '16'))
+        self.batch_wait = int(batch_wait_ms or os.getenv('HF_BATCH_WAIT_MS', '10')) / 1000
+        pool_size = int(pool_size or os.getenv('HF_POOL_SIZE', '10'))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if self.token:
+            self.session.headers['Authorization'] = f'Bearer {self.token}'
+
+        self.breaker = CircuitBreaker(
+            int(failure_threshold or os.getenv('HF_BREAKER_FAILURES', '5')),
+            float(reset_timeout or os.getenv('HF_BREAKER_RESET', '30')),
+        )
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._pending = {}  # (model, labels) -> [(text, future), ...]
+        self._pending_since = {}
+        self._cond = threading.Condition()
+        self._batcher = None
+        self._sender = None
+        self._counters = {'requests': 0, 'inputs': 0, 'failures': 0, 'rejected': 0}
+        self._counter_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.token is not None
+
+    def _count(self, **amounts):
+        with self._counter_lock:
+            for name, amount in amounts.items():
+                self._counters[name] += amount
+
+    def post(self, model, payload):
+        """POST payload to a model and return the decoded JSON response."""
+        # Wait no longer than a read timeout for a free slot
+        if not self._slots.acquire(timeout=self.timeout[1]):
+            self._count(rejected=1)
+            raise InferenceError(f"Too many concurrent calls to {model}")
+        # Checked after taking a slot so a half-open trial call always reports back
+        if not self.breaker.allow():
+            self._slots.release()
+            self._count(rejected=1)
+            raise CircuitOpenError(f"{model} is unavailable, circuit breaker is open")
+        try:
+            inputs = payload.get('inputs')
+            self._count(requests=1, inputs=len(inputs) if isinstance(inputs, list) else 1)
+            response = self.session.post(f'{self.api_base}/{model}', json=payload, timeout=self.timeout)
+            if response.status_code != 200:
+                raise InferenceError(f"{model} returned {response.status_code}: {response.text[:200]}")
+            result = response.json()
+        except (requests.RequestException, ValueError, InferenceError) as e:
+            self.breaker.record_failure()
+            self._count(failures=1)
+            raise e if isinstance(e, InferenceError) else InferenceError(f"{model} request failed: {e}")
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+        return result
+
+    def zero_shot(self, model, texts, labels):
+        """One upstream request for many texts. Returns a {labels, scores} dict per text."""
+        result = self.post(model, {'inputs': list(texts), 'parameters': {'candidate_labels': list(labels)}})
+        # A single input comes back as a bare dict
+        results = [result] if isinstance(result, dict) else result
+        if len(results) != len(texts):
+            raise InferenceError(f"{model} returned {len(results)} results for {len(texts)} inputs")
+        return results
+
+    def classify(self, model, text, labels, timeout=None):
+        """Zero-shot classify one text, batched with concurrent callers. Returns {labels, scores}."""
+        future = Future()
+        key = (model, tuple(labels))
+        with self._cond:
+            self._start_batcher()
+            self._pending.setdefault(key, []).append((text, future))
+            self._pending_since.setdefault(key, time.monotonic())
+            self._cond.notify()
+        try:
+            # Time to wait for a slot, then for the request itself
+            return future.result(timeout=timeout or sum(self.timeout) + self.timeout[1] + self.batch_wait)
+        except FutureTimeoutError:
+            raise InferenceError(f"{model} did not answer in time")
+
+    def _start_batcher(self):
+        if self._batcher is None:
+            self._sender = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='hf-batch')
+            self._batcher = threading.Thread(target=self._batch_loop, name='hf-batcher', daemon=True)
+            self._batcher.start()
+
+    def _batch_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    ready = [key for key, items in self._pending.items()
+                             if len(items) >= self.batch_size or now - self._pending_since[key] >= self.batch_wait]
+                    if ready:
+                        break
+                    waits = [self._pending_since[key] + self.batch_wait - now for key in self._pending]
+                    self._cond.wait(timeout=min(waits) if waits else None)
+
+                batches = []
+                for key in ready:
+                    items = self._pending.pop(key)
+                    del self._pending_since[key]
+                    batches.extend((key, items[i:i + self.batch_size]) for i in range(0, len(items), self.batch_size))
+
+            for key, items in batches:
+                self._sender.submit(self._send_batch, key, items)
+
+    def _send_batch(self, key, items):
+        model, labels = key
+        try:
+            results = self.zero_shot(model, [text for text, _ in items], labels)
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+    def generate(self, model, prompt):
+        """Text generation, returns the generated text."""
+        result = self.post(model, {'inputs': prompt})
+        if not result or not isinstance(result, list) or 'generated_text' not in result[0]:
+            raise InferenceError(f"{model} returned no generated text")
+        return result[0]['generated_text']
+
+    def stats(self):
+        with self._counter_lock:
+            counters = dict(self._counters)
+        with self._cond:
+            queued = sum(len(items) for items in self._pending.values())
+        return dict(
+            counters,
+            enabled=self.enabled,
+            api_base=self.api_base,
+            breaker=self.breaker.state,
+            queued=queued,
+            max_concurrency=self.max_concurrency,
+            batch_size=self.batch_size,
+        )
+
+
+# Create a global instance
+hf_client = HFInferenceClient()
@@ -0,0 +1,175 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Every stage can be switched on or off per preset, or overridden per call.
+# Geometric stages (downscale, crop, deskew) always shape the image OCR sees.
+# Pixel stages (grayscale .. morphology) only run when feed_processed is on,
+# since there is no point computing a binarized image OCR will never read.
+PRESETS = {
+    # Same as the original behaviour: full-resolution colour image, angle classifier on
+    'default': {
+        'max_dimension': None,
+        'crop': False,
+        'deskew': False,
+        'feed_processed': False,
+        'grayscale': True,
+        'denoise': True,
+        'threshold': True,
+        'morphology': True,
+        'denoise_ksize': 3,
+        'morph_ksize': 2,
+        'use_angle_cls': True,
+        'doc_preprocessing': True,
+    },
+    # Large phone photos: shrink first, skip the angle classifier and document models
+    'fast': {
+        'max_dimension': 1280,
+        'crop': True,
+        'deskew': False,
+        'feed_processed': False,
+        'grayscale': True,
+        'denoise': True,
+        'threshold': True,
+        'morphology': True,
+        'denoise_ksize': 3,
+        'morph_ksize': 2,
+        'use_angle_cls': False,
+        'doc_preprocessing': False,
+    },
+    # Faint or crooked receipts: straighten and binarize before OCR
+    'clean': {
+        'max_dimension': 2000,
+        'crop': True,
+        'deskew': True,
+        'feed_processed': True,
+        'grayscale': True,
+        'denoise': True,
+        'threshold': True,
+        'morphology': True,
+        'denoise_ksize': 3,
+        'morph_ksize': 2,
+        'use_angle_cls': True,
+        'doc_preprocessing': False,
+    },
+}
+
+DEFAULT_PRESET = os.getenv('OCR_PRESET', 'default')
+
+
+def resolve_options(preset=None, overrides=None):
+    """Return the full option dict for a preset with any per-call overrides applied."""
+    name = preset or DEFAULT_PRESET
+    if name not in PRESETS:
+        raise ValueError(f"Unknown OCR preset '{name}'. Choose from: {', '.join(PRESETS)}")
+    options = dict(PRESETS[name], preset=name)
+    for key, value in (overrides or {}).items():
+        if key not in options:
+            raise ValueError(f"Unknown preprocessing option '{key}'")
+        options[key] = value
+    return options
+
+
+def engine_options(options):
+    """PaddleOCR constructor arguments implied by the preprocessing options."""
+    kwargs = {'use_angle_cls': options['use_angle_cls'], 'lang': 'en'}
+    if not options['doc_preprocessing']:
+        kwargs['use_doc_orientation_classify'] = False
+        kwargs['use_doc_unwarping'] = False
+    return kwargs
+
+
+def downscale(img, max_dimension):
+    height, width = img.shape[:2]
+    longest = max(height, width)
+    if not max_dimension or longest <= max_dimension:
+        return img
+    scale = max_dimension / longest
+    return cv2.resize(img, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def _to_gray(img):
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def crop_to_receipt(img):
+    """Crop to the bright paper region, leaving the image alone if none stands out."""
+    gray = cv2.GaussianBlur(_to_gray(img), (5, 5), 0)
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return img
+
+    x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+    height, width = img.shape[:2]
+    # A tiny region is more likely a glare spot than the receipt
+    if w * h < 0.2 * width * height:
+        return img
+
+    margin = int(0.01 * max(width, height))
+    x0, y0 = max(0, x - margin), max(0, y - margin)
+    x1, y1 = min(width, x + w + margin), min(height, y + h + margin)
+    return img[y0:y1, x0:x1]
+
+
+def estimate_skew(img):
+    """Rotation in degrees (counter-clockwise) that levels the text, from its dark pixels."""
+    gray = _to_gray(img)
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    points = cv2.findNonZero(ink)
+    if points is None or len(points) < 50:
+        return 0.0
+    angle = cv2.minAreaRect(points)[-1]
+    # The reported range differs between OpenCV versions, fold it into [-45, 45)
+    return float((angle + 45) % 90 - 45)
+
+
+def deskew(img, max_angle=15.0):
+    angle = estimate_skew(img)
+    if abs(angle) < 0.5 or abs(angle) > max_angle:
+        return img
+    height, width = img.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(img, matrix, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def preprocess(img, options):
+    """Run the enabled stages on a BGR image.
+
+    Returns (image_for_ocr, timings) where timings maps stage name to
+    milliseconds for every stage that ran.
+    """
+    timings = {}
+
+    def run(name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    if options['max_dimension']:
+        img = run('downscale', downscale, img, options['max_dimension'])
+    if options['crop']:
+        img = run('crop', crop_to_receipt, img)
+    if options['deskew']:
+        img = run('deskew', deskew, img)
+
+    if options['feed_processed']:
+        if options['grayscale']:
+            img = run('grayscale', _to_gray, img)
+        if options['denoise']:
+            img = run('denoise', cv2.medianBlur, img, options['denoise_ksize'])
+        if options['threshold']:
+            img = run('threshold', cv2.adaptiveThreshold, _to_gray(img), 255,
+                      cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+        if options['morphology']:
+            kernel = np.ones((options['morph_ksize'], options['morph_ksize']), np.uint8)
+            img = run('morphology', lambda im: cv2.morphologyEx(
+                cv2.morphologyEx(im, cv2.MORPH_CLOSE, kernel), cv2.MORPH_OPEN, kernel), img)
+
+    # PaddleOCR expects a 3-channel image
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return img, timings
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class InsightsCache:
+    """Per-user spending insights, computed off the request thread.
+
+    Each entry is tagged with the user's data_version at the time it was
+    computed. A request with the same version is answered straight from
+    memory. A newer version starts one background recompute per user and
+    version. With stale-while-revalidate on, the old value is served while
+    that runs, so only a user's very first request can wait, and for at most
+    INSIGHTS_WAIT_SECONDS.
+    """
+
+    def __init__(self, workers=None, wait_seconds=None, stale_while_revalidate=None, max_users=None):
+        self.workers = int(workers or os.getenv('INSIGHTS_WORKERS', '2'))
+        self.wait_seconds = float(wait_seconds or os.getenv('INSIGHTS_WAIT_SECONDS', '2'))
+        if stale_while_revalidate is None:
+            stale_while_revalidate = os.getenv('INSIGHTS_STALE_WHILE_REVALIDATE', 'true').lower() == 'true'
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_users = int(max_users or os.getenv('INSIGHTS_CACHE_USERS', '10000'))
+
+        self._executor = None
+        self._entries = {}   # user_id -> {'version', 'value', 'computed_at'}
+        self._inflight = {}  # (user_id, version) -> future
+        self._lock = threading.Lock()
+        self._counters = {'fresh': 0, 'stale': 0, 'pending': 0, 'computed': 0, 'errors': 0}
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='insights')
+        return self._executor
+
+    def _refresh(self, user_id, version, compute):
+        """Start compute(user_id) unless it is already running for this version. Call with the lock held."""
+        key = (user_id, version)
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._get_executor().submit(self._run, user_id, version, compute)
+            self._inflight[key] = future
+        return future
+
+    def _run(self, user_id, version, compute):
+        try:
+            value = compute(user_id)
+        except Exception:
+            with self._lock:
+                self._counters['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop((user_id, version), None)
+
+        with self._lock:
+            current = self._entries.get(user_id)
+            # A slower, older computation must not overwrite a newer one
+            if current is None or current['version'] <= version:
+                if current is None and len(self._entries) >= self.max_users:
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[user_id] = {'version': version, 'value': value, 'computed_at': time.time()}
+            self._counters['computed'] += 1
+        return value
+
+    def get(self, user_id, version, compute):
+        """Return (value, status, computed_at) where status is 'fresh', 'stale' or 'pending'.
+
+        value is None only when status is 'pending'.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry['version'] == version:
+                self._counters['fresh'] += 1
+                return entry['value'], 'fresh', entry['computed_at']
+            future = self._refresh(user_id, version, compute)
+            if entry and self.stale_while_revalidate:
+                self._counters['stale'] += 1
+                return entry['value'], 'stale', entry['computed_at']
+
+        try:
+            value = future.result(timeout=self.wait_seconds)
+        except FutureTimeoutError:
+            with self._lock:
+                self._counters['pending'] += 1
+            if entry:
+                return entry['value'], 'stale', entry['computed_at']
+            return None, 'pending', None
+        with self._lock:
+            self._counters['fresh'] += 1
+            computed_at = self._entries.get(user_id, {}).get('computed_at')
+        return value, 'fresh', computed_at
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._counters,
+                users=len(self._entries),
+                inflight=len(self._inflight),
+                stale_while_revalidate=self.stale_while_revalidate,
+            )
+
+
+# Create a global instance
+insights_cache = InsightsCache()
@@ -0,0 +1,192 @@
+import json
+import os
+from collections import deque
+
+# Categories in priority order: when a description matches keywords from
+# several categories, the one listed first wins.
+DEFAULT_KEYWORDS = [
+    # Food & Groceries
+    ('Groceries', ['grocery', 'supermarket', 'groceries', 'market']),
+    ('Eating Out', ['restaurant', 'dining', 'eat out', 'takeout', 'fast food', 'pizza', 'burger', 'cafe', 'bistro']),
+    ('Coffee & Snacks', ['coffee', 'snack', 'tea', 'bakery', 'donut', 'pastry']),
+    # Transportation
+    ('Public Transit', ['bus', 'train', 'metro', 'subway', 'transit', 'commute']),
+    ('Rideshare & Taxi', ['uber', 'lyft', 'taxi', 'cab', 'rideshare']),
+    ('Fuel & Gas', ['gas', 'fuel', 'petrol', 'diesel']),
+    ('Car Payment', ['car payment', 'auto loan', 'vehicle finance']),
+    ('Car Maintenance', ['car repair', 'maintenance', 'oil change', 'tire', 'mechanic']),
+    ('Parking & Tolls', ['parking', 'toll', 'meter']),
+    # Housing & Utilities
+    ('Rent/Mortgage', ['rent', 'mortgage', 'lease']),
+    ('Electricity', ['electric', 'electricity', 'power bill']),
+    ('Water & Sewer', ['water', 'sewer']),
+    ('Internet', ['internet', 'wifi', 'broadband']),
+    ('Mobile Phone', ['mobile', 'cell phone', 'phone bill']),
+    ('Home Maintenance', ['home repair', 'plumber', 'electrician', 'appliance']),
+    # Insurance
+    ('Health Insurance', ['health insurance', 'medical insurance']),
+    ('Car Insurance', ['car insurance', 'auto insurance']),
+    ('Home/Renters Insurance', ['home insurance', 'renters insurance']),
+    ('Life Insurance', ['life insurance']),
+    # Healthcare
+    ('Medical Bills', ['doctor', 'hospital', 'medical bill', 'clinic']),
+    ('Pharmacy', ['pharmacy', 'medicine', 'prescription', 'drugstore']),
+    ('Dental & Vision', ['dental', 'dentist', 'vision', 'optometrist']),
+    # Personal & Family
+    ('Childcare', ['childcare', 'daycare', 'babysitter', 'nanny']),
+    ('Pet Care', ['pet', 'vet', 'grooming', 'pet food']),
+    ('Personal Care', ['haircut', 'salon', 'spa', 'personal care']),
+    ('Fitness & Sports', ['gym', 'fitness', 'yoga', 'sports', 'workout']),
+    # Shopping
+    ('Clothing & Accessories', ['clothing', 'shoes', 'apparel', 'accessories']),
+    ('Electronics', ['electronics', 'gadget', 'device', 'laptop', 'phone']),
+    ('Home & Garden', ['furniture', 'garden', 'decor', 'home improvement']),
+    # Entertainment
+    ('Streaming Services', ['netflix', 'hulu', 'disney+', 'streaming']),
+    ('Movies & Events', ['movie', 'cinema', 'event', 'concert', 'show']),
+    ('Hobbies', ['hobby', 'craft', 'art', 'music lesson']),
+    # Education
+    ('Tuition', ['tuition', 'school fee', 'enrollment']),
+    ('Books & Supplies', ['book', 'textbook', 'school supplies']),
+    ('Courses & Subscriptions', ['course', 'subscription', 'online class']),
+    # Travel
+    ('Flights', ['flight', 'airline', 'plane ticket']),
+    ('Hotels & Lodging', ['hotel', 'motel', 'lodging', 'bnb']),
+    ('Vacation', ['vacation', 'holiday', 'trip', 'travel']),
+    # Savings & Investments
+    ('Retirement', ['retirement', 'ira', '401k']),
+    ('Emergency Fund', ['emergency fund', 'rainy day']),
+    ('Investments', ['investment', 'stock', 'bond', 'crypto']),
+    # Gifts & Donations
+    ('Gifts', ['gift', 'present']),
+    ('Charity/Donations', ['charity', 'donation', 'nonprofit']),
+    # Miscellaneous
+    ('Taxes', ['tax', 'irs']),
+    ('Fees', ['fee', 'charge', 'service fee']),
+]
+
+DEFAULT_CATEGORY = 'Other'
+
+
+def load_keyword_table(path):
+    """Read a {"Category": ["keyword", ...], ...} JSON file, keeping its order as the priority."""
+    with open(path, 'r', encoding='utf-8') as f:
+        table = json.load(f)
+    return list(table.items())
+
+
+class KeywordCategorizer:
+    """Keyword categorizer compiled once into an Aho-Corasick automaton.
+
+    All keywords go into one trie whose failure links are folded into a
+    plain dict per state, so scanning a description is one dict lookup per
+    character no matter how many keywords there are. Each state remembers
+    the highest priority category that ends there, and the lowest category
+    index seen across the text is what the old if/elif chain would return.
+
+    With word_boundaries on, keywords only match whole words (a trailing
+    "s"/"es" is allowed), so "walmart" no longer counts as "art".
+    """
+
+    def __init__(self, table=None, word_boundaries=None, default=DEFAULT_CATEGORY):
+        if table is None:
+            path = os.getenv('CATEGORY_KEYWORDS_FILE')
+            table = load_keyword_table(path) if path else DEFAULT_KEYWORDS
+        if word_boundaries is None:
+            word_boundaries = os.getenv('CATEGORY_WORD_BOUNDARIES', 'false').lower() == 'true'
+
+        self.table = [(category, list(keywords)) for category, keywords in table]
+        self.categories = [category for category, _ in self.table]
+        self.word_boundaries = word_boundaries
+        self.default = default
+        self._build()
+
+    def _build(self):
+        goto = [{}]
+        matches = [[]]  # (category index, keyword length) for keywords ending at each state
+        for index, (_, keywords) in enumerate(self.table):
+            for keyword in keywords:
+                state = 0
+                for char in keyword.lower():
+                    next_state = goto[state].get(char)
+                    if next_state is None:
+                        goto.append({})
+                        matches.append([])
+                        next_state = goto[state][char] = len(goto) - 1
+                    state = next_state
+                matches[state].append((index, len(keyword)))
+
+        # Breadth-first so a state's failure target is finished before the state itself
+        transitions = [None] * len(goto)
+        transitions[0] = dict(goto[0])
+        queue = deque()
+        for state in goto[0].values():
+            queue.append((state, 0))
+        while queue:
+            state, fail = queue.popleft()
+            matches[state] = matches[state] + matches[fail]
+            transitions[state] = dict(transitions[fail], **goto[state])
+            for char, child in goto[state].items():
+                queue.append((child, transitions[fail].get(char, 0) if state else 0))
+
+        self._transitions = transitions
+        self._matches = [sorted(found) for found in matches]
+        self._best = [found[0][0] if found else None for found in self._matches]
+
+    @property
+    def labels(self):
+        """Every category this categorizer can return, in priority order."""
+        return self.categories + [self.default]
+
+    def _best_index(self, text):
+        transitions, best_at = self._transitions, self._best
+        state = 0
+        best = None
+        for char in text:
+            state = transitions[state].get(char, 0)
+            index = best_at[state]
+            if index is not None and (best is None or index < best):
+                if index == 0:
+                    return 0
+                best = index
+        return best
+
+    def _best_whole_word_index(self, text):
+        transitions, matches = self._transitions, self._matches
+        state = 0
+        best = None
+        for end, char in enumerate(text):
+            state = transitions[state].get(char, 0)
+            for index, length in matches[state]:
+                if best is not None and index >= best:
+                    break
+                start = end - length + 1
+                if start > 0 and (text[start - 1].isalnum() or text[start - 1] == '_'):
+                    continue
+                rest = text[end + 1:end + 4]
+                if rest[:2] == 'es':
+                    rest = rest[2:]
+                elif rest[:1] == 's':
+                    rest = rest[1:]
+                if rest[:1] and (rest[0].isalnum() or rest[0] == '_'):
+                    continue
+                best = index
+                break
+        return best
+
+    def categorize(self, description):
+        text = (description or '').lower()
+        index = self._best_whole_word_index(text) if self.word_boundaries else self._best_index(text)
+        return self.default if index is None else self.categories[index]
+
+    def categorize_many(self, descriptions):
+        """Categorize a list of descriptions, scanning each distinct one only once."""
+        results = {}
+        for description in descriptions:
+            if description not in results:
+                results[description] = self.categorize(description)
+        return [results[description] for description in descriptions]
+
+
+# Create a global instance
+keyword_categorizer = KeywordCategorizer()
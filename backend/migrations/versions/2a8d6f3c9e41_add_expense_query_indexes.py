@@ -0,0 +1,28 @@
+"""Add composite indexes for expense queries
+
+Revision ID: 2a8d6f3c9e41
+Revises: 7c1e4a9b2d10
+Create Date: 2026-10-17 11:03:27.918234
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a8d6f3c9e41'
+down_revision = '7c1e4a9b2d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.create_index('ix_expense_user_date_created', ['user_id', 'date', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_expense_user_category_date', ['user_id', 'category', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.drop_index('ix_expense_user_category_date')
+        batch_op.drop_index('ix_expense_user_date_created')
@@ -0,0 +1,78 @@
+"""Store expense amounts and rollup totals as integer cents
+
+Revision ID: 4f7a2c8e6b13
+Revises: 9e3b5d7f1a22
+Create Date: 2026-10-17 13:20:41.508317
+
+Existing float amounts are rounded to the nearest minor unit of
+DEFAULT_CURRENCY (cents for USD, whole yen for JPY), the same scale
+money.py uses. Rollup totals are
+then re-summed from the rounded expenses rather than rounded themselves, so
+they keep matching `flask rollups rebuild --verify` exactly.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+from money import DEFAULT_CURRENCY, exponent
+
+
+# revision identifiers, used by Alembic.
+revision = '4f7a2c8e6b13'
+down_revision = '9e3b5d7f1a22'
+branch_labels = None
+depends_on = None
+
+CENTS_COLUMNS = [
+    ('expense', 'amount', 'amount_cents'),
+    ('daily_spending', 'total', 'total_cents'),
+    ('monthly_spending', 'total', 'total_cents'),
+]
+
+# Minor units per major unit, as in money.to_minor / from_minor
+FACTOR = 10 ** exponent(DEFAULT_CURRENCY)
+
+
+def _resum_rollups():
+    bind = op.get_bind()
+    daily, monthly = {}, {}
+    rows = bind.execute(sa.text(
+        'SELECT user_id, date, category, SUM(amount_cents) FROM expense GROUP BY user_id, date, category'
+    ))
+    for user_id, day, category, cents in rows:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        daily[(user_id, day, category)] = int(cents)
+        month_key = (user_id, day.replace(day=1), category)
+        monthly[month_key] = monthly.get(month_key, 0) + int(cents)
+
+    for table, key_column, totals in (('daily_spending', 'date', daily), ('monthly_spending', 'month', monthly)):
+        update = sa.text(
+            f'UPDATE {table} SET total_cents = :cents '
+            f'WHERE user_id = :user_id AND {key_column} = :key AND category = :category'
+        )
+        for (user_id, key, category), cents in totals.items():
+            bind.execute(update, {'cents': cents, 'user_id': user_id, 'key': key, 'category': category})
+
+
+def upgrade():
+    for table, old, new in CENTS_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(new, sa.BigInteger(), nullable=True))
+        op.execute(f'UPDATE {table} SET {new} = CAST(ROUND({old} * {FACTOR}) AS BIGINT)')
+    _resum_rollups()
+    for table, old, new in CENTS_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(new, existing_type=sa.BigInteger(), nullable=False)
+            batch_op.drop_column(old)
+
+
+def downgrade():
+    for table, old, new in CENTS_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(old, sa.Float(), nullable=True))
+        op.execute(f'UPDATE {table} SET {old} = {new} / {float(FACTOR)}')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(old, existing_type=sa.Float(), nullable=False)
+            batch_op.drop_column(new)
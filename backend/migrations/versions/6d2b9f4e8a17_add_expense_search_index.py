@@ -0,0 +1,70 @@
+"""Add expense search index
+
+Revision ID: 6d2b9f4e8a17
+Revises: b83d1e5a7c29
+Create Date: 2026-10-17 17:41:09.513284
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2b9f4e8a17'
+down_revision = 'b83d1e5a7c29'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of expense_search.SQLITE_SCHEMA / POSTGRES_SCHEMA at this revision.
+# Note that batch_alter_table on expense recreates the table on SQLite, which
+# drops these triggers; a later migration doing that must recreate them.
+SQLITE_UPGRADE = [
+    "CREATE VIEW IF NOT EXISTS expense_search_source AS "
+    "SELECT id, merchant, description, 'u' || user_id AS owner FROM expense",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5("
+    "merchant, description, owner, content='expense_search_source', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts_vocab USING fts5vocab(expense_fts, col)",
+    "CREATE TRIGGER IF NOT EXISTS expense_fts_insert AFTER INSERT ON expense BEGIN "
+    "INSERT INTO expense_fts (rowid, merchant, description, owner) "
+    "VALUES (new.id, new.merchant, new.description, 'u' || new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_fts_delete AFTER DELETE ON expense BEGIN "
+    "INSERT INTO expense_fts (expense_fts, rowid, merchant, description, owner) "
+    "VALUES ('delete', old.id, old.merchant, old.description, 'u' || old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_fts_update AFTER UPDATE OF merchant, description, user_id ON expense BEGIN "
+    "INSERT INTO expense_fts (expense_fts, rowid, merchant, description, owner) "
+    "VALUES ('delete', old.id, old.merchant, old.description, 'u' || old.user_id); "
+    "INSERT INTO expense_fts (rowid, merchant, description, owner) "
+    "VALUES (new.id, new.merchant, new.description, 'u' || new.user_id); END",
+    # Index the rows that already exist
+    "INSERT INTO expense_fts (expense_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    'DROP TRIGGER IF EXISTS expense_fts_update',
+    'DROP TRIGGER IF EXISTS expense_fts_delete',
+    'DROP TRIGGER IF EXISTS expense_fts_insert',
+    'DROP TABLE IF EXISTS expense_fts_vocab',
+    'DROP TABLE IF EXISTS expense_fts',
+    'DROP VIEW IF EXISTS expense_search_source',
+]
+
+POSTGRES_UPGRADE = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX IF NOT EXISTS ix_expense_search_trgm ON expense USING gin "
+    "((merchant || ' ' || description) gin_trgm_ops)",
+]
+
+POSTGRES_DOWNGRADE = ['DROP INDEX IF EXISTS ix_expense_search_trgm']
+
+
+def _run(statements):
+    for statement in statements.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def upgrade():
+    _run({'sqlite': SQLITE_UPGRADE, 'postgresql': POSTGRES_UPGRADE})
+
+
+def downgrade():
+    _run({'sqlite': SQLITE_DOWNGRADE, 'postgresql': POSTGRES_DOWNGRADE})
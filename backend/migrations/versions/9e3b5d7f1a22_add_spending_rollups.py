@@ -0,0 +1,57 @@
+"""Add daily and monthly spending rollups
+
+Revision ID: 9e3b5d7f1a22
+Revises: 2a8d6f3c9e41
+Create Date: 2026-10-17 11:48:05.331902
+
+Existing expenses are summed into the new tables on upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3b5d7f1a22'
+down_revision = '2a8d6f3c9e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_spending',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'date', 'category')
+    )
+    op.create_table('monthly_spending',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'month', 'category')
+    )
+
+    # Backfill from the existing expenses, the dashboard reads only the rollups
+    op.execute(
+        "INSERT INTO daily_spending (user_id, date, category, total, count) "
+        "SELECT user_id, date, category, SUM(amount), COUNT(*) FROM expense GROUP BY user_id, date, category"
+    )
+    if op.get_bind().dialect.name == 'sqlite':
+        month = "date(date, 'start of month')"
+    else:
+        month = "CAST(date_trunc('month', date) AS DATE)"
+    op.execute(
+        "INSERT INTO monthly_spending (user_id, month, category, total, count) "
+        f"SELECT user_id, {month}, category, SUM(amount), COUNT(*) FROM expense GROUP BY user_id, {month}, category"
+    )
+
+
+def downgrade():
+    op.drop_table('monthly_spending')
+    op.drop_table('daily_spending')
@@ -0,0 +1,26 @@
+"""Add data_updated_at to User
+
+Revision ID: b83d1e5a7c29
+Revises: 4f7a2c8e6b13
+Create Date: 2026-10-17 15:02:17.846120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83d1e5a7c29'
+down_revision = '4f7a2c8e6b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('data_updated_at')
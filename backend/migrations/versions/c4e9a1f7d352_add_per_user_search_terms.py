@@ -0,0 +1,68 @@
+"""Add per-user search terms for fuzzy matching
+
+Revision ID: c4e9a1f7d352
+Revises: 6d2b9f4e8a17
+Create Date: 2026-10-18 10:12:44.207391
+
+Fuzzy search took its candidate words from expense_fts_vocab, which holds
+every user's words. It now reads expense_terms, where each word is stored
+with its owner ("u<user_id>_<word>"), and the global vocabulary is dropped.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9a1f7d352'
+down_revision = '6d2b9f4e8a17'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of expense_search._owner_terms_sql at this revision
+SEPARATORS = ".,-/&#*'():;+@!\"\t\n\r"
+
+
+def _owner_terms_sql(row):
+    text = f"{row}.merchant || ' ' || {row}.description"
+    for separator in SEPARATORS:
+        text = f"replace({text}, char({ord(separator)}), ' ')"
+    owner = f"'u' || {row}.user_id || '_'"
+    return f"{owner} || replace({text}, ' ', ' ' || {owner})"
+
+
+SQLITE_UPGRADE = [
+    'DROP TABLE IF EXISTS expense_fts_vocab',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_terms USING fts5("
+    "words, content='', detail=none, columnsize=0, tokenize=\"unicode61 remove_diacritics 2 tokenchars '_'\")",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_terms_vocab USING fts5vocab(expense_terms, row)",
+    "CREATE TRIGGER IF NOT EXISTS expense_terms_insert AFTER INSERT ON expense BEGIN "
+    f"INSERT INTO expense_terms (rowid, words) VALUES (new.id, {_owner_terms_sql('new')}); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_terms_delete AFTER DELETE ON expense BEGIN "
+    f"INSERT INTO expense_terms (expense_terms, rowid, words) VALUES ('delete', old.id, {_owner_terms_sql('old')}); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_terms_update AFTER UPDATE OF merchant, description, user_id ON expense BEGIN "
+    f"INSERT INTO expense_terms (expense_terms, rowid, words) VALUES ('delete', old.id, {_owner_terms_sql('old')}); "
+    f"INSERT INTO expense_terms (rowid, words) VALUES (new.id, {_owner_terms_sql('new')}); END",
+    # Index the rows that already exist
+    f"INSERT INTO expense_terms (rowid, words) SELECT expense.id, {_owner_terms_sql('expense')} FROM expense",
+]
+
+SQLITE_DOWNGRADE = [
+    'DROP TRIGGER IF EXISTS expense_terms_update',
+    'DROP TRIGGER IF EXISTS expense_terms_delete',
+    'DROP TRIGGER IF EXISTS expense_terms_insert',
+    'DROP TABLE IF EXISTS expense_terms_vocab',
+    'DROP TABLE IF EXISTS expense_terms',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts_vocab USING fts5vocab(expense_fts, col)",
+]
+
+
+def upgrade():
+    # PostgreSQL matches typos with pg_trgm against the user's own rows, nothing to add there
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
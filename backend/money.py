@@ -0,0 +1,71 @@
+import os
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+import numpy as np
+
+# Digits after the decimal point for each currency's minor unit (ISO 4217)
+CURRENCY_EXPONENTS = {
+    'USD': 2, 'EUR': 2, 'GBP': 2, 'CAD': 2, 'AUD': 2, 'CHF': 2, 'CNY': 2, 'INR': 2, 'MXN': 2,
+    'JPY': 0, 'KRW': 0, 'VND': 0, 'CLP': 0, 'ISK': 0,
+    'BHD': 3, 'KWD': 3, 'OMR': 3, 'JOD': 3, 'TND': 3,
+}
+
+DEFAULT_CURRENCY = os.getenv('DEFAULT_CURRENCY', 'USD').upper()
+
+
+def exponent(currency=None):
+    code = (currency or DEFAULT_CURRENCY).upper()
+    if code not in CURRENCY_EXPONENTS:
+        raise ValueError(f"Unsupported currency '{code}'")
+    return CURRENCY_EXPONENTS[code]
+
+
+# Looked up once, from_minor runs for every row of every expense response
+_DEFAULT_EXPONENT = exponent()
+
+# Amounts are stored in a BIGINT column
+MAX_MINOR = 2 ** 63 - 1
+
+
+def to_minor(value, currency=None):
+    """Parse an amount ("12.34", 12.34, Decimal) into integer minor units, rounding half up.
+
+    Raises ValueError for anything that isn't a finite number or doesn't fit
+    in MAX_MINOR.
+    """
+    if isinstance(value, bool):
+        raise ValueError('Invalid amount')
+    try:
+        # str() first so a float like 0.1 is read as written, not as its binary value
+        amount = Decimal(str(value).strip().replace(',', ''))
+    except (InvalidOperation, ValueError):
+        raise ValueError('Invalid amount')
+    if not amount.is_finite():
+        raise ValueError('Invalid amount')
+    try:
+        minor = int(amount.scaleb(exponent(currency)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except ArithmeticError:
+        # quantize raises InvalidOperation past the context precision ("1e30")
+        raise ValueError('Invalid amount')
+    if abs(minor) > MAX_MINOR:
+        raise ValueError('Invalid amount')
+    return minor
+
+
+def from_minor(minor, currency=None):
+    """Integer minor units back to a number for JSON, e.g. 1234 -> 12.34."""
+    if minor is None:
+        return None
+    digits = _DEFAULT_EXPONENT if currency is None else exponent(currency)
+    # int / 10**n is correctly rounded, so the float prints as the exact decimal
+    return int(minor) if digits == 0 else int(minor) / 10 ** digits
+
+
+def format_minor(minor, currency=None):
+    """Integer minor units as an exact decimal string, e.g. 1234 -> "12.34"."""
+    return str(Decimal(int(minor)).scaleb(-exponent(currency)))
+
+
+def sum_minor(values):
+    """Exact sum of minor-unit amounts, vectorized as an int64 array."""
+    return int(np.fromiter(values, dtype=np.int64).sum())
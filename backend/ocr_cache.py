@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def make_key(image_bytes, options):
+    """Cache key for an image under a given OCR/preprocessing configuration."""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class OCRResultCache:
+    """Two-tier cache of OCR results keyed by image hash and config.
+
+    The memory tier is a small LRU per process. The disk tier is a directory
+    of JSON files shared by all processes, trimmed oldest-first once it grows
+    past OCR_CACHE_MAX_BYTES. Each process only adds up its own stores, so the
+    directory is measured again every OCR_CACHE_RESCAN_PUTS stores to see the
+    other processes' files too.
+    """
+
+    def __init__(self, memory_items=None, disk_dir=None, disk_max_bytes=None, rescan_puts=None):
+        self.enabled = os.getenv('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+        self.memory_items = int(memory_items or os.getenv('OCR_CACHE_MEMORY_ITEMS', '256'))
+        self.disk_dir = disk_dir or os.getenv('OCR_CACHE_DIR', os.path.join(os.getcwd(), 'ocr_cache'))
+        self.disk_max_bytes = int(disk_max_bytes or os.getenv('OCR_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+        self.rescan_puts = int(rescan_puts or os.getenv('OCR_CACHE_RESCAN_PUTS', '64'))
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self._puts_since_scan = 0
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f'{key}.json')
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return dict(value)
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)  # keep recently used entries away from eviction
+        except (OSError, ValueError):
+            self._count('misses')
+            return None
+
+        self._remember(key, value)
+        self._count('disk_hits')
+        return dict(value)
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        self._remember(key, value)
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        self._count('stores')
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+            self._puts_since_scan += 1
+            rescan = (self._disk_bytes is None or self._disk_bytes > self.disk_max_bytes
+                      or self._puts_since_scan >= self.rescan_puts)
+        if rescan:
+            self._evict()
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Measure the disk tier and delete least recently used files until it fits its budget."""
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        if total > self.disk_max_bytes:
+            # Trim to 90% so we don't rescan on every store right at the limit
+            target = int(self.disk_max_bytes * 0.9)
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self._puts_since_scan = 0
+            self._counters['evictions'] += evicted
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for _, _, path in self._scan():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            memory_entries = len(self._memory)
+            disk_bytes = self._disk_bytes
+        lookups = counters['memory_hits'] + counters['disk_hits'] + counters['misses']
+        hits = counters['memory_hits'] + counters['disk_hits']
+        return dict(
+            counters,
+            enabled=self.enabled,
+            hit_rate=round(hits / lookups, 3) if lookups else None,
+            memory_entries=memory_entries,
+            disk_bytes=disk_bytes,
+            disk_max_bytes=self.disk_max_bytes,
+        )
+
+
+# Create a global instance
+ocr_cache = OCRResultCache()
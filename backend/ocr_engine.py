@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+os.environ['GLOG_minloglevel'] = '2'  # Suppress paddle warnings
+
+from paddleocr import PaddleOCR
+
+DEFAULT_ENGINE_OPTIONS = {
+    'use_angle_cls': True,
+    'lang': 'en',
+}
+
+
+class OCREnginePool:
+    """Process-wide pool of loaded PaddleOCR engines.
+
+    Building a PaddleOCR instance loads the detector, recognizer and angle
+    classifier from disk, which costs far more than a single inference. The
+    pool builds each engine once and lends it out to one caller at a time.
+    """
+
+    def __init__(self, size=None, engine_options=None, acquire_timeout=None):
+        self.size = max(1, int(size or os.getenv('OCR_POOL_SIZE', '1')))
+        self.engine_options = dict(engine_options or DEFAULT_ENGINE_OPTIONS)
+        self.acquire_timeout = float(acquire_timeout or os.getenv('OCR_ACQUIRE_TIMEOUT', '120'))
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._load_seconds = []
+
+    def _create_engine(self):
+        start = time.perf_counter()
+        engine = PaddleOCR(**self.engine_options)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._load_seconds.append(elapsed)
+        print(f"OCR engine loaded in {elapsed:.2f}s")  # debug
+        return engine
+
+    def _try_create(self, limit):
+        """Build a new engine if fewer than `limit` exist, otherwise return None."""
+        with self._lock:
+            if self._created >= limit:
+                return None
+            self._created += 1
+        try:
+            return self._create_engine()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _checkout(self):
+        # Reuse an idle engine if there is one
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        # Otherwise build a new one while we are still under the pool size
+        engine = self._try_create(self.size)
+        if engine is not None:
+            return engine
+
+        # Pool is full, wait for an engine to be returned
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No OCR engine became available within {self.acquire_timeout:.0f}s")
+
+    @contextmanager
+    def acquire(self):
+        """Borrow an engine for the duration of the with-block."""
+        engine = self._checkout()
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield engine
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(engine)
+
+    def warm_up(self, count=None):
+        """Load engines ahead of the first request so it doesn't pay the model load."""
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            engine = self._try_create(count)
+            if engine is None:
+                break
+            self._idle.put(engine)
+        return self.status()
+
+    def status(self):
+        with self._lock:
+            created = self._created
+            in_use = self._in_use
+            load_seconds = list(self._load_seconds)
+        return {
+            'state': 'warm' if created > 0 else 'cold',
+            'size': self.size,
+            'loaded': created,
+            'in_use': in_use,
+            'idle': self._idle.qsize(),
+            'engine_options': self.engine_options,
+            'avg_load_seconds': round(sum(load_seconds) / len(load_seconds), 3) if load_seconds else None,
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_ocr_pool(engine_options=None):
+    """Return the shared pool for a PaddleOCR configuration, creating it on first use."""
+    options = dict(engine_options or DEFAULT_ENGINE_OPTIONS)
+    key = tuple(sorted(options.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = OCREnginePool(engine_options=options)
+        return _pools[key]
+
+
+def pools_status():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.status() for pool in pools]
+
+
+# Create a global instance
+ocr_pool = get_ocr_pool()
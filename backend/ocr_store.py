@@ -0,0 +1,207 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS ocr_results (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER,
+    image_hash TEXT,
+    filename TEXT,
+    preset TEXT,
+    created_at REAL NOT NULL,
+    text TEXT NOT NULL,
+    lines BLOB,
+    expense_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_ocr_results_user_created ON ocr_results (user_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_ocr_results_image_hash ON ocr_results (image_hash);
+CREATE INDEX IF NOT EXISTS ix_ocr_results_created ON ocr_results (created_at);
+CREATE INDEX IF NOT EXISTS ix_ocr_results_expense ON ocr_results (expense_id);
+'''
+
+SUMMARY_COLUMNS = 'id, user_id, image_hash, filename, preset, created_at, expense_id'
+
+LEGACY_NAME = re.compile(r'^(?P<base>.+)_(?P<stamp>\d{8}_\d{6})\.txt$')
+
+
+def _pack_lines(lines):
+    # [text, score, box] triples compress far better than a list of dicts
+    rows = [[line['text'], line['score'], line['box']] for line in lines or []]
+    return zlib.compress(json.dumps(rows, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack_lines(blob):
+    if not blob:
+        return []
+    return [{'text': text, 'score': score, 'box': box}
+            for text, score, box in json.loads(zlib.decompress(blob))]
+
+
+def _row_to_dict(row, with_content=False):
+    result = {
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'image_hash': row['image_hash'],
+        'filename': row['filename'],
+        'preset': row['preset'],
+        'created_at': datetime.utcfromtimestamp(row['created_at']).isoformat(),
+        'expense_id': row['expense_id'],
+    }
+    if with_content:
+        result['text'] = row['text']
+        result['lines'] = _unpack_lines(row['lines'])
+    return result
+
+
+class OCRStore:
+    """Indexed SQLite store for OCR output, replacing one .txt file per receipt.
+
+    Rows are indexed by user, image hash, time and linked expense. The file
+    runs in WAL mode so the web process and OCR workers can write to it
+    concurrently.
+    """
+
+    def __init__(self, path=None, retention_days=None):
+        self.path = path or os.getenv('OCR_STORE_PATH', os.path.join(os.getcwd(), 'ocr_store.db'))
+        self.retention_days = int(retention_days or os.getenv('OCR_STORE_RETENTION_DAYS', '365'))
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def add(self, user_id, image_hash, text, lines=None, filename=None, preset=None, created_at=None):
+        """Store one OCR result and return its id."""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO ocr_results (user_id, image_hash, filename, preset, created_at, text, lines) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (user_id, image_hash, filename, preset, created_at or time.time(), text, _pack_lines(lines)),
+            )
+        return cursor.lastrowid
+
+    def link_expense(self, result_id, user_id, expense_id):
+        """Attach a saved expense to the OCR result it was created from."""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                'UPDATE ocr_results SET expense_id = ? WHERE id = ? AND user_id = ?',
+                (expense_id, result_id, user_id),
+            )
+        return cursor.rowcount > 0
+
+    def get(self, result_id, user_id=None):
+        query = 'SELECT * FROM ocr_results WHERE id = ?'
+        params = [result_id]
+        if user_id is not None:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        row = self._conn().execute(query, params).fetchone()
+        return _row_to_dict(row, with_content=True) if row else None
+
+    def find(self, user_id=None, image_hash=None, expense_id=None, since=None, until=None,
+             limit=50, with_content=False):
+        """Newest-first results matching every given filter (all use an index)."""
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append('user_id = ?')
+            params.append(user_id)
+        if image_hash is not None:
+            clauses.append('image_hash = ?')
+            params.append(image_hash)
+        if expense_id is not None:
+            clauses.append('expense_id = ?')
+            params.append(expense_id)
+        if since is not None:
+            clauses.append('created_at >= ?')
+            params.append(since.timestamp() if isinstance(since, datetime) else since)
+        if until is not None:
+            clauses.append('created_at < ?')
+            params.append(until.timestamp() if isinstance(until, datetime) else until)
+
+        columns = '*' if with_content else SUMMARY_COLUMNS
+        query = f'SELECT {columns} FROM ocr_results'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+        params.append(limit)
+        return [_row_to_dict(row, with_content) for row in self._conn().execute(query, params)]
+
+    def purge(self, older_than_days=None, keep_per_user=None, keep_linked=True):
+        """Apply the retention policy and return how many rows were deleted.
+
+        Rows older than older_than_days (default OCR_STORE_RETENTION_DAYS) are
+        removed, and keep_per_user caps how many rows each user keeps. Rows
+        linked to an expense are kept unless keep_linked is False.
+        """
+        days = self.retention_days if older_than_days is None else older_than_days
+        linked = ' AND expense_id IS NULL' if keep_linked else ''
+        conn = self._conn()
+        deleted = 0
+        with conn:
+            if days:
+                cutoff = time.time() - days * 86400
+                deleted += conn.execute(
+                    f'DELETE FROM ocr_results WHERE created_at < ?{linked}', (cutoff,)
+                ).rowcount
+            if keep_per_user:
+                deleted += conn.execute(
+                    f'DELETE FROM ocr_results WHERE id IN ('
+                    f' SELECT id FROM ('
+                    f'  SELECT id, expense_id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS n'
+                    f'  FROM ocr_results'
+                    f' ) WHERE n > ?{linked})',
+                    (keep_per_user,),
+                ).rowcount
+        return deleted
+
+    def compact(self):
+        """Reclaim space left by deleted rows."""
+        conn = self._conn()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('VACUUM')
+
+    def import_text_files(self, directory):
+        """Load legacy ocr_outputs/*.txt files. Returns the number imported."""
+        imported = 0
+        for name in sorted(os.listdir(directory)):
+            match = LEGACY_NAME.match(name)
+            if not match:
+                continue
+            created_at = datetime.strptime(match.group('stamp'), '%Y%m%d_%H%M%S').timestamp()
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                text = f.read()
+            lines = [{'text': line, 'score': None, 'box': None} for line in text.splitlines()]
+            self.add(None, None, text, lines, filename=match.group('base'), created_at=created_at)
+            imported += 1
+        return imported
+
+    def stats(self):
+        conn = self._conn()
+        rows, linked = conn.execute('SELECT COUNT(*), COUNT(expense_id) FROM ocr_results').fetchone()
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return {
+            'rows': rows,
+            'linked_to_expense': linked,
+            'size_bytes': page_count * page_size,
+            'retention_days': self.retention_days,
+        }
+
+
+# Create a global instance
+ocr_store = OCRStore()
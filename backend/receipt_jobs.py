@@ -0,0 +1,227 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+
+class QueueFullError(Exception):
+    """Raised when the receipt queue is at its maximum depth."""
+
+
+def _init_worker():
+    # Load the OCR models as soon as the worker starts instead of on its first job
+    from image_preprocessing import resolve_options, engine_options
+    from ocr_engine import get_ocr_pool
+    get_ocr_pool(engine_options(resolve_options())).warm_up()
+
+    # Apply the OCR store retention policy once per worker start
+    from ocr_store import ocr_store
+    ocr_store.purge()
+
+
+def worker_status():
+    """Report the OCR engine pools of the worker process that runs this."""
+    from ocr_engine import pools_status
+    return {'pid': os.getpid(), 'pools': pools_status()}
+
+
+def record_receipt(ocr_result, image_hash, user_id, filename):
+    """Store an OCR result in the OCR store and parse it into a job result."""
+    from ocr_store import ocr_store
+    from receipt_parser import parse_receipt
+
+    result_id = ocr_store.add(user_id, image_hash, ocr_result['text'], ocr_result['lines'],
+                              filename=filename, preset=ocr_result['preset'])
+    return {
+        'parsed_expense': parse_receipt(ocr_result['text']),
+        'ocr_result_id': result_id,
+        'preset': ocr_result['preset'],
+        'timings': ocr_result['timings'],
+        'cached': ocr_result['cached'],
+    }
+
+
+def process_receipt(image_bytes, user_id, filename, preset=None):
+    """Run OCR and parsing for one encoded receipt image. Executes inside a worker process."""
+    from receipt_parser import read_receipt_bytes
+
+    ocr_result = read_receipt_bytes(image_bytes, preset)
+    if ocr_result.get('error'):
+        raise ValueError(ocr_result['error'])
+    return record_receipt(ocr_result, hashlib.sha256(image_bytes).hexdigest(), user_id, filename)
+
+
+class ReceiptJobQueue:
+    """Local process pool that runs receipt OCR outside the request thread.
+
+    Jobs are tracked in memory by id. Finished jobs are kept for
+    RECEIPT_JOB_TTL seconds so clients have time to poll for the result.
+    """
+
+    def __init__(self, workers=None, max_depth=None, job_ttl=None):
+        self.workers = max(1, int(workers or os.getenv('RECEIPT_WORKERS', '2')))
+        self.max_depth = max(1, int(max_depth or os.getenv('RECEIPT_QUEUE_MAX', '20')))
+        self.job_ttl = int(job_ttl or os.getenv('RECEIPT_JOB_TTL', '3600'))
+
+        self._executor = None
+        self._warm_futures = []
+        self._jobs = {}
+        self._batch_futures = set()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily so importing the app doesn't start worker processes
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def warm_up(self):
+        """Start the worker processes now so they load their OCR models before the first upload."""
+        with self._lock:
+            executor = self._get_executor()
+            self._warm_futures = [executor.submit(worker_status) for _ in range(self.workers)]
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _active_count(self):
+        jobs = sum(1 for job in self._jobs.values() if not job['future'].done())
+        return jobs + len(self._batch_futures)
+
+    def submit(self, user_id, fn, *args):
+        """Queue fn(*args) on the worker pool and return the new job id."""
+        with self._lock:
+            self._prune()
+            if self._active_count() >= self.max_depth:
+                raise QueueFullError(f"Receipt queue is full ({self.max_depth} jobs)")
+
+            job_id = uuid.uuid4().hex
+            future = self._get_executor().submit(fn, *args)
+            self._jobs[job_id] = {
+                'user_id': user_id,
+                'future': future,
+                'created_at': time.time(),
+                'finished_at': None,
+            }
+        future.add_done_callback(lambda _: self._mark_finished(job_id))
+        return job_id
+
+    def complete(self, user_id, result):
+        """Record a job that is already finished (e.g. served from the OCR cache)."""
+        future = Future()
+        future.set_result(result)
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                'user_id': user_id,
+                'future': future,
+                'created_at': time.time(),
+                'finished_at': time.time(),
+            }
+        return job_id
+
+    def _mark_finished(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job['finished_at'] = time.time()
+
+    def get(self, job_id, user_id):
+        """Return the job's status dict, or None if it doesn't exist for this user."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if not job or job['user_id'] != user_id:
+            return None
+
+        future = job['future']
+        status = {'job_id': job_id, 'status': 'pending'}
+        if future.running():
+            status['status'] = 'running'
+        elif future.done():
+            error = future.exception()
+            if error:
+                status['status'] = 'failed'
+                status['error'] = str(error)
+            else:
+                status['status'] = 'done'
+                status.update(future.result())
+        return status
+
+    def submit_batch(self, fn, arg_list, on_done=None):
+        """Fan fn(*args) out across the worker pool for every args tuple.
+
+        Returns {future: index}. on_done(index) is called as each item finishes.
+        The whole batch is rejected unless all of it fits in the queue.
+        """
+        with self._lock:
+            self._prune()
+            active = self._active_count()
+            if active + len(arg_list) > self.max_depth:
+                raise QueueFullError(
+                    f"Receipt queue has room for {max(self.max_depth - active, 0)} of {len(arg_list)} receipts "
+                    f"({self.max_depth} jobs)"
+                )
+
+            executor = self._get_executor()
+            futures = {}
+            for index, args in enumerate(arg_list):
+                future = executor.submit(fn, *args)
+                futures[future] = index
+                self._batch_futures.add(future)
+
+        for future, index in futures.items():
+            future.add_done_callback(lambda f, i=index: self._batch_item_done(f, i, on_done))
+        return futures
+
+    @staticmethod
+    def iter_completed(futures):
+        """Yield (index, result, error) for a batch in completion order."""
+        try:
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                error = future.exception()
+                yield futures[future], (None if error else future.result()), error
+        finally:
+            # Client went away, don't burn worker time on results nobody will read
+            for future in futures:
+                future.cancel()
+
+    def _batch_item_done(self, future, index, on_done):
+        with self._lock:
+            self._batch_futures.discard(future)
+        if on_done:
+            on_done(index)
+
+    def stats(self):
+        with self._lock:
+            self._prune()
+            active = self._active_count()
+            total = len(self._jobs)
+            started = self._executor is not None
+            warm_futures = list(self._warm_futures)
+        engines = [f.result() for f in warm_futures if f.done() and not f.exception()]
+        return {
+            'state': 'warm' if engines else 'cold',
+            'started': started,
+            'engines': engines,
+            'workers': self.workers,
+            'max_depth': self.max_depth,
+            'active': active,
+            'finished': total - active,
+        }
+
+
+# Create a global instance
+receipt_queue = ReceiptJobQueue()
@@ -1,66 +1,346 @@
-from paddleocr import PaddleOCR
+import re
+import time
+from datetime import date
+
 import cv2
 import numpy as np
-import os
+from image_preprocessing import resolve_options, engine_options, preprocess
+from ocr_engine import get_ocr_pool
+from ocr_cache import ocr_cache, make_key
+from keyword_categorizer import keyword_categorizer
 
-os.environ['GLOG_minloglevel'] = '2'  # Suppress paddle warnings
+MIN_CONFIDENCE = 0.69
 
-def extract_receipt_data(image_path):
-    # Read in Image
-    img = cv2.imread(image_path)
-    if img is None:
-        print(f"Error: Could not load image from {image_path}")
-        return ""
+def ocr_image(img, preset=None, overrides=None):
+    """Preprocess a BGR image and run OCR on it.
+
+    Returns {'text', 'lines', 'timings', 'preset'}. 'lines' has every
+    recognized line with its score and box, 'text' only the confident ones.
+    'timings' holds milliseconds per preprocessing stage plus 'ocr'.
+    """
+    options = resolve_options(preset, overrides)
 
     # Preprocess
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    denoised = cv2.medianBlur(gray, 5)
-    _, thresh = cv2.threshold(denoised, 150, 255, cv2.THRESH_BINARY)
-    kernel = np.ones((1,1), np.uint8)
-    processed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-    processed = cv2.morphologyEx(processed, cv2.MORPH_OPEN, kernel)
-    print("Preprocessing Completed!")
-
-    # OCR Inference
-    ocr = PaddleOCR(
-        use_angle_cls=True,
-        lang='en',
-    )
-    result = ocr.predict(input=img)
+    processed, timings = preprocess(img, options)
+    print(f"Preprocessing Completed! ({options['preset']}: {timings})")
+
+    # OCR Inference (engines are loaded once and shared, see ocr_engine.py)
+    start = time.perf_counter()
+    with get_ocr_pool(engine_options(options)).acquire() as ocr:
+        result = ocr.predict(input=processed)
+    timings['ocr'] = round((time.perf_counter() - start) * 1000, 2)
     print(f"OCR Result: {result}")
 
     # Extract Text in Structured Format
     lines = []
     if result and len(result) > 0:
-        # The result structure is: [{'rec_texts': [...], 'rec_scores': [...], ...}]
+        # The result structure is: [{'rec_texts': [...], 'rec_scores': [...], 'rec_boxes': [...], ...}]
         first_result = result[0]
         if 'rec_texts' in first_result:
             rec_texts = first_result['rec_texts']
             rec_scores = first_result.get('rec_scores', [])
-            
+            rec_boxes = first_result.get('rec_boxes', [])
+
             for i, text in enumerate(rec_texts):
-                if i < len(rec_scores):
-                    confidence = rec_scores[i]
-                    if confidence > 0.69:
-                        lines.append(text)
-                        print(f"Text {i}: '{text}', Confidence: {confidence}")
-                else:
-                    lines.append(text)
-                    print(f"Text: '{text}'")
-
-    extracted_text = "\n".join(lines)
-    return extracted_text
+                confidence = float(rec_scores[i]) if i < len(rec_scores) else None
+                box = [int(v) for v in rec_boxes[i]] if i < len(rec_boxes) else None
+                lines.append({'text': text, 'score': confidence, 'box': box})
+                print(f"Text {i}: '{text}', Confidence: {confidence}")
+
+    extracted_text = "\n".join(
+        line['text'] for line in lines
+        if line['score'] is None or line['score'] > MIN_CONFIDENCE
+    )
+    return {
+        'text': extracted_text,
+        'lines': lines,
+        'timings': timings,
+        'preset': options['preset'],
+    }
+
+def cache_key(image_bytes, preset=None, overrides=None):
+    options = dict(resolve_options(preset, overrides), min_confidence=MIN_CONFIDENCE)
+    return make_key(image_bytes, options)
+
+def _cache_lookup(key):
+    start = time.perf_counter()
+    result = ocr_cache.get(key)
+    if result is not None:
+        result['timings'] = {'cache': round((time.perf_counter() - start) * 1000, 2)}
+        result['cached'] = True
+    return result
+
+def cached_ocr(image_bytes, preset=None, overrides=None):
+    """Return the cached OCR result for these image bytes, or None."""
+    return _cache_lookup(cache_key(image_bytes, preset, overrides))
+
+def read_receipt_bytes(image_bytes, preset=None, overrides=None):
+    """OCR an encoded image (JPEG, PNG, ...), using the OCR cache when possible.
+
+    See ocr_image for the result format. Cache hits carry 'cached': True.
+    """
+    key = cache_key(image_bytes, preset, overrides)
+    result = _cache_lookup(key)
+    if result is not None:
+        return result
+
+    start = time.perf_counter()
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    decode_ms = round((time.perf_counter() - start) * 1000, 2)
+    if img is None:
+        print("Error: Could not decode image")
+        return {'text': '', 'lines': [], 'timings': {'decode': decode_ms}, 'preset': preset, 'cached': False,
+                'error': 'Could not decode image'}
+
+    result = ocr_image(img, preset, overrides)
+    ocr_cache.put(key, {'text': result['text'], 'lines': result['lines'], 'preset': result['preset']})
+    result['timings'] = dict(decode=decode_ms, **result['timings'])
+    result['cached'] = False
+    return result
+
+def read_receipt(image_path, preset=None, overrides=None):
+    """Load an image from disk and OCR it, see read_receipt_bytes."""
+    try:
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+    except OSError:
+        print(f"Error: Could not load image from {image_path}")
+        return {'text': '', 'lines': [], 'timings': {}, 'preset': preset, 'cached': False}
+    return read_receipt_bytes(image_bytes, preset, overrides)
+
+def extract_receipt_data(image_path, preset=None):
+    return read_receipt(image_path, preset)['text']
+
+# Receipt parsing: compiled once, applied in a single pass over the OCR lines
+AMOUNT_RE = re.compile(r'(?<![\d.])\$?\s?(-?\d{1,6}[.,]\d{1,2})(?![\d.])')
+PRICE_LINE_RE = re.compile(
+    r'^(?P<name>.*?)\s*(?P<minus>-)?\$?\s?(?P<amount>\d{1,6}[.,]\d{1,2})\s*(?P<flag>[A-Z]{1,2}|<\+?)?\s*(?P<credit>-)?$'
+)
+# One alternation for every keyword that changes parser state; the named group says which.
+# The lookahead holds their first letters, so most positions fail before trying the alternation.
+KEYWORD_RE = re.compile(
+    r'\b(?=[ABCDEGMPSTV])(?:(?P<subtotal>SUB\s?-?TOTAL)|(?P<tax>(?:SALES\s+|TOTAL\s+)?TAX)|'
+    r'(?P<skip>CHANGE|CASH\s+BACK|TIP|TENDERED?|TOTAL\s+(?:NUMBER|ITEMS|SAVINGS))|'
+    r'(?P<total>TOTAL|BAL(?:ANCE)?(?:\s+DUE)?|AMOUNT\s+DUE|AMT\s+DUE)|'
+    r'(?P<payment>VISA|MASTER\s?CARD|MC|AMEX|AMERICAN\s+EXPRESS|DISCOVER|DEBIT|CREDIT|EBT|'
+    r'APPLE\s+PAY|GOOGLE\s+PAY|PAYPAL|GIFT\s+CARD|CASH)|'
+    r'(?P<savings>SA[VU]{1,2}ED|SAVINGS|DISCOUNT|COUPON|MARKDOWN|MEMBER\s+DEAL))\b'
+)
+PAYMENT_NAMES = {
+    'VISA': 'Visa', 'MASTERCARD': 'Mastercard', 'MASTER CARD': 'Mastercard', 'MC': 'Mastercard',
+    'AMEX': 'American Express', 'AMERICAN EXPRESS': 'American Express', 'DISCOVER': 'Discover',
+    'DEBIT': 'Debit Card', 'CREDIT': 'Credit Card', 'EBT': 'EBT', 'APPLE PAY': 'Apple Pay',
+    'GOOGLE PAY': 'Google Pay', 'PAYPAL': 'PayPal', 'GIFT CARD': 'Gift Card', 'CASH': 'Cash',
+}
+DATE_RE = re.compile(
+    r'\b(?:(?P<iy>\d{4})[-/.](?P<im>\d{1,2})[-/.](?P<id>\d{1,2})|'
+    r'(?P<um>\d{1,2})[-/.](?P<ud>\d{1,2})[-/.](?P<uy>\d{4}|\d{2})|'
+    r'(?P<mon>JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)[A-Z]*\.?\s+(?P<md>\d{1,2}),?\s+(?P<my>\d{4}))\b'
+)
+MONTHS = {name: i for i, name in enumerate(
+    ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'], start=1)}
+PHONE_RE = re.compile(r'\(?\d{3}\)?[\s.-]?\d{3}[\s.-]\d{4}')
+ADDRESS_RE = re.compile(r'^\d+\s+\w+.*\b(?:ST|STREET|AVE|AVENUE|BLVD|RD|ROAD|DR|DRIVE|HWY|WAY|LN|PKWY|PLAZA)\b\.?')
+# Short codes printed next to prices (tax flags, department codes) carry no item text
+NOISE_TOKENS = frozenset({'F', 'T', 'N', 'X', 'S', 'B', 'RC', 'SC', 'MR', 'TF', 'TX', 'WT', '@', '<+', '+'})
+FILLER_TOKENS = frozenset({'YOU', 'YOLI', 'YOL', 'Y0U'})
+LETTERS_RE = re.compile(r'[A-Za-z]')
+TWO_LETTERS_RE = re.compile(r'[A-Z][^A-Z]*[A-Z]')
+WORD_RE = re.compile(r'\w')
+
+
+def _money(value):
+    return None if value is None else f"{value:.2f}"
+
+
+def _to_amount(text):
+    return round(float(text.replace(',', '.')), 2)
+
+
+def _find_date(upper_text):
+    for match in DATE_RE.finditer(upper_text):
+        if match.group('iy'):
+            year, month, day = match.group('iy', 'im', 'id')
+        elif match.group('uy'):
+            month, day, year = match.group('um', 'ud', 'uy')
+            year = year if len(year) == 4 else f'20{year}'
+        else:
+            month, day, year = MONTHS[match.group('mon')], match.group('md'), match.group('my')
+        try:
+            return date(int(year), int(month), int(day)).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _find_merchant(lines):
+    for line in lines[:8]:
+        if len(LETTERS_RE.findall(line)) >= 3 and not PHONE_RE.search(line) and not ADDRESS_RE.match(line.upper()):
+            return line.strip()
+    return None
+
 
 def parse_receipt(ocr_text):
     """
-    Placeholder function for fine-tuned GPT-2 which will output JSON:
+    Rule-based receipt parser, returns JSON:
     {
-        merchant: "..."
-        description: "..."
-        amount: "..."
-        category: "..."
-        payment_method: "..."
-        date: "..."
+        merchant: "Ralphs"
+        description: "Ralphs: KRO CRM CHEESE, CHOBANI YOGURT, ..."
+        amount: "31.48"            # total as a string with 2 decimals, or null
+        category: "Other"
+        payment_method: "Visa"     # or null
+        date: "2025-09-11"         # ISO date, or null
+        subtotal: "45.39"
+        tax: "0.00"
+        discount: "13.91"          # sum of "SAVED YOU" style lines
+        line_items: [{name: "...", price: "4.29", discount: "0.00"}, ...]
+        raw_text: "..."
     }
     """
-    return {"raw_text": ocr_text}
\ No newline at end of file
+    lines = [line for line in map(str.strip, (ocr_text or '').splitlines()) if line]
+    merchant = _find_merchant(lines)
+    # Lines made only of the store name and "YOU" are leftovers of split discount lines
+    merchant_tokens = frozenset((merchant or '').upper().split())
+    filler_tokens = FILLER_TOKENS | merchant_tokens
+
+    items = []
+    names = []              # item name fragments seen since the last price
+    pending = None          # 'total' | 'subtotal' | 'tax' | 'skip' -> next amount belongs to it
+    discount_pending = False
+    totals = {'total': None, 'subtotal': None, 'tax': None}
+    payment_method = None
+    tendered = False
+    receipt_date = None
+
+    def take_amount(amount, flagged, credit=False):
+        nonlocal pending, discount_pending
+        if pending:
+            if pending != 'skip':
+                totals[pending] = amount
+            pending = None
+        elif credit:
+            # "2.00-" and "-$1.00" take money off the item above them
+            if items and not tendered:
+                items[-1]['discount'] = round(items[-1]['discount'] + amount, 2)
+            discount_pending = False
+            names.clear()
+        elif discount_pending and not flagged:
+            if items:
+                items[-1]['discount'] = round(items[-1]['discount'] + abs(amount), 2)
+            discount_pending = False
+        elif names:
+            # Once the payment is printed only card details and footers are left
+            if not tendered:
+                items.append({'name': ' '.join(names), 'price': amount, 'discount': 0.0})
+            names.clear()
+        # An amount with nothing to attach to is an OCR fragment, drop it
+
+    for line in lines[1:]:
+        upper = line.upper()
+        if upper in NOISE_TOKENS or '@' in upper:
+            # '@' marks unit price details ("3 @ 2.16", "1.12 lb @ $1.49 /lb")
+            continue
+        # Cheap substring checks keep the date regex off lines that can't hold a date
+        if receipt_date is None and ('/' in upper or '-' in upper or '20' in upper):
+            receipt_date = _find_date(upper)
+
+        # Most lines on a receipt are a bare price, those can't hold a keyword
+        price = PRICE_LINE_RE.match(upper) if '.' in upper or ',' in upper else None
+        if price:
+            name, minus, amount, flag, credit = price.groups()
+            amount = _to_amount(amount)
+            credit = bool(minus or credit)
+            if not name:
+                take_amount(amount, flag is not None, credit)
+                continue
+
+        match = KEYWORD_RE.search(upper)
+        keyword = match.lastgroup if match else None
+        # Totals start their line, "COLGATE TOTAL WHTN" is an item
+        if keyword in ('total', 'subtotal') and WORD_RE.search(upper, 0, match.start()):
+            keyword = None
+
+        if keyword == 'savings':
+            if tendered or totals['total'] is not None:
+                # Below the total, "YOU SAVED $2.00 TODAY" sums up the savings already taken off the items
+                continue
+            amount = AMOUNT_RE.search(upper)
+            if amount and items:
+                items[-1]['discount'] = round(items[-1]['discount'] + abs(_to_amount(amount.group(1))), 2)
+            else:
+                discount_pending = True
+            continue
+
+        if keyword:
+            if keyword == 'payment':
+                if payment_method is None:
+                    method = ' '.join(match.group('payment').split())
+                    payment_method = PAYMENT_NAMES.get(method, method.title())
+                tendered = True
+                keyword = 'skip'
+            names.clear()
+            if price and keyword != 'skip':
+                totals[keyword] = amount
+            else:
+                pending = None if price else keyword
+            continue
+
+        if price:
+            name = name.strip()
+            if line != upper:
+                # Mixed case again: a header or footer, its amount only fills a pending total
+                names.clear()
+            elif name and LETTERS_RE.search(name) and not set(name.split()) <= NOISE_TOKENS:
+                names.append(name)
+            take_amount(amount, bool(flag), credit)
+            continue
+
+        tokens = upper.split()
+        token_set = set(tokens)
+        if token_set <= NOISE_TOKENS or upper.isdigit():
+            continue
+        if token_set <= filler_tokens:
+            if token_set & merchant_tokens and items and not tendered:
+                # "RALPHS SAVED YOU 1.50" split up, with "SAVED" lost to OCR
+                discount_pending = True
+            continue
+        # Item names are printed in capitals, mixed-case lines are headers and footers
+        if line != upper or not TWO_LETTERS_RE.search(upper) or PHONE_RE.search(upper) or ADDRESS_RE.match(upper):
+            names.clear()
+            continue
+
+        while tokens and tokens[-1] in NOISE_TOKENS:
+            tokens.pop()
+        if tokens:
+            names.append(' '.join(tokens))
+
+    subtotal = totals['subtotal']
+    if subtotal is None and items:
+        subtotal = round(sum(item['price'] for item in items), 2)
+    discount = round(sum(item['discount'] for item in items), 2)
+    total = totals['total']
+    if total is None and subtotal is not None:
+        total = round(subtotal - (discount if totals['subtotal'] is None else 0) + (totals['tax'] or 0), 2)
+
+    item_names = [item['name'] for item in items]
+    description = merchant or ''
+    if item_names:
+        shown = ', '.join(item_names[:5]) + (f' and {len(item_names) - 5} more' if len(item_names) > 5 else '')
+        description = f"{description}: {shown}" if description else shown
+
+    return {
+        'merchant': merchant,
+        'description': description,
+        'amount': _money(total),
+        'category': keyword_categorizer.categorize(merchant) if merchant else None,
+        'payment_method': payment_method,
+        'date': receipt_date,
+        'subtotal': _money(subtotal),
+        'tax': _money(totals['tax']),
+        'discount': _money(discount),
+        'line_items': [
+            {'name': item['name'], 'price': _money(item['price']), 'discount': _money(item['discount'])}
+            for item in items
+        ],
+        'raw_text': ocr_text,
+    }
@@ -0,0 +1,65 @@
+import json
+
+from money import from_minor
+
+try:
+    import orjson
+except ImportError:
+    # Optional, the standard library encoder is used without it
+    orjson = None
+
+# Columns selected for expense responses, in Expense.to_dict() key order
+EXPENSE_FIELDS = ('id', 'merchant', 'amount_cents', 'description', 'category', 'payment_method', 'date', 'created_at', 'user_id')
+
+
+def _default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(value):
+    """Compact JSON as bytes, with orjson when it is installed. Dates and datetimes become ISO strings."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), default=_default).encode()
+
+
+def expense_dict(row):
+    """Expense.to_dict() for a row of EXPENSE_FIELDS, built without an ORM instance.
+
+    Dates are left as date/datetime objects, the encoder writes them in ISO format.
+    """
+    expense_id, merchant, amount_cents, description, category, payment_method, day, created_at, user_id = row
+    return {
+        'id': expense_id,
+        'merchant': merchant,
+        'amount': from_minor(amount_cents),
+        'description': description,
+        'category': category,
+        'payment_method': payment_method,
+        'date': day,
+        'created_at': created_at,
+        'user_id': user_id
+    }
+
+
+def iter_json_array(batches):
+    """Yield a JSON array of the items in `batches` (an iterable of lists), one encoded piece per batch."""
+    yield b'['
+    first = True
+    for batch in batches:
+        if not batch:
+            continue
+        # Encode the batch as one list and drop its brackets
+        body = dumps(batch)[1:-1]
+        yield body if first else b',' + body
+        first = False
+    yield b']'
+
+
+def iter_ndjson(batches):
+    """Yield one JSON document per line for the items in `batches`, one piece per batch."""
+    for batch in batches:
+        if batch:
+            yield b'\n'.join(dumps(item) for item in batch) + b'\n'
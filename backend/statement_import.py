@@ -0,0 +1,217 @@
+import csv
+import functools
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+# Lowercased CSV headers (underscores read as spaces) for each expense field
+CSV_COLUMNS = {
+    'date': ['date', 'transaction date', 'trans date', 'posted date', 'posting date', 'post date'],
+    'amount': ['amount', 'transaction amount'],
+    'debit': ['debit', 'debits', 'withdrawal', 'withdrawals', 'money out'],
+    'credit': ['credit', 'credits', 'deposit', 'deposits', 'money in'],
+    'description': ['description', 'memo', 'details', 'narrative', 'transaction description'],
+    'merchant': ['merchant', 'payee', 'name', 'merchant name'],
+    'category': ['category'],
+    'payment_method': ['payment method', 'payment', 'account', 'card'],
+}
+
+# Statement date formats, tried in order and rewritten as YYYY-MM-DD
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%Y/%m/%d', '%d %b %Y', '%b %d, %Y']
+
+OFX_TAG_RE = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+READ_SIZE = 64 * 1024
+
+
+class StatementFormatError(ValueError):
+    """Raised when an upload can't be read as the statement format it claims to be."""
+
+
+def detect_format(filename, content_type, head):
+    """'csv' or 'ofx' from the file name, content type or the first bytes of the upload."""
+    name = (filename or '').lower()
+    if name.endswith(('.ofx', '.qfx')) or 'ofx' in (content_type or ''):
+        return 'ofx'
+    if name.endswith('.csv') or 'csv' in (content_type or ''):
+        return 'csv'
+    return 'ofx' if b'OFXHEADER' in head or b'<OFX>' in head.upper() else 'csv'
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_date(value):
+    """Statement date as YYYY-MM-DD, or the original text when no known format matches."""
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return value
+
+
+def _signed_amount(value):
+    """Parse "$1,234.50", "-12.00" or "(12.00)" into a Decimal, None if it isn't a number."""
+    text = (value or '').strip().replace(',', '').replace('$', '').replace('€', '').replace('£', '').replace(' ', '')
+    negative = text.startswith('(') and text.endswith(')')
+    if negative:
+        text = text[1:-1]
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        return None
+    return -amount if negative else amount
+
+
+def _expense_amount(amount, debit=None, credit=None, debits='positive'):
+    """The expense amount as text, or None for rows that aren't spending (credits, refunds, blanks).
+
+    Text that isn't a number is passed through unchanged so the caller's
+    validation reports it. debits='negative' is for statements that write
+    money out as negative amounts.
+    """
+    if debit is not None or credit is not None:
+        if (debit or '').strip():
+            parsed = _signed_amount(debit)
+            return debit.strip() if parsed is None else str(abs(parsed))
+        return None
+
+    if not (amount or '').strip():
+        return amount
+    parsed = _signed_amount(amount)
+    if parsed is None:
+        return amount.strip()
+    # Whichever sign is money coming in (refunds, payments, deposits) is skipped
+    if debits == 'negative':
+        return str(-parsed) if parsed < 0 else None
+    return str(parsed) if parsed > 0 else None
+
+
+def _text_stream(stream):
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def iter_csv(stream, debits='positive'):
+    """Yield (row_number, fields) for each row of a CSV statement, read from a binary stream.
+
+    fields has merchant, description, amount, category, payment_method and
+    date as text ('' when the statement has no such column), or is None for
+    rows that aren't spending. row_number counts the header as row 1.
+    """
+    reader = csv.reader(_text_stream(stream))
+    header = next(reader, None)
+    if header is None:
+        raise StatementFormatError('The CSV file is empty')
+
+    names = [column.strip().lower().replace('_', ' ') for column in header]
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    if 'date' not in columns:
+        raise StatementFormatError('The CSV header needs a date column')
+    if 'amount' not in columns and 'debit' not in columns:
+        raise StatementFormatError('The CSV header needs an amount or debit column')
+
+    for row_number, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+
+        def cell(field):
+            index = columns.get(field)
+            return row[index].strip() if index is not None and index < len(row) else ''
+
+        if 'debit' in columns:
+            amount = _expense_amount(None, cell('debit'), cell('credit') if 'credit' in columns else '', debits)
+        else:
+            amount = _expense_amount(cell('amount'), debits=debits)
+        if amount is None:
+            yield row_number, None
+            continue
+
+        yield row_number, {
+            'date': normalize_date(cell('date')),
+            'amount': amount,
+            'merchant': cell('merchant'),
+            'description': cell('description'),
+            'category': cell('category'),
+            'payment_method': cell('payment_method'),
+        }
+
+
+def _ofx_tags(stream):
+    """Yield (closing, tag, text) for every tag in an OFX file, SGML (v1) or XML (v2)."""
+    text = _text_stream(stream)
+    buffer = ''
+    while True:
+        chunk = text.read(READ_SIZE)
+        buffer += chunk
+        # Keep a partial tag at the end of the buffer for the next read
+        cut = len(buffer) if not chunk else buffer.rfind('<')
+        for match in OFX_TAG_RE.finditer(buffer, 0, max(cut, 0)):
+            yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+        if not chunk:
+            return
+        buffer = buffer[cut:] if cut >= 0 else ''
+
+
+def _ofx_date(value):
+    """OFX dates look like 20240131, 20240131120000 or 20240131120000.000[-5:EST]."""
+    try:
+        return datetime.strptime(value[:8], '%Y%m%d').date().isoformat()
+    except ValueError:
+        return value
+
+
+def iter_ofx(stream):
+    """Yield (transaction_number, fields) for each STMTTRN in an OFX/QFX statement.
+
+    OFX amounts are signed from the account's point of view, so only
+    negative TRNAMTs are spending. Payment method is 'Credit Card' for
+    credit card statements and 'Bank Account' otherwise.
+    """
+    payment_method = 'Bank Account'
+    transaction = None
+    number = 0
+    seen_ofx = False
+    for closing, tag, value in _ofx_tags(stream):
+        if tag == 'OFX':
+            seen_ofx = True
+        elif tag == 'CCSTMTRS' and not closing:
+            payment_method = 'Credit Card'
+        elif tag == 'STMTRS' and not closing:
+            payment_method = 'Bank Account'
+        elif tag == 'STMTTRN':
+            if not closing:
+                transaction = {}
+                continue
+            if transaction is None:
+                continue
+            number += 1
+            parsed = _signed_amount(transaction.get('TRNAMT'))
+            if parsed is not None and parsed >= 0:
+                yield number, None
+            else:
+                name = transaction.get('NAME') or transaction.get('PAYEE', '')
+                yield number, {
+                    'date': _ofx_date(transaction.get('DTPOSTED', '')),
+                    'amount': str(-parsed) if parsed is not None else transaction.get('TRNAMT', ''),
+                    'merchant': name,
+                    'description': transaction.get('MEMO') or name,
+                    'category': '',
+                    'payment_method': payment_method,
+                }
+            transaction = None
+        elif transaction is not None and not closing and value:
+            transaction[tag] = value
+    if not seen_ofx:
+        raise StatementFormatError('No <OFX> element found, is this an OFX file?')
+
+
+def iter_statement(stream, fmt, debits='positive'):
+    if fmt == 'ofx':
+        return iter_ofx(stream)
+    return iter_csv(stream, debits)
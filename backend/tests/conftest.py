@@ -0,0 +1,94 @@
+"""Shared fixtures: the Flask app on an in-memory SQLite database.
+
+The environment is set before app.py is imported, since it reads its
+configuration at import time. Hugging Face stays disabled, so
+categorization falls back to the keyword rules.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['HUGGING_FACE_TOKEN'] = ''
+os.environ['OCR_WARM_ON_START'] = 'false'
+os.environ['OCR_CACHE_ENABLED'] = 'false'
+os.environ['OCR_STORE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='ocr_store_'), 'ocr_store.db')
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-for-the-backend-tests')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-jwt-key-for-the-backend-tests')
+
+
+@pytest.fixture(scope='session')
+def backend():
+    """The app module, imported once per test run."""
+    import app as backend
+    return backend
+
+
+@pytest.fixture
+def app(backend):
+    """The Flask app with empty tables and the search index, dropped again after the test.
+
+    The process-wide categorization cache is cleared too, user ids start over in every test.
+    """
+    from categorization_cache import categorization_cache
+    from expense_search import expense_search
+
+    with backend.app.app_context():
+        backend.db.create_all()
+        with backend.db.engine.begin() as connection:
+            expense_search.ensure_schema(connection)
+    yield backend.app
+    with backend.app.app_context():
+        backend.db.session.remove()
+        with backend.db.engine.begin() as connection:
+            for statement in expense_search.drop_schema(connection.dialect.name):
+                connection.exec_driver_sql(statement)
+        backend.db.drop_all()
+    categorization_cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """register(username) -> Authorization headers for a new user."""
+    def register(username='alice'):
+        response = client.post('/api/register', json={'username': username, 'password': 'secret1'})
+        assert response.status_code == 201, response.get_json()
+        return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+    return register
+
+
+@pytest.fixture
+def add_expense(client):
+    """add_expense(headers, **fields) -> the created expense, with defaults for fields not given."""
+    def add_expense(headers, **fields):
+        data = dict(merchant='Corner Cafe', description='coffee', amount='4.50', category='Food & Dining',
+                    payment_method='Visa', date='2025-03-14')
+        data.update(fields)
+        response = client.post('/api/expenses', json=data, headers=headers)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['expense']
+    return add_expense
+
+
+@pytest.fixture
+def check_rollups(app, backend):
+    """check_rollups() asserts the stored rollups equal a fresh aggregation of the expenses.
+
+    Returns the stored daily rows as {(user_id, date, category): [total_cents, count]}.
+    """
+    def check_rollups():
+        with app.app_context():
+            daily, monthly = backend._expected_rollups()
+            stored_daily = backend._stored_rollups(backend.DailySpending, 'date')
+            assert stored_daily == daily
+            assert backend._stored_rollups(backend.MonthlySpending, 'month') == monthly
+            # Rows emptied by moves and deletes are removed, not left at zero
+            assert all(count > 0 for _, count in stored_daily.values())
+            return stored_daily
+    return check_rollups
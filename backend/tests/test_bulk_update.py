@@ -0,0 +1,100 @@
+import pytest
+
+
+@pytest.fixture
+def headers(register):
+    return register('alice')
+
+
+@pytest.fixture
+def expenses(headers, add_expense):
+    return [add_expense(headers, description=f'expense {i}', amount=f'{i + 1}.00') for i in range(4)]
+
+
+def list_expenses(client, headers):
+    return {e['id']: e for e in client.get('/api/expenses', headers=headers).get_json()}
+
+
+def test_patch_returns_a_result_per_id(client, headers, expenses):
+    ids = [expenses[0]['id'], 999, expenses[1]['id'], expenses[0]['id']]
+    response = client.post('/api/expenses/bulk', json={'ids': ids, 'patch': {'category': ' Shopping '}},
+                           headers=headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['updated'], body['not_found']) == (2, 1)
+    assert [(r['id'], r['status']) for r in body['results']] == [
+        (expenses[0]['id'], 'updated'), (999, 'not_found'), (expenses[1]['id'], 'updated'),
+    ]
+    assert body['results'][0]['expense']['category'] == 'Shopping'
+
+    saved = list_expenses(client, headers)
+    assert [saved[e['id']]['category'] for e in expenses] == ['Shopping', 'Shopping', 'Food & Dining', 'Food & Dining']
+
+
+def test_delete(client, headers, expenses):
+    ids = [e['id'] for e in expenses[:3]]
+    body = client.post('/api/expenses/bulk', json={'ids': ids, 'delete': True}, headers=headers).get_json()
+    assert body['deleted'] == 3
+    assert [r['status'] for r in body['results']] == ['deleted'] * 3
+    assert list(list_expenses(client, headers)) == [expenses[3]['id']]
+
+
+def test_other_users_expenses_are_not_found_and_untouched(client, headers, expenses, register, add_expense):
+    other = register('bob')
+    theirs = add_expense(other, description='bob only')
+    for request in ({'patch': {'amount': '1.00'}}, {'delete': True}):
+        body = client.post('/api/expenses/bulk', json=dict(request, ids=[theirs['id']]), headers=headers).get_json()
+        assert body['results'] == [{'id': theirs['id'], 'status': 'not_found'}]
+    assert list_expenses(client, other) == {theirs['id']: theirs}
+
+
+@pytest.mark.parametrize('failing', ['_apply_rollup_deltas', '_record_expense_change'])
+@pytest.mark.parametrize('request_body', [
+    {'patch': {'amount': '99.00', 'category': 'Travel', 'description': 'changed'}},
+    {'delete': True},
+])
+def test_failure_rolls_back_every_row(client, headers, expenses, backend, monkeypatch, check_rollups,
+                                      failing, request_body):
+    before = list_expenses(client, headers)
+    etag = client.get('/api/expenses?limit=50', headers=headers).headers['ETag']
+    rollups = check_rollups()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('database went away')
+    # After the UPDATE/DELETE has run, before the commit
+    monkeypatch.setattr(backend, failing, fail)
+
+    response = client.post('/api/expenses/bulk', json=dict(request_body, ids=[e['id'] for e in expenses]),
+                           headers=headers)
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'database went away'}
+
+    monkeypatch.undo()
+    assert list_expenses(client, headers) == before
+    assert check_rollups() == rollups
+    response = client.get('/api/expenses?limit=50', headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize('request_body, error', [
+    ({}, 'No data provided'),
+    ({'ids': [], 'delete': True}, 'ids must be a non-empty list'),
+    ({'ids': 5, 'delete': True}, 'ids must be a non-empty list'),
+    ({'ids': ['5'], 'delete': True}, 'ids must be integers'),
+    ({'ids': [True], 'delete': True}, 'ids must be integers'),
+    ({'ids': [1, 2, 3], 'delete': True}, 'At most 2 ids per request'),
+    ({'ids': [1]}, 'Send either a patch or delete: true'),
+    ({'ids': [1], 'delete': True, 'patch': {'category': 'Other'}}, 'Send either a patch or delete: true'),
+    ({'ids': [1], 'patch': ['category']}, 'patch must be an object'),
+    ({'ids': [1], 'patch': {}}, 'patch has no fields to update'),
+    ({'ids': [1], 'patch': {'amount': '-3'}}, 'Amount must be greater than 0'),
+    ({'ids': [1], 'patch': {'category': 7}}, 'category must be a string'),
+    ({'ids': [1], 'patch': {'date': 20250301}}, 'Invalid date format. Use YYYY-MM-DD'),
+])
+def test_bad_requests_change_nothing(client, headers, expenses, backend, monkeypatch, request_body, error):
+    monkeypatch.setattr(backend, 'BULK_MAX_IDS', 2)
+    before = list_expenses(client, headers)
+    response = client.post('/api/expenses/bulk', json=request_body, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+    assert list_expenses(client, headers) == before
@@ -0,0 +1,69 @@
+import copy
+
+import pytest
+
+from categorization_cache import CategorizationCache
+
+
+@pytest.fixture
+def headers(register):
+    return register('alice')
+
+
+@pytest.fixture
+def cache(backend):
+    return backend.categorization_cache
+
+
+def categorize(client, headers, description):
+    body = client.post('/api/expenses/categorize', json={'description': description}, headers=headers).get_json()
+    return body['suggested_category'], body['source']
+
+
+def test_every_write_updates_the_learned_mapping_in_place(app, backend, client, headers, add_expense, cache):
+    first = add_expense(headers, merchant='Iron Works', description='gym', category='Shopping')
+    second = add_expense(headers, merchant='Iron Works', description='gym', category='Shopping')
+    assert categorize(client, headers, 'gym') == ('Shopping', 'learned')
+    loads = cache.stats()['user_loads']
+
+    client.put(f"/api/expenses/{first['id']}", json={'category': 'Travel'}, headers=headers)
+    client.put(f"/api/expenses/{second['id']}", json={'category': 'Travel'}, headers=headers)
+    assert categorize(client, headers, 'gym') == ('Travel', 'learned')
+
+    client.post('/api/expenses/bulk', json={'ids': [first['id'], second['id']], 'patch': {'category': 'Utilities'}},
+                headers=headers)
+    assert categorize(client, headers, 'gym') == ('Utilities', 'learned')
+    client.post('/api/expenses/bulk', json={'ids': [first['id'], second['id']], 'patch': {'description': 'rent'}},
+                headers=headers)
+    assert categorize(client, headers, 'rent') == ('Utilities', 'learned')
+    # Still found through the merchant, which didn't change
+    assert categorize(client, headers, 'Iron Works') == ('Utilities', 'learned')
+
+    client.post('/api/expenses/bulk', json={'ids': [first['id']], 'delete': True}, headers=headers)
+    client.delete(f"/api/expenses/{second['id']}", headers=headers)
+    assert categorize(client, headers, 'rent')[1] != 'learned'
+
+    client.post('/api/expenses/import', data='Date,Payee,Amount,Category\n2025-03-01,Iron Works,30.00,Travel\n'
+                                             '2025-03-02,Iron Works,30.00,Travel\n',
+                content_type='text/csv', headers=headers)
+    assert categorize(client, headers, 'Iron Works') == ('Travel', 'learned')
+    assert cache.stats()['user_loads'] == loads
+
+    # The same as loading the history from scratch
+    with app.app_context():
+        user_id = backend.User.query.filter_by(username='alice').one().id
+        kept = copy.deepcopy(cache._user_mapping(user_id))
+        cache.forget_user(user_id)
+        assert cache._user_mapping(user_id) == kept
+
+
+def test_loader_rows_carry_counts():
+    cache = CategorizationCache(loader=lambda user_id: [
+        ('Metro', 'subway fare', 'Transportation', 3),
+        ('Metro', 'parking', 'Shopping', 1),
+    ])
+    assert cache.lookup(1, 'Metro') == ('Transportation', 0.75, 'learned')
+
+    cache.learn(1, 'Metro', 'subway fare', 'Transportation', -3)
+    assert cache.lookup(1, 'Metro') == ('Shopping', 1.0, 'learned')
+    assert cache.lookup(1, 'subway fare') == (None, None, None)
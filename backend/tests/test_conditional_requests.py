@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.http import http_date
+
+READ_URLS = [
+    '/api/expenses',
+    '/api/expenses?limit=2&category=Food%20%26%20Dining',
+    '/api/expenses/search?q=coffee',
+    '/api/dashboard/summary',
+    '/api/dashboard/spending',
+]
+
+
+def get(client, url, headers, extra=None):
+    """GET and read the body, so a streamed list is finished before the next request."""
+    response = client.get(url, headers=dict(headers, **(extra or {})))
+    response.get_data()
+    return response
+
+
+@pytest.fixture
+def headers(register, add_expense):
+    headers = register('alice')
+    add_expense(headers)
+    return headers
+
+
+@pytest.mark.parametrize('url', READ_URLS)
+def test_matching_etag_gets_a_304(client, headers, url):
+    first = get(client, url, headers)
+    assert first.status_code == 200
+    assert first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+    assert 'Authorization' in first.headers['Vary']
+
+    second = get(client, url, headers, {'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+@pytest.mark.parametrize('change', ['add', 'update', 'delete', 'bulk', 'import'])
+def test_every_write_changes_the_etag(client, headers, add_expense, change):
+    etag = get(client, '/api/expenses', headers).headers['ETag']
+    expense_id = get(client, '/api/expenses', headers).get_json()[0]['id']
+
+    if change == 'add':
+        add_expense(headers)
+    elif change == 'update':
+        client.put(f'/api/expenses/{expense_id}', json={'description': 'tea'}, headers=headers)
+    elif change == 'delete':
+        client.delete(f'/api/expenses/{expense_id}', headers=headers)
+    elif change == 'bulk':
+        client.post('/api/expenses/bulk', json={'ids': [expense_id], 'patch': {'category': 'Other'}}, headers=headers)
+    else:
+        client.post('/api/expenses/import', data='Date,Payee,Amount,Category\n2025-03-01,Metro,2.75,Transportation\n',
+                    content_type='text/csv', headers=headers)
+
+    response = get(client, '/api/expenses', headers, {'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_etag_is_per_query_and_per_user(client, headers, register, add_expense):
+    etag = get(client, '/api/expenses', headers).headers['ETag']
+    filtered = get(client, '/api/expenses?category=Shopping', headers, {'If-None-Match': etag})
+    assert filtered.status_code == 200
+
+    # Same version number and path, but another user's data
+    other = register('bob')
+    add_expense(other)
+    response = get(client, '/api/expenses', other, {'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def set_changed_at(app, backend, when):
+    """Pretend alice's last write happened at `when` (naive UTC)."""
+    with app.app_context():
+        backend.User.query.filter_by(username='alice').update({'data_updated_at': when})
+        backend.db.session.commit()
+
+
+def test_if_modified_since(app, backend, client, headers):
+    set_changed_at(app, backend, datetime.utcnow() - timedelta(seconds=10, microseconds=300000))
+    first = get(client, '/api/expenses', headers)
+    last_modified = first.headers['Last-Modified']
+
+    response = get(client, '/api/expenses', headers, {'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+    older = 'Mon, 01 Jan 2001 00:00:00 GMT'
+    response = get(client, '/api/expenses', headers, {'If-Modified-Since': older})
+    assert response.status_code == 200
+
+    set_changed_at(app, backend, datetime.utcnow() - timedelta(seconds=5))
+    response = get(client, '/api/expenses', headers, {'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+
+
+def test_write_in_the_same_second_is_not_hidden(app, backend, client, headers):
+    # Two writes in one second that hasn't ended yet, with a read in between
+    second = datetime.utcnow().replace(microsecond=0) + timedelta(seconds=2)
+    set_changed_at(app, backend, second + timedelta(microseconds=100000))
+    first = get(client, '/api/expenses', headers)
+    assert first.status_code == 200
+    assert 'Last-Modified' not in first.headers
+    set_changed_at(app, backend, second + timedelta(microseconds=700000))
+
+    # Truncating to the second would have dated the first read `second`
+    for since in (second, second + timedelta(seconds=1)):
+        response = get(client, '/api/expenses', headers, {'If-Modified-Since': http_date(since)})
+        assert response.status_code == 200
+
+
+def test_if_none_match_wins_over_if_modified_since(client, headers):
+    response = get(client, '/api/expenses', headers, {
+        'If-None-Match': '"v0-stale"', 'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT',
+    })
+    assert response.status_code == 200
+
+
+def test_compressed_etag_revalidates(client, headers, add_expense):
+    for i in range(20):
+        add_expense(headers, description=f'coffee and a pastry number {i}')
+    encoded = dict(headers, **{'Accept-Encoding': 'gzip'})
+    first = get(client, '/api/expenses?limit=50', encoded)
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert first.headers['ETag'].endswith('-gzip"')
+
+    second = get(client, '/api/expenses?limit=50', encoded, {'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+def test_errors_are_not_cached(client, headers):
+    response = get(client, '/api/expenses?cursor=bad', headers)
+    assert response.status_code == 400
+    assert 'ETag' not in response.headers
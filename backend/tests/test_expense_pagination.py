@@ -0,0 +1,128 @@
+import base64
+import json
+
+import pytest
+
+
+@pytest.fixture
+def headers(register, add_expense):
+    headers = register('alice')
+    # Several on one date, so pages split inside a date and fall back to created_at/id
+    for i, (day, category, amount) in enumerate([
+        ('2025-03-01', 'Food & Dining', '12.00'), ('2025-03-02', 'Transportation', '30.00'),
+        ('2025-03-02', 'Food & Dining', '8.25'), ('2025-03-02', 'Shopping', '45.00'),
+        ('2025-03-05', 'Food & Dining', '3.10'), ('2025-03-07', 'Transportation', '22.40'),
+        ('2025-03-07', 'Food & Dining', '16.00'),
+    ]):
+        add_expense(headers, description=f'expense {i}', date=day, category=category, amount=amount)
+    return headers
+
+
+def get_pages(client, headers, **params):
+    """Follow next_cursor to the end, returning the pages."""
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        response = client.get('/api/expenses', query_string=query, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        pages.append(page)
+        cursor = page['next_cursor']
+        if not cursor:
+            return pages
+
+
+def test_cursor_pages_cover_the_full_list_once(client, headers):
+    full = client.get('/api/expenses', headers=headers).get_json()
+    assert len(full) == 7
+
+    pages = get_pages(client, headers, limit=3)
+    assert [len(page['expenses']) for page in pages] == [3, 3, 1]
+    assert [e['id'] for page in pages for e in page['expenses']] == [e['id'] for e in full]
+    # Newest first, ties on the date broken by creation order, newest first
+    keys = [(e['date'], e['id']) for e in full]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_expense_added_between_pages_does_not_shift_the_next_page(client, headers, add_expense):
+    first = client.get('/api/expenses', query_string={'limit': 3}, headers=headers).get_json()
+    add_expense(headers, description='newest', date='2025-03-09')
+    second = client.get('/api/expenses', query_string={'limit': 3, 'cursor': first['next_cursor']},
+                        headers=headers).get_json()
+
+    seen = {e['id'] for e in first['expenses']}
+    assert not seen & {e['id'] for e in second['expenses']}
+    assert 'newest' not in [e['description'] for e in second['expenses']]
+
+
+def test_filters_apply_to_every_page(client, headers):
+    pages = get_pages(client, headers, limit=2, category='Food & Dining', start_date='2025-03-02')
+    expenses = [e for page in pages for e in page['expenses']]
+    assert [e['description'] for e in expenses] == ['expense 6', 'expense 4', 'expense 2']
+    assert all(e['category'] == 'Food & Dining' and e['date'] >= '2025-03-02' for e in expenses)
+
+
+def test_amount_and_repeated_category_filters(client, headers):
+    response = client.get('/api/expenses?limit=50&category=Shopping&category=Transportation&min_amount=25',
+                          headers=headers)
+    assert [e['description'] for e in response.get_json()['expenses']] == ['expense 3', 'expense 1']
+
+
+def test_limit_is_capped(client, headers, backend, monkeypatch):
+    monkeypatch.setattr(backend, 'EXPENSES_PAGE_MAX', 2)
+    page = client.get('/api/expenses', query_string={'limit': 500}, headers=headers).get_json()
+    assert page['limit'] == 2
+    assert len(page['expenses']) == 2
+
+
+def test_only_the_callers_expenses_are_listed(client, headers, register, add_expense):
+    other = register('bob')
+    add_expense(other, description='bob only')
+    assert client.get('/api/expenses', headers=other).get_json()[0]['description'] == 'bob only'
+    pages = get_pages(client, headers, limit=50)
+    assert 'bob only' not in [e['description'] for e in pages[0]['expenses']]
+
+
+def _encode(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor',
+    _encode(['2025-03-02', '2025-03-02T10:00:00']),
+    _encode(['03/02/2025', '2025-03-02T10:00:00', 5]),
+    _encode(['2025-03-02', 'yesterday', 5]),
+    _encode(['2025-03-02', '2025-03-02T10:00:00', 'five']),
+    _encode({'id': 5}),
+])
+def test_bad_cursor_is_a_400(client, headers, cursor):
+    response = client.get('/api/expenses', query_string={'cursor': cursor}, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
+
+
+@pytest.mark.parametrize('params, error', [
+    ({'limit': 'ten'}, 'Invalid limit'),
+    ({'limit': '-1'}, 'Invalid limit'),
+    ({'start_date': '2025-13-01'}, 'Invalid start_date. Use YYYY-MM-DD'),
+    ({'min_amount': 'lots'}, 'Invalid min_amount'),
+])
+def test_bad_parameters_are_a_400(client, headers, params, error):
+    response = client.get('/api/expenses', query_string=params, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+@pytest.mark.parametrize('merchant, expected', [
+    ('A_B', ['A_B Market']),
+    ('50%', ['50% Off Outlet']),
+    ('c\\d', ['C\\D Hardware']),
+    ('aXb', ['AXB Books']),
+])
+def test_merchant_filter_matches_wildcards_literally(client, register, add_expense, merchant, expected):
+    headers = register('carol')
+    for name in ('A_B Market', 'AXB Books', '50% Off Outlet', '500 Diner', 'C\\D Hardware', 'CD Store'):
+        add_expense(headers, merchant=name)
+    page = client.get('/api/expenses', query_string={'merchant': merchant, 'limit': 50}, headers=headers).get_json()
+    assert [e['merchant'] for e in page['expenses']] == expected
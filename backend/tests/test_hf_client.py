@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.hf_stub_server import start_stub
+from hf_client import CircuitBreaker, CircuitOpenError, HFInferenceClient, InferenceError
+
+LABELS = ['Food & Dining', 'Transportation', 'Shopping']
+
+
+@pytest.fixture
+def stub():
+    server = start_stub(latency_ms=0)
+    yield server
+    server.shutdown()
+
+
+def make_client(server, **options):
+    return HFInferenceClient(token='test', api_base=f'http://127.0.0.1:{server.server_address[1]}', **options)
+
+
+def test_concurrent_classify_calls_share_one_request(stub):
+    client = make_client(stub, batch_size=16, batch_wait_ms=200)
+    texts = [f'lunch at place {i}' for i in range(8)]
+    results = {}
+
+    def classify(text):
+        results[text] = client.classify('zero-shot', text, LABELS)
+
+    threads = [threading.Thread(target=classify, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stub.requests == 1
+    assert client.stats()['inputs'] == 8
+    assert {text: result['sequence'] for text, result in results.items()} == {text: text for text in texts}
+
+
+def test_batches_are_split_at_batch_size(stub):
+    client = make_client(stub)
+    results = client.zero_shot('zero-shot', ['taxi', 'bus'], LABELS)
+    assert [result['sequence'] for result in results] == ['taxi', 'bus']
+
+    client = make_client(stub, batch_size=2, batch_wait_ms=200)
+    threads = [threading.Thread(target=client.classify, args=('zero-shot', f'ride {i}', LABELS)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # One request above, then 2 + 2 + 1
+    assert stub.requests == 4
+
+
+def test_breaker_opens_after_consecutive_failures(stub):
+    client = make_client(stub, failure_threshold=2, reset_timeout=60)
+    stub.failing = True
+    for _ in range(2):
+        with pytest.raises(InferenceError, match='503'):
+            client.generate('gpt', 'tip')
+    assert client.breaker.state == 'open'
+
+    # Refused without reaching the server
+    with pytest.raises(CircuitOpenError):
+        client.generate('gpt', 'tip')
+    assert stub.requests == 2
+    assert client.stats()['rejected'] == 1
+
+
+def test_breaker_lets_one_trial_through_after_reset_timeout(stub):
+    client = make_client(stub, failure_threshold=1, reset_timeout=0.05)
+    stub.failing = True
+    with pytest.raises(InferenceError):
+        client.generate('gpt', 'tip')
+    assert client.breaker.state == 'open'
+
+    stub.failing = False
+    time.sleep(0.1)
+    assert client.generate('gpt', 'tip')
+    assert client.breaker.state == 'closed'
+
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    breaker.record_failure()
+    assert breaker.state == 'open'
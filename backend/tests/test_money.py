@@ -0,0 +1,39 @@
+import pytest
+
+from money import MAX_MINOR, format_minor, to_minor
+
+TOO_LARGE = ['1e30', '99999999999999999999', '92233720368547758.08', '-92233720368547758.08']
+
+
+@pytest.mark.parametrize('value, minor', [
+    ('12.34', 1234), (12.34, 1234), ('1,234.5', 123450), ('0.005', 1), ('-3', -300),
+    ('92233720368547758.07', MAX_MINOR),
+])
+def test_to_minor(value, minor):
+    assert to_minor(value) == minor
+
+
+@pytest.mark.parametrize('value', ['', 'ten', 'NaN', 'inf', True, None] + TOO_LARGE)
+def test_to_minor_rejects(value):
+    with pytest.raises(ValueError):
+        to_minor(value)
+
+
+def test_format_minor_round_trips():
+    assert format_minor(to_minor('1234.5')) == '1234.50'
+
+
+@pytest.mark.parametrize('amount', TOO_LARGE[:2])
+def test_oversized_amount_is_a_400(client, register, add_expense, amount):
+    headers = register('alice')
+    expense = add_expense(headers)
+    data = dict(merchant='Corner Cafe', description='coffee', amount=amount, category='Food & Dining',
+                payment_method='Visa', date='2025-03-14')
+
+    response = client.post('/api/expenses', json=data, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid amount format'}
+
+    response = client.put(f"/api/expenses/{expense['id']}", json={'amount': amount}, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid amount format'}
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from ocr_cache import OCRResultCache
+
+ENTRY = {'text': 'x' * 80}
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setenv('OCR_CACHE_ENABLED', 'true')
+
+
+def disk_usage(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(directory) for name in files if name.endswith('.json'))
+
+
+def test_processes_sharing_a_directory_stay_near_the_budget(tmp_path):
+    # Two web processes writing to one cache directory
+    first, second = (OCRResultCache(disk_dir=str(tmp_path), disk_max_bytes=2000, rescan_puts=4) for _ in range(2))
+    first.put('00', ENTRY)
+    entry_size = disk_usage(tmp_path)
+
+    for i in range(1, 200):
+        (first, second)[i % 2].put(f'{i:064x}', ENTRY)
+        # Each can add rescan_puts entries the other hasn't measured yet
+        assert disk_usage(tmp_path) <= 2000 + 2 * 4 * entry_size
+
+    assert first.stats()['evictions'] and second.stats()['evictions']
+    assert first.get(f'{199:064x}') == ENTRY
+
+
+def test_disk_hit_after_memory_is_gone(tmp_path):
+    cache = OCRResultCache(disk_dir=str(tmp_path), memory_items=1)
+    cache.put('a' * 64, ENTRY)
+    OCRResultCache(disk_dir=str(tmp_path)).put('b' * 64, {'text': 'other'})
+    cache.put('c' * 64, {'text': 'newest'})
+
+    assert cache.get('a' * 64) == ENTRY
+    assert cache.get('b' * 64) == {'text': 'other'}
+    assert cache.stats()['disk_hits'] == 2
@@ -0,0 +1,105 @@
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def headers(register):
+    return register('alice')
+
+
+def test_add_expense(client, headers, add_expense, check_rollups):
+    add_expense(headers, amount='4.50', date='2025-03-14')
+    add_expense(headers, amount='10.25', date='2025-03-14')
+    add_expense(headers, amount='7.00', date='2025-03-20', category='Transportation')
+
+    assert check_rollups() == {
+        (1, date(2025, 3, 14), 'Food & Dining'): [1475, 2],
+        (1, date(2025, 3, 20), 'Transportation'): [700, 1],
+    }
+
+
+@pytest.mark.parametrize('patch', [
+    {'amount': '9.99'},
+    {'category': 'Shopping'},
+    {'date': '2025-04-02'},
+    {'date': '2024-12-31', 'category': 'Shopping', 'amount': '1.00'},
+    {'description': 'only the text changes'},
+])
+def test_update_expense(client, headers, add_expense, check_rollups, patch):
+    expense = add_expense(headers)
+    add_expense(headers, amount='2.00')
+    response = client.put(f"/api/expenses/{expense['id']}", json=patch, headers=headers)
+    assert response.status_code == 200
+    check_rollups()
+
+
+def test_delete_expense_removes_emptied_rows(client, headers, add_expense, check_rollups):
+    first = add_expense(headers, date='2025-03-14')
+    second = add_expense(headers, date='2025-03-15')
+    client.delete(f"/api/expenses/{first['id']}", headers=headers)
+    assert list(check_rollups()) == [(1, date(2025, 3, 15), 'Food & Dining')]
+
+    client.delete(f"/api/expenses/{second['id']}", headers=headers)
+    assert check_rollups() == {}
+
+
+def test_bulk_update_and_delete(client, headers, add_expense, check_rollups):
+    ids = [add_expense(headers, amount=f'{i + 1}.00', date=f'2025-03-{10 + i % 3}')['id'] for i in range(6)]
+    response = client.post('/api/expenses/bulk', json={'ids': ids[:4], 'patch': {'category': 'Groceries'}},
+                           headers=headers)
+    assert response.status_code == 200
+    check_rollups()
+
+    response = client.post('/api/expenses/bulk', json={'ids': ids[2:], 'patch': {'date': '2025-05-01'}},
+                           headers=headers)
+    assert response.status_code == 200
+    check_rollups()
+
+    response = client.post('/api/expenses/bulk', json={'ids': ids[1:5], 'delete': True}, headers=headers)
+    assert response.get_json()['deleted'] == 4
+    check_rollups()
+
+
+def test_import(client, headers, add_expense, check_rollups):
+    add_expense(headers, date='2025-03-02', category='Transportation', amount='3.00')
+    statement = (
+        'Date,Payee,Memo,Amount,Category\n'
+        '2025-03-02,Metro,card tap,2.75,Transportation\n'
+        '2025-03-02,Metro,card tap,2.75,Transportation\n'
+        '03/15/2025,Green Grocer,weekly shop,54.10,Groceries\n'
+        '2025-04-01,Refund,,-20.00,\n'
+        '2025-04-01,Broken row,,not money,Groceries\n'
+        '2025-04-03,Shell,fuel,40.00,\n'
+    )
+    response = client.post('/api/expenses/import', data=statement, content_type='text/csv', headers=headers)
+    assert response.status_code == 200
+    report = response.get_json()
+    assert (report['imported'], report['skipped'], report['failed']) == (4, 1, 1)
+
+    daily = check_rollups()
+    assert daily[(1, date(2025, 3, 2), 'Transportation')] == [850, 3]
+
+
+def test_rollups_are_per_user(client, headers, register, add_expense, check_rollups):
+    other = register('bob')
+    add_expense(headers)
+    expense = add_expense(other)
+    client.delete(f"/api/expenses/{expense['id']}", headers=other)
+    assert list(check_rollups()) == [(1, date(2025, 3, 14), 'Food & Dining')]
+
+
+def test_rebuild_verify_reports_drift(app, backend, headers, add_expense, check_rollups):
+    add_expense(headers)
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=['rollups', 'rebuild', '--verify']).exit_code == 0
+
+    with app.app_context():
+        backend.DailySpending.query.update({'total_cents': 1})
+        backend.db.session.commit()
+    result = runner.invoke(args=['rollups', 'rebuild', '--verify'])
+    assert result.exit_code == 1
+    assert '1 mismatched rollup rows' in result.output
+
+    assert runner.invoke(args=['rollups', 'rebuild']).exit_code == 0
+    check_rollups()
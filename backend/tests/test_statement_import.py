@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.fixture
+def headers(register):
+    return register('alice')
+
+
+def post_statement(client, headers, statement, **params):
+    return client.post('/api/expenses/import', data=statement, content_type='text/csv', headers=headers,
+                       query_string=params)
+
+
+def test_bad_rows_are_reported_and_the_rest_imported(client, headers, check_rollups):
+    statement = (
+        'Date,Payee,Amount,Category\n'
+        '2025-03-01,Metro,2.75,Transportation\n'
+        '2025-03-02,Huge,1e30,Shopping\n'
+        '2025-03-03,Bigger,99999999999999999999,Shopping\n'
+        '2025-03-04,Green Grocer,54.10,Groceries\n'
+        'someday,Cafe,4.00,Food & Dining\n'
+    )
+    response = post_statement(client, headers, statement)
+    assert response.status_code == 200
+    report = response.get_json()
+    assert (report['imported'], report['skipped'], report['failed']) == (2, 0, 3)
+    assert report['errors'] == [
+        {'row': 3, 'error': 'Invalid amount format'},
+        {'row': 4, 'error': 'Invalid amount format'},
+        {'row': 6, 'error': 'Invalid date format. Use YYYY-MM-DD'},
+    ]
+    assert sorted(e['merchant'] for e in client.get('/api/expenses', headers=headers).get_json()) == [
+        'Green Grocer', 'Metro']
+    check_rollups()
+
+
+@pytest.mark.parametrize('debits, imported', [('positive', ['Shell']), ('negative', ['Refund'])])
+def test_credits_are_skipped(client, headers, debits, imported):
+    statement = 'Date,Payee,Amount,Category\n2025-03-01,Shell,40.00,Transportation\n2025-03-02,Refund,-20.00,Shopping\n'
+    report = post_statement(client, headers, statement, debits=debits).get_json()
+    assert (report['imported'], report['skipped']) == (1, 1)
+    assert [e['merchant'] for e in client.get('/api/expenses', headers=headers).get_json()] == imported
+
+
+def test_error_list_is_truncated(client, headers, backend, monkeypatch):
+    monkeypatch.setattr(backend, 'IMPORT_MAX_ERRORS', 2)
+    statement = 'Date,Payee,Amount\n' + '2025-03-01,Metro,1e30\n' * 5
+    report = post_statement(client, headers, statement).get_json()
+    assert report['failed'] == 5
+    assert len(report['errors']) == 2
+    assert report['errors_truncated'] is True
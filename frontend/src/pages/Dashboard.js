@@ -48,10 +48,10 @@ const Dashboard = () => {
     }
   };
 
-  const fetchAIInsights = async () => {
+  const fetchAIInsights = async (attempt = 0) => {
     try {
       setLoadingInsights(true);
-      const response = await fetch('http://localhost:5001/api', {
+      const response = await fetch('http://localhost:5001/api/insights', {
         headers: {
           'Authorization': `Bearer ${localStorage.getItem('token')}`
         }
@@ -59,13 +59,17 @@ const Dashboard = () => {
       
       if (response.ok) {
         const data = await response.json();
+        // First visit: insights are still being computed in the background
+        if (data.status === 'pending' && attempt < 10) {
+          setTimeout(() => fetchAIInsights(attempt + 1), 2000);
+          return;
+        }
         setAiInsights(data.insights);
       }
     } catch (error) {
       console.error('Failed to fetch AI insights:', error);
-    } finally {
-      setLoadingInsights(false);
     }
+    setLoadingInsights(false);
   };
 
   const pieChartData = {
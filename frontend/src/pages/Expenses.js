@@ -1,11 +1,26 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import Navbar from '../components/Navbar';
 import { expenseService } from '../services/api';
 
+const PAGE_SIZE = 50;
+const SEARCH_DEBOUNCE_MS = 300;
+// A receipt job that hasn't finished after this long is treated as lost (the server waits up to 120s for an OCR engine)
+const RECEIPT_POLL_INTERVAL_MS = 1000;
+const RECEIPT_POLL_MAX_ATTEMPTS = 150;
+
+// Same order as the API: date, then created_at, then id, all newest first
+const compareExpenses = (a, b) =>
+  b.date.localeCompare(a.date) || b.created_at.localeCompare(a.created_at) || b.id - a.id;
+
 const Expenses = () => {
   const [expenses, setExpenses] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [search, setSearch] = useState('');
+  // Only the newest list request may replace the rows, older search responses are dropped
+  const latestRequest = useRef(0);
   const [showForm, setShowForm] = useState(false);
   const [editingExpense, setEditingExpense] = useState(null);
   const [receiptFile, setReceiptFile] = useState(null);
@@ -104,14 +119,26 @@ const Expenses = () => {
   ];
 
   useEffect(() => {
-    fetchExpenses();
-  }, []);
+    // Wait for a pause in typing before searching, the first load goes out right away
+    const timer = setTimeout(fetchExpenses, search ? SEARCH_DEBOUNCE_MS : 0);
+    return () => clearTimeout(timer);
+  }, [search]);
+
+  // Searches are sorted by date so pages keep the same order as the full list
+  const fetchPage = (cursor) => {
+    const q = search.trim();
+    return q
+      ? expenseService.searchExpenses({ q, sort: 'date', limit: PAGE_SIZE, cursor })
+      : expenseService.getExpenses({ limit: PAGE_SIZE, cursor });
+  };
 
   const fetchExpenses = async () => {
+    const request = ++latestRequest.current;
     try {
-      setLoading(true);
-      const data = await expenseService.getExpenses();
-      setExpenses(data);
+      const data = await fetchPage();
+      if (request !== latestRequest.current) return;
+      setExpenses(data.expenses);
+      setNextCursor(data.next_cursor);
     } catch (error) {
       setError('Failed to load expenses');
       console.error('Expenses error:', error);
@@ -120,16 +147,44 @@ const Expenses = () => {
     }
   };
 
+  const fetchMoreExpenses = async () => {
+    const request = latestRequest.current;
+    try {
+      setLoadingMore(true);
+      const data = await fetchPage(nextCursor);
+      if (request !== latestRequest.current) return;
+      setExpenses(prev => [...prev, ...data.expenses]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      setError('Failed to load expenses');
+      console.error('Expenses error:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Apply a saved expense to the loaded pages instead of downloading them again
+  const upsertExpense = (saved) => {
+    setExpenses(prev => {
+      const others = prev.filter(expense => expense.id !== saved.id);
+      const last = others[others.length - 1];
+      // Rows past the last loaded one belong to a page that isn't loaded yet
+      if (nextCursor && last && compareExpenses(saved, last) > 0) {
+        return others;
+      }
+      return [...others, saved].sort(compareExpenses);
+    });
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     setError('');
 
     try {
-      if (editingExpense) {
-        await expenseService.updateExpense(editingExpense.id, formData);
-      } else {
-        await expenseService.addExpense(formData);
-      }
+      const result = editingExpense
+        ? await expenseService.updateExpense(editingExpense.id, formData)
+        : await expenseService.addExpense(formData);
+      upsertExpense(result.expense);
       savePaymentMethods(formData.payment_method);
       
       setFormData({
@@ -143,7 +198,6 @@ const Expenses = () => {
       setShowForm(false);
       setEditingExpense(null);
       setSuggestedCategory('');
-      fetchExpenses();
     } catch (error) {
       console.error('Error saving expense:', error);
       console.error('Error response:', error.response);
@@ -169,7 +223,7 @@ const Expenses = () => {
     if (window.confirm('Are you sure you want to delete this expense?')) {
       try {
         await expenseService.deleteExpense(expenseId);
-        fetchExpenses();
+        setExpenses(prev => prev.filter(expense => expense.id !== expenseId));
       } catch (error) {
         setError('Failed to delete expense');
       }
@@ -189,6 +243,22 @@ const Expenses = () => {
     });
   };
 
+  const pollReceiptJob = async (jobId) => {
+    for (let attempt = 0; attempt < RECEIPT_POLL_MAX_ATTEMPTS; attempt++) {
+      const response = await fetch(`http://localhost:5001/api/expenses/upload-receipt/${jobId}`, {
+        headers: {
+          'Authorization': `Bearer ${localStorage.getItem('token')}`
+        }
+      });
+      const data = await response.json();
+      if (!response.ok || data.status === 'done' || data.status === 'failed') {
+        return data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, RECEIPT_POLL_INTERVAL_MS));
+    }
+    return { error: 'Reading the receipt is taking too long, please try again' };
+  };
+
   const handleUploadReceipt = async (fileToUpload) => {
     if (!fileToUpload) return ;
  
@@ -208,7 +278,9 @@ const Expenses = () => {
       });
 
       if (response.ok) {
-        const data = await response.json();
+        // OCR runs in the background, poll the job until it finishes
+        const job = await response.json();
+        const data = await pollReceiptJob(job.job_id);
         console.log('Receipt Parsed:', data);
         
         // Pre-fill form with parsed data
@@ -219,9 +291,12 @@ const Expenses = () => {
             description: data.parsed_expense.description || '',
             category: data.parsed_expense.category || '',
             payment_method: data.parsed_expense.payment_method || '',
-            date: data.parsed_expense.date || getTodayPST()
+            date: data.parsed_expense.date || getTodayPST(),
+            ocr_result_id: data.ocr_result_id
           });
           setShowForm(true);
+        } else {
+          setError(data.error || 'Failed to read receipt');
         }
         
         // Reset file input
@@ -473,10 +548,24 @@ const Expenses = () => {
         )}
 
         {/* Expenses List */}
+        <div className="mb-4">
+          <input
+            type="search"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+            placeholder="Search merchant or description"
+            className="form-input w-full md:w-96"
+          />
+        </div>
+
         {loading ? (
           <div className="flex justify-center items-center py-12">
             <div className="animate-spin rounded-full h-32 w-32 border-b-2 border-blue-600"></div>
           </div>
+        ) : expenses.length === 0 && search.trim() ? (
+          <div className="text-center py-12">
+            <p className="text-gray-500 text-lg">No expenses match "{search.trim()}".</p>
+          </div>
         ) : expenses.length === 0 ? (
           <div className="text-center py-12">
             <p className="text-gray-500 text-lg">No expenses recorded yet.</p>
@@ -579,6 +668,17 @@ const Expenses = () => {
               </tbody>
             </table>
             </div>
+            {nextCursor && (
+              <div className="flex justify-center py-4 border-t border-gray-200">
+                <button
+                  onClick={fetchMoreExpenses}
+                  disabled={loadingMore}
+                  className="text-blue-600 hover:text-blue-900 text-sm font-medium disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -74,8 +74,15 @@ export const authService = {
 
 // Expense services
 export const expenseService = {
-  getExpenses: async () => {
-    const response = await api.get('/expenses');
+  // Pass { limit, cursor, ...filters } for one page: { expenses, next_cursor }
+  getExpenses: async (params = {}) => {
+    const response = await api.get('/expenses', { params });
+    return response.data;
+  },
+
+  // Pass { q, sort: 'relevance' | 'date', limit, cursor, ...filters }: { expenses, next_cursor, fuzzy }
+  searchExpenses: async (params = {}) => {
+    const response = await api.get('/expenses/search', { params });
     return response.data;
   },
 
@@ -101,6 +108,28 @@ export const expenseService = {
     return response.data;
   },
 
+  // One transaction for many ids: { results: [{ id, status, expense? }] }
+  bulkUpdateExpenses: async (ids, patch) => {
+    const response = await api.post('/expenses/bulk', { ids, patch });
+    return response.data;
+  },
+
+  bulkDeleteExpenses: async (ids) => {
+    const response = await api.post('/expenses/bulk', { ids, delete: true });
+    return response.data;
+  },
+
+  // options: { debits: 'negative', payment_method, format }
+  importStatement: async (file, options = {}) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    Object.entries(options).forEach(([key, value]) => formData.append(key, value));
+    const response = await api.post('/expenses/import', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+    return response.data;
+  },
+
   getDashboardSummary: async () => {
     const response = await api.get('/dashboard/summary');
     return response.data;